@@ -1,21 +1,47 @@
 const axios = require('axios');
-// Axios instancia con timeout y reintento simple
+// Axios instancia; el timeout de cada intento lo fija postWithDeadline
 const mlClient = axios.create({
     baseURL: process.env.ML_SERVICE_URL || 'http://localhost:8000',
     timeout: 5000,
 });
 
-async function postWithRetry(url, data, tries = 2) {
+// Presupuesto total de una predicción (todos los intentos incluidos)
+const ML_PREDICT_BUDGET_MS = parseInt(process.env.ML_PREDICT_BUDGET_MS || '5000', 10);
+// Margen para la red: el servicio recibe como deadline_ms lo que queda menos este margen
+const ML_NETWORK_MARGIN_MS = 150;
+
+// Solo se reintenta cuando el servicio no hizo el trabajo (no disponible o aún calentando);
+// un timeout o un 504 significan que el presupuesto ya se gastó
+function isRetryable(err) {
+    if (err.response) return err.response.status === 503;
+    return err.code === 'ECONNREFUSED' || err.code === 'ECONNRESET';
+}
+
+async function postWithDeadline(url, data, tries = 3, budgetMs = ML_PREDICT_BUDGET_MS) {
+    const deadline = Date.now() + budgetMs;
     let lastErr;
     for (let i = 0; i < tries; i++) {
+        const remaining = deadline - Date.now();
+        if (remaining <= ML_NETWORK_MARGIN_MS) break;
         try {
-            return await mlClient.post(url, data);
+            return await mlClient.post(
+                url,
+                { ...data, deadline_ms: remaining - ML_NETWORK_MARGIN_MS },
+                { timeout: remaining }
+            );
         } catch (err) {
             lastErr = err;
-            // pequeño backoff
-            await new Promise(r => setTimeout(r, 250 * (i + 1)));
+            if (!isRetryable(err)) break;
+            // pequeño backoff, solo si todavía queda presupuesto después de esperar
+            const backoff = 250 * (i + 1);
+            if (deadline - Date.now() <= backoff + ML_NETWORK_MARGIN_MS) break;
+            await new Promise(r => setTimeout(r, backoff));
         }
     }
+    if (!lastErr) {
+        lastErr = new Error(`ML service deadline of ${budgetMs} ms exceeded`);
+        lastErr.code = 'ETIMEDOUT';
+    }
     throw lastErr;
 }
 /**
@@ -46,7 +72,7 @@ async function getPredictions(empleado_id, dias_solicitados, motivo_texto, fecha
       fecha_inicio,
       fecha_fin,
     };
-    const response = await postWithRetry('/api/ml/predict', payload, 3);
+    const response = await postWithDeadline('/api/ml/predict', payload, 3);
 
         if (response.data) {
             console.log(`✓ ML predictions received:`);
@@ -55,6 +81,9 @@ async function getPredictions(empleado_id, dias_solicitados, motivo_texto, fecha
             console.log(`  - Impacto: ${response.data.impacto_area_numerico}`);
             console.log(`  - Prob. aprobación: ${(response.data.ml_probabilidad_aprobacion * 100).toFixed(2)}%`);
             console.log(`  - Decisión: ${response.data.resultado_rrhh}`);
+            if (response.data.degradado) {
+                console.log(`  - Etapas degradadas: ${Object.keys(response.data.etapas_degradadas).join(', ')}`);
+            }
 
             return {
                 success: true,
@@ -71,7 +100,7 @@ async function getPredictions(empleado_id, dias_solicitados, motivo_texto, fecha
     } catch (error) {
         if (error.code === 'ECONNREFUSED') {
             console.warn('⚠ ML service not available (connection refused)');
-        } else if (error.code === 'ETIMEDOUT') {
+        } else if (error.code === 'ETIMEDOUT' || error.code === 'ECONNABORTED') {
             console.warn('⚠ ML service timeout');
         } else {
             console.error('✗ ML service error:', error.message);
@@ -86,19 +115,21 @@ async function getPredictions(empleado_id, dias_solicitados, motivo_texto, fecha
 
 /**
  * Trigger model retraining
- * @returns {object} Training result
+ * Training runs as a background job in the ML service; poll getTrainingJob(job_id)
+ * @param {boolean} force - Retrain every stage even if its inputs did not change
+ * @returns {object} Submitted training job
  */
-async function trainModels() {
+async function trainModels(force = false) {
     try {
-        console.log('🔄 Triggering ML model training...');
+        console.log('🔄 Submitting ML model training job...');
 
         const response = await axios.post(
             `${ML_SERVICE_URL}/api/ml/train`,
             {},
-            { timeout: 300000 } // 5 minutes for training
+            { params: { force }, timeout: 10000 }
         );
 
-        console.log('✓ Model training completed');
+        console.log(`✓ Model training job submitted: ${response.data.job_id}`);
         return {
             success: true,
             data: response.data
@@ -113,6 +144,29 @@ async function trainModels() {
     }
 }
 
+/**
+ * Get progress, per-stage timings and metrics of a training job
+ * @param {string} jobId - Job id returned by trainModels
+ * @returns {object} Training job status
+ */
+async function getTrainingJob(jobId) {
+    try {
+        const response = await axios.get(
+            `${ML_SERVICE_URL}/api/ml/train/${jobId}`,
+            { timeout: 5000 }
+        );
+        return {
+            success: true,
+            data: response.data
+        };
+    } catch (error) {
+        return {
+            success: false,
+            error: error.message
+        };
+    }
+}
+
 /**
  * Check if ML service is available
  * @returns {boolean} True if service is reachable
@@ -173,6 +227,7 @@ async function predictApproval(empleado, solicitud) {
 module.exports = {
     getPredictions,
     trainModels,
+    getTrainingJob,
     checkMLServiceHealth,
     getModelStatus,
     predictApproval // Legacy support
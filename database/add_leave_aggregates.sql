@@ -0,0 +1,155 @@
+-- =============================================
+-- Materialized per-employee leave aggregates
+-- Windows of 30, 90 and 365 days over decided requests (by fecha_solicitud):
+--   dias_autorizados_Nd: authorized days
+--   solicitudes_Nd:      decided requests (AUTORIZADO + RECHAZADO)
+--   rechazos_Nd:         rejected requests
+-- Kept up to date by a trigger when a request is decided; windows age out
+-- through sp_rebuild_empleado_permiso_agregados (run daily by the ML service).
+-- =============================================
+
+USE ComfachocoLeaveDB;
+GO
+
+IF OBJECT_ID('empleado_permiso_agregados', 'U') IS NULL
+BEGIN
+    CREATE TABLE empleado_permiso_agregados (
+        empleado_id INT NOT NULL PRIMARY KEY,
+        dias_autorizados_30d INT NOT NULL DEFAULT 0,
+        dias_autorizados_90d INT NOT NULL DEFAULT 0,
+        dias_autorizados_365d INT NOT NULL DEFAULT 0,
+        solicitudes_30d INT NOT NULL DEFAULT 0,
+        solicitudes_90d INT NOT NULL DEFAULT 0,
+        solicitudes_365d INT NOT NULL DEFAULT 0,
+        rechazos_30d INT NOT NULL DEFAULT 0,
+        rechazos_90d INT NOT NULL DEFAULT 0,
+        rechazos_365d INT NOT NULL DEFAULT 0,
+        actualizado_en DATETIME2 NOT NULL DEFAULT GETDATE(),
+        CONSTRAINT FK_agregados_empleado FOREIGN KEY (empleado_id)
+            REFERENCES empleados(empleado_id) ON DELETE CASCADE
+    );
+    PRINT 'Created table: empleado_permiso_agregados';
+END
+ELSE
+BEGIN
+    PRINT 'Table empleado_permiso_agregados already exists';
+END
+GO
+
+-- Covering index for per-employee history windows (trigger, rebuild and fallback query)
+IF NOT EXISTS (
+    SELECT * FROM sys.indexes
+    WHERE name = 'IX_solicitudes_empleado_fecha'
+    AND object_id = OBJECT_ID('solicitudes_permiso')
+)
+BEGIN
+    CREATE INDEX IX_solicitudes_empleado_fecha
+    ON solicitudes_permiso(empleado_id, fecha_solicitud)
+    INCLUDE (resultado_rrhh, dias_autorizados);
+    PRINT 'Added index: IX_solicitudes_empleado_fecha';
+END
+GO
+
+-- Recompute the aggregates of a set of employees (NULL = all employees)
+CREATE OR ALTER PROCEDURE sp_refresh_empleado_permiso_agregados
+    @empleado_id INT = NULL
+AS
+BEGIN
+    SET NOCOUNT ON;
+    DECLARE @hoy DATETIME2 = GETDATE();
+
+    MERGE empleado_permiso_agregados AS destino
+    USING (
+        SELECT
+            e.empleado_id,
+            COALESCE(SUM(CASE WHEN s.resultado_rrhh = 'AUTORIZADO' AND s.fecha_solicitud >= DATEADD(DAY, -30, @hoy) THEN s.dias_autorizados END), 0) AS dias_autorizados_30d,
+            COALESCE(SUM(CASE WHEN s.resultado_rrhh = 'AUTORIZADO' AND s.fecha_solicitud >= DATEADD(DAY, -90, @hoy) THEN s.dias_autorizados END), 0) AS dias_autorizados_90d,
+            COALESCE(SUM(CASE WHEN s.resultado_rrhh = 'AUTORIZADO' THEN s.dias_autorizados END), 0) AS dias_autorizados_365d,
+            COUNT(CASE WHEN s.fecha_solicitud >= DATEADD(DAY, -30, @hoy) THEN 1 END) AS solicitudes_30d,
+            COUNT(CASE WHEN s.fecha_solicitud >= DATEADD(DAY, -90, @hoy) THEN 1 END) AS solicitudes_90d,
+            COUNT(s.solicitud_id) AS solicitudes_365d,
+            COUNT(CASE WHEN s.resultado_rrhh = 'RECHAZADO' AND s.fecha_solicitud >= DATEADD(DAY, -30, @hoy) THEN 1 END) AS rechazos_30d,
+            COUNT(CASE WHEN s.resultado_rrhh = 'RECHAZADO' AND s.fecha_solicitud >= DATEADD(DAY, -90, @hoy) THEN 1 END) AS rechazos_90d,
+            COUNT(CASE WHEN s.resultado_rrhh = 'RECHAZADO' THEN 1 END) AS rechazos_365d
+        FROM empleados e
+        LEFT JOIN solicitudes_permiso s
+            ON s.empleado_id = e.empleado_id
+            AND s.resultado_rrhh IN ('AUTORIZADO', 'RECHAZADO')
+            AND s.fecha_solicitud >= DATEADD(DAY, -365, @hoy)
+        WHERE @empleado_id IS NULL OR e.empleado_id = @empleado_id
+        GROUP BY e.empleado_id
+    ) AS origen
+    ON destino.empleado_id = origen.empleado_id
+    WHEN MATCHED THEN UPDATE SET
+        dias_autorizados_30d = origen.dias_autorizados_30d,
+        dias_autorizados_90d = origen.dias_autorizados_90d,
+        dias_autorizados_365d = origen.dias_autorizados_365d,
+        solicitudes_30d = origen.solicitudes_30d,
+        solicitudes_90d = origen.solicitudes_90d,
+        solicitudes_365d = origen.solicitudes_365d,
+        rechazos_30d = origen.rechazos_30d,
+        rechazos_90d = origen.rechazos_90d,
+        rechazos_365d = origen.rechazos_365d,
+        actualizado_en = @hoy
+    WHEN NOT MATCHED BY TARGET THEN INSERT (
+        empleado_id, dias_autorizados_30d, dias_autorizados_90d, dias_autorizados_365d,
+        solicitudes_30d, solicitudes_90d, solicitudes_365d,
+        rechazos_30d, rechazos_90d, rechazos_365d, actualizado_en
+    ) VALUES (
+        origen.empleado_id, origen.dias_autorizados_30d, origen.dias_autorizados_90d, origen.dias_autorizados_365d,
+        origen.solicitudes_30d, origen.solicitudes_90d, origen.solicitudes_365d,
+        origen.rechazos_30d, origen.rechazos_90d, origen.rechazos_365d, @hoy
+    );
+END
+GO
+
+-- Full rebuild (ages the windows out; also used after bulk loads)
+CREATE OR ALTER PROCEDURE sp_rebuild_empleado_permiso_agregados
+AS
+BEGIN
+    SET NOCOUNT ON;
+    EXEC sp_refresh_empleado_permiso_agregados @empleado_id = NULL;
+    SELECT COUNT(*) AS empleados FROM empleado_permiso_agregados;
+END
+GO
+
+-- Incremental maintenance: refresh only the employees whose requests were decided or edited
+CREATE OR ALTER TRIGGER TR_solicitudes_agregados
+ON solicitudes_permiso
+AFTER UPDATE, DELETE
+AS
+BEGIN
+    SET NOCOUNT ON;
+    IF NOT (UPDATE(resultado_rrhh) OR UPDATE(dias_autorizados) OR NOT EXISTS (SELECT 1 FROM inserted))
+        RETURN;
+
+    DECLARE @empleado_id INT;
+    DECLARE afectados CURSOR LOCAL FAST_FORWARD FOR
+        SELECT empleado_id FROM inserted
+        UNION
+        SELECT empleado_id FROM deleted;
+
+    OPEN afectados;
+    FETCH NEXT FROM afectados INTO @empleado_id;
+    WHILE @@FETCH_STATUS = 0
+    BEGIN
+        EXEC sp_refresh_empleado_permiso_agregados @empleado_id = @empleado_id;
+        FETCH NEXT FROM afectados INTO @empleado_id;
+    END
+    CLOSE afectados;
+    DEALLOCATE afectados;
+END
+GO
+
+-- Initial population
+EXEC sp_rebuild_empleado_permiso_agregados;
+GO
+
+PRINT '=============================================';
+PRINT 'Leave aggregates migration completed successfully!';
+PRINT '=============================================';
+PRINT 'Added objects:';
+PRINT '  - empleado_permiso_agregados (30/90/365 day windows per employee)';
+PRINT '  - IX_solicitudes_empleado_fecha';
+PRINT '  - sp_refresh_empleado_permiso_agregados, sp_rebuild_empleado_permiso_agregados';
+PRINT '  - TR_solicitudes_agregados (AFTER UPDATE, DELETE)';
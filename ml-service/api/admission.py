@@ -0,0 +1,267 @@
+"""
+Admission control for the ML endpoints.
+
+Each endpoint class (predict, batch, train, status) has a concurrency limit
+and a bounded wait queue. A request that finds every slot busy waits in the
+queue for at most ADMISSION_QUEUE_TIMEOUT_MS; when the queue itself is full
+it is rejected at once with 429, and when its wait times out with 503, both
+with a Retry-After estimated from the recent service time. Health and
+readiness probes are never limited.
+
+AdmissionController is used by the Flask app (one thread per request),
+AsyncAdmissionController by the FastAPI app (app_predict.py).
+"""
+import asyncio
+import functools
+import math
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from config import Config
+
+ENDPOINT_CLASSES = ['predict', 'batch', 'train', 'status']
+
+# Weight of the newest request in the moving average of service time
+_SERVICE_TIME_ALPHA = 0.2
+
+
+class Overloaded(Exception):
+    """Request not admitted: the wait queue is full (429) or the wait timed out (503)"""
+
+    def __init__(self, endpoint_class, status_code, retry_after, reason):
+        super().__init__(f"{endpoint_class}: {reason}")
+        self.endpoint_class = endpoint_class
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class _AdmissionState:
+    """Counters and limits shared by the thread and asyncio controllers (callers hold the lock)"""
+
+    def __init__(self, name, max_concurrent, max_queue, queue_timeout_ms):
+        self.name = name
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout_ms / 1000
+        self.active = 0
+        self.waiting = 0
+        self.peak_waiting = 0
+        self.counters = {'admitted': 0, 'queued': 0, 'rejected_queue_full': 0, 'rejected_timeout': 0}
+        self.wait_seconds = 0.0
+        self.service_seconds = None
+
+    def retry_after(self):
+        """Seconds until a slot is likely free for a new request (at least 1)"""
+        service = self.service_seconds or 1.0
+        return max(1, math.ceil(service * (self.waiting + 1) / self.max_concurrent))
+
+    def reject_full(self):
+        self.counters['rejected_queue_full'] += 1
+        return Overloaded(self.name, 429, self.retry_after(), 'wait queue is full')
+
+    def reject_timeout(self):
+        self.counters['rejected_timeout'] += 1
+        return Overloaded(self.name, 503, self.retry_after(), 'timed out waiting for a slot')
+
+    def enqueue(self):
+        self.waiting += 1
+        self.counters['queued'] += 1
+        self.peak_waiting = max(self.peak_waiting, self.waiting)
+
+    def admit(self, waited):
+        self.active += 1
+        self.counters['admitted'] += 1
+        self.wait_seconds += waited
+
+    def release(self, held):
+        self.active -= 1
+        if self.service_seconds is None:
+            self.service_seconds = held
+        else:
+            self.service_seconds += _SERVICE_TIME_ALPHA * (held - self.service_seconds)
+
+    def report(self):
+        admitted = self.counters['admitted']
+        return {
+            'max_concurrent': self.max_concurrent,
+            'max_queue': self.max_queue,
+            'queue_timeout_ms': round(self.queue_timeout * 1000),
+            'active': self.active,
+            'queue_depth': self.waiting,
+            'peak_queue_depth': self.peak_waiting,
+            **self.counters,
+            'mean_wait_ms': round(self.wait_seconds / admitted * 1000, 3) if admitted else None,
+            'service_time_ms': round(self.service_seconds * 1000, 3) if self.service_seconds is not None else None
+        }
+
+
+class AdmissionController:
+    """Concurrency limit plus bounded wait queue for one endpoint class (thread-safe)"""
+
+    def __init__(self, name, max_concurrent, max_queue, queue_timeout_ms):
+        self._state = _AdmissionState(name, max_concurrent, max_queue, queue_timeout_ms)
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout=None):
+        """
+        Take a slot, waiting in the queue if needed. timeout (seconds) shortens
+        the configured queue timeout, e.g. to the remaining request deadline.
+        Raises Overloaded.
+        """
+        state = self._state
+        started = time.perf_counter()
+        with self._condition:
+            if state.active < state.max_concurrent and state.waiting == 0:
+                state.admit(0.0)
+                return
+            if state.waiting >= state.max_queue:
+                raise state.reject_full()
+
+            limit = state.queue_timeout if timeout is None else min(state.queue_timeout, timeout)
+            expires_at = started + limit
+            state.enqueue()
+            try:
+                while state.active >= state.max_concurrent:
+                    remaining = expires_at - time.perf_counter()
+                    if remaining <= 0:
+                        raise state.reject_timeout()
+                    self._condition.wait(remaining)
+            finally:
+                state.waiting -= 1
+            state.admit(time.perf_counter() - started)
+
+    def release(self, held_seconds):
+        with self._condition:
+            self._state.release(held_seconds)
+            self._condition.notify()
+
+    @contextmanager
+    def slot(self, timeout=None):
+        self.acquire(timeout)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - started)
+
+    def report(self):
+        with self._condition:
+            return self._state.report()
+
+
+class AsyncAdmissionController:
+    """Same limits for asyncio handlers; must be used from a single event loop"""
+
+    def __init__(self, name, max_concurrent, max_queue, queue_timeout_ms):
+        self._state = _AdmissionState(name, max_concurrent, max_queue, queue_timeout_ms)
+        self._condition = None
+
+    async def acquire(self, timeout=None):
+        """Async counterpart of AdmissionController.acquire"""
+        if self._condition is None:
+            # Created lazily so it binds to the running loop
+            self._condition = asyncio.Condition()
+        state = self._state
+        started = time.perf_counter()
+        async with self._condition:
+            if state.active < state.max_concurrent and state.waiting == 0:
+                state.admit(0.0)
+                return
+            if state.waiting >= state.max_queue:
+                raise state.reject_full()
+
+            limit = state.queue_timeout if timeout is None else min(state.queue_timeout, timeout)
+            state.enqueue()
+            try:
+                await asyncio.wait_for(
+                    self._condition.wait_for(lambda: state.active < state.max_concurrent), limit
+                )
+            except asyncio.TimeoutError:
+                raise state.reject_timeout()
+            finally:
+                state.waiting -= 1
+            state.admit(time.perf_counter() - started)
+
+    async def release(self, held_seconds):
+        async with self._condition:
+            self._state.release(held_seconds)
+            self._condition.notify()
+
+    @asynccontextmanager
+    async def slot(self, timeout=None):
+        await self.acquire(timeout)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            await self.release(time.perf_counter() - started)
+
+    def report(self):
+        return self._state.report()
+
+
+def limits(endpoint_class):
+    """(max_concurrent, max_queue) configured for an endpoint class"""
+    prefix = f"ADMISSION_{endpoint_class.upper()}"
+    return getattr(Config, f"{prefix}_CONCURRENCY"), getattr(Config, f"{prefix}_QUEUE")
+
+
+def build_controllers(controller_class=AdmissionController):
+    """One controller per endpoint class, from Config"""
+    return {
+        endpoint_class: controller_class(endpoint_class, *limits(endpoint_class), Config.ADMISSION_QUEUE_TIMEOUT_MS)
+        for endpoint_class in ENDPOINT_CLASSES
+    }
+
+
+_controllers = None
+_controllers_lock = threading.Lock()
+
+
+def get_controller(endpoint_class):
+    """Process-wide thread controller of an endpoint class (Flask app)"""
+    global _controllers
+    if _controllers is None:
+        with _controllers_lock:
+            if _controllers is None:
+                _controllers = build_controllers()
+    return _controllers[endpoint_class]
+
+
+def admission_report():
+    """Limits, queue depth and rejection counters per endpoint class"""
+    return {
+        'enabled': Config.ADMISSION_ENABLED,
+        'classes': {name: get_controller(name).report() for name in ENDPOINT_CLASSES}
+    }
+
+
+def overloaded_response(error):
+    """Flask response for an Overloaded error"""
+    from flask import jsonify
+    response = jsonify({
+        'error': 'Service overloaded',
+        'endpoint_class': error.endpoint_class,
+        'message': error.reason,
+        'retry_after': error.retry_after
+    })
+    response.status_code = error.status_code
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+
+def admit(endpoint_class):
+    """Flask view decorator: run the view inside a slot of the endpoint class"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not Config.ADMISSION_ENABLED:
+                return view(*args, **kwargs)
+            try:
+                with get_controller(endpoint_class).slot():
+                    return view(*args, **kwargs)
+            except Overloaded as e:
+                return overloaded_response(e)
+        return wrapper
+    return decorator
@@ -1,23 +1,214 @@
 from flask import Blueprint, request, jsonify
+import functools
 import logging
-from models.trainer import ModelTrainer
+import numpy as np
+import threading
+import time
+from datetime import datetime
+from config import Config
 from models.predictor import ModelPredictor
+from models.deadline import Deadline, DeadlineExceeded
+from api.admission import admit, admission_report, get_controller, overloaded_response, Overloaded
+from models.training_jobs import get_job_manager
+from models.rescoring import rescore_pending, RescoringInProgress
+from models.shadow import ShadowEvaluator
+from models import similarity_index
 
 logger = logging.getLogger(__name__)
 
 # Create blueprint
 api_bp = Blueprint('api', __name__, url_prefix='/api/ml')
 
-# Initialize predictor (will be loaded on first request)
+# Predictor, loaded and warmed at startup (warm_up_models) or on first request as a fallback
 predictor = None
+_predictor_lock = threading.Lock()
+
+# Readiness reported by /ready: set once a warmed-up predictor is serving
+readiness = {
+    'ready': False,
+    'status': 'starting',
+    'load_seconds': None,
+    'warmup_seconds': None,
+    'ready_since': None,
+    'error': None
+}
+
+# Retry-After of requests answered 503 while the startup warm-up is loading the models
+WARMUP_RETRY_AFTER_SECONDS = 5
+
+class ModelsWarmingUp(Exception):
+    """The startup warm-up is still loading the models (answered with 503)"""
+
+# Challenger model set scored in shadow mode (only when SHADOW_MODELS_DIR is set)
+shadow_evaluator = None
+_shadow_lock = threading.Lock()
+
+def get_shadow_evaluator():
+    """Lazy load the challenger models; None when shadow mode is disabled or they fail to load"""
+    global shadow_evaluator
+    if not Config.SHADOW_MODELS_DIR:
+        return None
+    with _shadow_lock:
+        if shadow_evaluator is None:
+            try:
+                challenger = ModelPredictor(models_dir=Config.SHADOW_MODELS_DIR)
+            except Exception as e:
+                logger.error(f"Shadow mode disabled, challenger models failed to load: {str(e)}")
+                Config.SHADOW_MODELS_DIR = None
+                return None
+            shadow_evaluator = ShadowEvaluator(
+                challenger,
+                sample_rate=Config.SHADOW_SAMPLE_RATE,
+                queue_size=Config.SHADOW_QUEUE_SIZE,
+                models_dir=Config.SHADOW_MODELS_DIR
+            )
+            logger.info(f"Shadow mode enabled with challenger models from {Config.SHADOW_MODELS_DIR}")
+    return shadow_evaluator
+
+def _new_predictor():
+    pred = ModelPredictor()
+    pred.shadow = get_shadow_evaluator()
+    return pred
+
+def models_warming_up():
+    """True while the startup warm-up runs and no predictor is serving yet"""
+    return predictor is None and readiness['status'] == 'warming_up'
 
 def get_predictor():
-    """Lazy load predictor"""
+    """
+    Serving predictor. Loaded lazily only when there is no startup warm-up
+    (disabled or failed); while it runs, raises ModelsWarmingUp instead of
+    cold-loading a second copy in the request thread.
+    """
     global predictor
     if predictor is None:
-        predictor = ModelPredictor()
+        if models_warming_up():
+            raise ModelsWarmingUp("Models are still loading")
+        with _predictor_lock:
+            if predictor is None:
+                predictor = _new_predictor()
     return predictor
 
+def warm_up_models():
+    """
+    Load the models and run the warm-up predictions, then swap the new predictor in.
+    The previous predictor (if any) keeps serving until the swap, and also when
+    the new models fail to load. Returns True on success.
+    """
+    global predictor
+    if not readiness['ready']:
+        readiness['status'] = 'warming_up'
+    try:
+        started = time.perf_counter()
+        pred = _new_predictor()
+        load_seconds = time.perf_counter() - started
+        warmup = pred.warm_up()
+    except Exception as e:
+        logger.error(f"Model warm-up failed: {str(e)}")
+        readiness['error'] = str(e)
+        if not readiness['ready']:
+            readiness['status'] = 'not_ready'
+        return False
+    
+    with _predictor_lock:
+        predictor = pred
+    readiness.update(
+        ready=True,
+        status='ready',
+        load_seconds=round(load_seconds, 4),
+        warmup_seconds=warmup['seconds'],
+        ready_since=datetime.now().isoformat(),
+        error=None
+    )
+    return True
+
+def warm_up_models_async():
+    """Warm up on a background thread so /health answers while the models load"""
+    # Set before the thread starts so that no request can slip into a lazy load
+    if not readiness['ready']:
+        readiness['status'] = 'warming_up'
+    thread = threading.Thread(target=warm_up_models, name='model-warmup', daemon=True)
+    thread.start()
+    return thread
+
+def current_drift_report():
+    """Drift report of the loaded predictor (None until models are loaded or without a reference)"""
+    pred = predictor
+    if pred is None or pred.drift is None:
+        return None
+    return pred.drift.report()
+
+def refresh_similarity_index():
+    """Incremental update of the loaded similarity index (None when no index is loaded)"""
+    pred = predictor
+    index = pred.models.get('similarity_index') if pred is not None else None
+    if index is None:
+        return None
+    return similarity_index.refresh(index)
+
+def reset_predictor(job=None):
+    """Swap in the newly trained models: loaded and warmed first, or lazily on the next request"""
+    global predictor
+    if Config.WARMUP_ON_STARTUP:
+        warm_up_models()
+    else:
+        predictor = None
+    # Comparisons against the previous live models no longer apply
+    if shadow_evaluator is not None:
+        shadow_evaluator.reset()
+
+def _rescore_in_background():
+    try:
+        rescore_pending(get_predictor())
+    except RescoringInProgress:
+        logger.info("Rescoring already running, post-training run skipped")
+    except Exception as e:
+        logger.error(f"Post-training rescoring failed: {str(e)}")
+
+def rescore_after_training(job=None):
+    """Rescore pending solicitudes with the new models (off the job monitor thread)"""
+    threading.Thread(target=_rescore_in_background, name='rescoring', daemon=True).start()
+
+# Reload predictor with new models whenever a training job completes
+get_job_manager().add_listener(reset_predictor)
+if Config.RESCORE_AFTER_TRAINING:
+    get_job_manager().add_listener(rescore_after_training)
+
+def warming_up_response():
+    """503 with Retry-After for a request that arrived during the startup warm-up"""
+    response = jsonify({
+        'error': 'Models not ready',
+        'message': 'Models are still loading, retry shortly',
+        'retry_after': WARMUP_RETRY_AFTER_SECONDS
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(WARMUP_RETRY_AFTER_SECONDS)
+    return response
+
+def requires_models(view):
+    """View decorator: 503 instead of running the view while the startup warm-up is loading the models"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if models_warming_up():
+            return warming_up_response()
+        return view(*args, **kwargs)
+    return wrapper
+
+def numpy_to_python(obj):
+    """Convert numpy types to Python native types"""
+    if isinstance(obj, np.integer):
+        return int(obj)
+    elif isinstance(obj, np.floating):
+        return float(obj)
+    elif isinstance(obj, np.ndarray):
+        return obj.tolist()
+    elif isinstance(obj, dict):
+        return {key: numpy_to_python(value) for key, value in obj.items()}
+    elif isinstance(obj, (list, tuple)):
+        return [numpy_to_python(item) for item in obj]
+    else:
+        return obj
+
 @api_bp.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -26,7 +217,29 @@ def health_check():
         'service': 'ml-service'
     }), 200
 
+@api_bp.route('/ready', methods=['GET'])
+def ready_check():
+    """
+    Readiness: 200 once the models are loaded and warmed up, 503 before that
+    
+    Response:
+    {
+        "ready": bool,
+        "status": "starting" | "warming_up" | "ready" | "not_ready" | "lazy_loading",
+        "load_seconds": float,
+        "warmup_seconds": float,
+        "ready_since": str,
+        "error": str | null
+    }
+    """
+    if not Config.WARMUP_ON_STARTUP:
+        # Models are loaded on the first prediction
+        return jsonify({**readiness, 'ready': True, 'status': 'lazy_loading'}), 200
+    return jsonify(readiness), 200 if readiness['ready'] else 503
+
 @api_bp.route('/models/status', methods=['GET'])
+@requires_models
+@admit('status')
 def models_status():
     """Get status of loaded models"""
     try:
@@ -40,7 +253,74 @@ def models_status():
             'message': str(e)
         }), 500
 
+@api_bp.route('/drift', methods=['GET'])
+@requires_models
+@admit('status')
+def drift_status():
+    """
+    Input drift of live requests against the training data
+    
+    Response:
+    {
+        "samples": int,
+        "drift_detected": bool,
+        "drifted_features": [str],
+        "features": {"dias_solicitados": {"psi": float, "ks": float}, "tipo_permiso_real": {"psi": float}, ...}
+    }
+    """
+    try:
+        pred = get_predictor()
+        if pred.drift is None:
+            return jsonify({
+                'error': 'No drift reference',
+                'message': 'Retrain the models to store reference histograms'
+            }), 404
+        return jsonify(numpy_to_python(pred.drift.report())), 200
+    except Exception as e:
+        logger.error(f"Failed to get drift status: {str(e)}")
+        return jsonify({
+            'error': 'Failed to get drift status',
+            'message': str(e)
+        }), 500
+
+@api_bp.route('/shadow', methods=['GET'])
+@admit('status')
+def shadow_status():
+    """
+    Agreement and latency deltas of the challenger model set (shadow mode)
+    
+    Response:
+    {
+        "enabled": bool,
+        "sample_rate": float,
+        "seen": int, "sampled": int, "dropped": int, "scored": int, "errors": int,
+        "full_agreement_rate": float,
+        "stages": {"decision": {"compared": int, "agreement_rate": float, "latency_delta_ms": float}, ...}
+    }
+    """
+    evaluator = get_shadow_evaluator()
+    if evaluator is None:
+        return jsonify({'enabled': False}), 200
+    return jsonify(numpy_to_python(evaluator.report())), 200
+
+@api_bp.route('/admission', methods=['GET'])
+def admission_status():
+    """
+    Concurrency limits, queue depth and rejections per endpoint class
+    
+    Response:
+    {
+        "enabled": bool,
+        "classes": {"predict": {"max_concurrent": int, "max_queue": int, "active": int,
+                                "queue_depth": int, "peak_queue_depth": int, "admitted": int,
+                                "rejected_queue_full": int, "rejected_timeout": int,
+                                "mean_wait_ms": float, "service_time_ms": float}, ...}
+    }
+    """
+    return jsonify(admission_report()), 200
+
 @api_bp.route('/predict', methods=['POST'])
+@requires_models
 def predict():
     """
     Make predictions for a new leave request
@@ -51,7 +331,8 @@ def predict():
         "dias_solicitados": int,
         "motivo_texto": str,
         "fecha_inicio": str (YYYY-MM-DD),
-        "fecha_fin": str (YYYY-MM-DD)
+        "fecha_fin": str (YYYY-MM-DD),
+        "deadline_ms": int (optional, also X-Deadline-Ms header; default PREDICT_DEADLINE_MS)
     }
     
     Response:
@@ -67,10 +348,18 @@ def predict():
         },
         "resultado_rrhh": str,
         "segmento_ml": int,
-        "ml_dias_sugeridos": int
+        "ml_dias_sugeridos": int,
+        "degradado": bool,
+        "etapas_degradadas": {"segment": "cache" | "empleado" | "default", "suggest_days": ...}
     }
+    
+    504 if the deadline was spent before the models could run; 429/503 with
+    Retry-After when the service is at its ADMISSION_PREDICT_* limits.
     """
     try:
+        # The budget starts counting when the request is received
+        received = time.perf_counter()
+        
         # Validate request
         data = request.get_json()
         
@@ -81,31 +370,33 @@ def predict():
                     'error': f'Missing required field: {field}'
                 }), 400
         
-        # Make prediction
+        deadline = Deadline.from_request(
+            data.get('deadline_ms', request.headers.get('X-Deadline-Ms')),
+            Config.PREDICT_DEADLINE_MS,
+            Config.PREDICT_DEADLINE_RESERVE_MS,
+            started=received
+        )
+        
+        # Make prediction (waiting for a slot at most until the deadline)
         pred = get_predictor()
-        predictions = pred.predict(data)
+        if Config.ADMISSION_ENABLED:
+            with get_controller('predict').slot(deadline.remaining() if deadline is not None else None):
+                predictions = pred.predict(data, deadline=deadline)
+        else:
+            predictions = pred.predict(data, deadline=deadline)
         
         # Convert numpy types to Python native types for JSON serialization
-        def numpy_to_python(obj):
-            """Convert numpy types to Python native types"""
-            import numpy as np
-            if isinstance(obj, np.integer):
-                return int(obj)
-            elif isinstance(obj, np.floating):
-                return float(obj)
-            elif isinstance(obj, np.ndarray):
-                return obj.tolist()
-            elif isinstance(obj, dict):
-                return {key: numpy_to_python(value) for key, value in obj.items()}
-            elif isinstance(obj, list):
-                return [numpy_to_python(item) for item in obj]
-            else:
-                return obj
-        
         predictions = numpy_to_python(predictions)
         
         return jsonify(predictions), 200
         
+    except Overloaded as e:
+        return overloaded_response(e)
+    except DeadlineExceeded as e:
+        return jsonify({
+            'error': 'Deadline exceeded',
+            'message': str(e)
+        }), 504
     except ValueError as e:
         logger.error(f"Validation error: {str(e)}")
         return jsonify({
@@ -119,46 +410,184 @@ def predict():
             'message': str(e)
         }), 500
 
-@api_bp.route('/train', methods=['POST'])
-def train_models():
+@api_bp.route('/similar', methods=['POST'])
+@requires_models
+@admit('predict')
+def similar_requests():
     """
-    Train/retrain all ML models with current database data
+    Past decided solicitudes most similar to a request, by motivo_texto and employee features
+    
+    Request body:
+    {
+        "motivo_texto": str,
+        "empleado_id": int (optional, employee features are read from the database),
+        "edad": int, "antiguedad_anios": int, "dias_ult_ano": int, "dias_solicitados": int (optional),
+        "solicitud_id": int (optional, excluded from the results),
+        "k": int (default SIMILAR_DEFAULT_K)
+    }
     
     Response:
     {
-        "status": "success",
-        "metrics": {
-            "naive_bayes_accuracy": float,
-            "svm_anomaly_rate": float,
-            ...
-        }
+        "similares": [{"solicitud_id": int, "empleado_id": int, "motivo_texto": str,
+                       "tipo_permiso_real": str, "resultado_rrhh": str, "dias_solicitados": float,
+                       "similitud": float, "similitud_texto": float, "similitud_empleado": float}],
+        "total": int
     }
     """
     try:
-        logger.info("Starting model training...")
+        data = request.get_json() or {}
+        if not data.get('motivo_texto'):
+            return jsonify({
+                'error': 'Missing required field: motivo_texto'
+            }), 400
+        try:
+            k = int(data.get('k') or Config.SIMILAR_DEFAULT_K)
+        except (TypeError, ValueError):
+            k = 0
+        if k < 1 or k > 100:
+            return jsonify({'error': 'k must be between 1 and 100'}), 400
         
-        trainer = ModelTrainer()
-        metrics = trainer.train_all_models()
+        similares = get_predictor().find_similar(data, k)
+        return jsonify({
+            'similares': numpy_to_python(similares),
+            'total': len(similares)
+        }), 200
+        
+    except LookupError as e:
+        return jsonify({
+            'error': 'Similarity index not available',
+            'message': str(e)
+        }), 404
+    except Exception as e:
+        logger.error(f"Similar requests search failed: {str(e)}")
+        return jsonify({
+            'error': 'Similar requests search failed',
+            'message': str(e)
+        }), 500
+
+@api_bp.route('/similar/refresh', methods=['POST'])
+@requires_models
+@admit('batch')
+def similar_refresh():
+    """
+    Add the solicitudes decided since the last update to the similarity index
+    
+    Response:
+    {
+        "added": int,
+        "index": {"rows": int, "documents": int, "terms": int, "postings": int, "watermark": str}
+    }
+    """
+    try:
+        index = get_predictor().models.get('similarity_index')
+        if index is None:
+            return jsonify({
+                'error': 'Similarity index not available',
+                'message': 'Please train models first'
+            }), 404
+        added = similarity_index.refresh(index)
+        return jsonify({
+            'added': added,
+            'index': numpy_to_python(index.stats())
+        }), 200
+    except Exception as e:
+        logger.error(f"Similarity index refresh failed: {str(e)}")
+        return jsonify({
+            'error': 'Similarity index refresh failed',
+            'message': str(e)
+        }), 500
+
+@api_bp.route('/train', methods=['POST'])
+@admit('train')
+def train_models():
+    """
+    Submit a training job that retrains all ML models with current database data.
+    Training runs in a separate, lower-priority process; poll GET /train/<job_id>.
+    
+    Query params:
+        force: 'true' to retrain every stage even if its inputs did not change
+    
+    Response (202):
+    {
+        "status": "accepted",
+        "job_id": str,
+        "job": {...}
+    }
+    """
+    try:
+        force = request.args.get('force', 'false').lower() == 'true'
+        job, created = get_job_manager().submit(force=force, source='api')
         
-        # Reload predictor with new models
-        global predictor
-        predictor = None  # Force reload on next prediction
+        return jsonify({
+            'status': 'accepted' if created else 'already_running',
+            'message': 'Training job submitted' if created else 'A training job is already running',
+            'job_id': job['job_id'],
+            'job': numpy_to_python(job)
+        }), 202
         
+    except Exception as e:
+        logger.error(f"Failed to submit training job: {str(e)}")
+        return jsonify({
+            'error': 'Training failed',
+            'message': str(e)
+        }), 500
+
+@api_bp.route('/train/<job_id>', methods=['GET'])
+@admit('status')
+def training_job_status(job_id):
+    """
+    Get progress, per-stage timings and final metrics of a training job
+    
+    Response:
+    {
+        "job_id": str,
+        "status": "running" | "completed" | "failed",
+        "progress": float,
+        "current_stage": str,
+        "stages": {"naive_bayes": {"status": "trained", "seconds": float}, ...},
+        "metrics": {...}
+    }
+    """
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return jsonify({
+            'error': 'Training job not found',
+            'job_id': job_id
+        }), 404
+    return jsonify(numpy_to_python(job)), 200
+
+@api_bp.route('/rescore', methods=['POST'])
+@requires_models
+@admit('batch')
+def rescore():
+    """
+    Rescore every PENDIENTE solicitud with the current models (set-based, chunked)
+    
+    Query params:
+        chunk_size: rows per chunk (default RESCORE_CHUNK_SIZE)
+    
+    Response:
+    {
+        "status": "success",
+        "summary": {"rows": int, "chunks": int, "seconds": float, "rows_per_second": float, ...}
+    }
+    """
+    try:
+        chunk_size = request.args.get('chunk_size', type=int)
+        summary = rescore_pending(get_predictor(), chunk_size)
         return jsonify({
             'status': 'success',
-            'message': 'Models trained successfully',
-            'metrics': metrics
+            'summary': numpy_to_python(summary)
         }), 200
         
-    except ValueError as e:
-        logger.error(f"Training validation error: {str(e)}")
+    except RescoringInProgress as e:
         return jsonify({
-            'error': 'Training validation error',
+            'error': 'Rescoring already running',
             'message': str(e)
-        }), 400
+        }), 409
     except Exception as e:
-        logger.error(f"Training failed: {str(e)}")
+        logger.error(f"Rescoring failed: {str(e)}")
         return jsonify({
-            'error': 'Training failed',
+            'error': 'Rescoring failed',
             'message': str(e)
         }), 500
@@ -1,26 +1,22 @@
-from flask import Flask
-from flask_cors import CORS
-from apscheduler.schedulers.background import BackgroundScheduler
 import logging
-import sys
 from config import Config
-from api.routes import api_bp
-from models.trainer import ModelTrainer
+from log_config import configure_logging
 
-# Configure logging
-logging.basicConfig(
-    level=getattr(logging, Config.LOG_LEVEL),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(Config.LOG_FILE),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+# Importing this module must stay cheap and side-effect free: the spawned training
+# process re-imports it as __mp_main__, so logging is configured in create_app()
+# and the serving stack (Flask, routes, models) is imported inside the functions.
 
 logger = logging.getLogger(__name__)
 
 def create_app():
     """Create and configure Flask application"""
+    from flask import Flask
+    from flask_cors import CORS
+    from api.routes import api_bp, warm_up_models_async
+    
+    # Configure logging (queued: file and console writes happen on a background thread)
+    configure_logging()
+    
     app = Flask(__name__)
     
     # Enable CORS
@@ -32,36 +28,113 @@ def create_app():
     # Ensure directories exist
     Config.ensure_directories()
     
+    # Load and warm the models before /api/ml/ready reports ready
+    if Config.WARMUP_ON_STARTUP:
+        warm_up_models_async()
+    
     logger.info("ML Service started successfully")
     
     return app
 
 def train_models_job():
-    """Background job to retrain models periodically"""
+    """Submit a training job to the isolated training process"""
+    from models.training_jobs import get_job_manager
     try:
-        logger.info("Starting scheduled model training...")
-        trainer = ModelTrainer()
-        metrics = trainer.train_all_models()
-        logger.info(f"Scheduled training completed. Metrics: {metrics}")
+        job, created = get_job_manager().submit(source='scheduler')
+        if created:
+            logger.info(f"Scheduled training submitted as job {job['job_id']}")
+        else:
+            logger.info(f"Training job {job['job_id']} already running, scheduled run skipped")
     except Exception as e:
         logger.error(f"Scheduled training failed: {str(e)}")
 
+def check_retraining_job(trigger):
+    """Background job that polls cheap signals and retrains only when thresholds are crossed"""
+    from models.training_jobs import get_job_manager
+    try:
+        if get_job_manager().active_job() is not None:
+            return
+        decision = trigger.evaluate()
+        if not decision['should_train']:
+            logger.debug(f"Retraining not needed: {decision}")
+            return
+        logger.info(f"Retraining triggered: {decision['reason']}")
+        trigger.mark_triggered()
+        train_models_job()
+    except Exception as e:
+        logger.error(f"Retraining check failed: {str(e)}")
+
+def rebuild_leave_aggregates_job():
+    """Daily rebuild of the per-employee leave aggregates (ages the 30/90/365 day windows)"""
+    from models.data_loader import DataLoader
+    from database import leave_aggregates
+    try:
+        leave_aggregates.rebuild()
+        # Re-enable aggregate reads if an earlier lookup had failed
+        DataLoader.aggregates_available = None
+    except Exception as e:
+        logger.error(f"Leave aggregates rebuild failed: {str(e)}")
+
+def refresh_similarity_index_job():
+    """Add newly decided solicitudes to the similar-requests index between trainings"""
+    from api.routes import refresh_similarity_index
+    try:
+        refresh_similarity_index()
+    except Exception as e:
+        logger.error(f"Similarity index refresh failed: {str(e)}")
+
 def setup_scheduler(app):
-    """Setup background scheduler for automatic model retraining"""
+    """Setup background scheduler for change-driven model retraining"""
+    from apscheduler.schedulers.background import BackgroundScheduler
+    from api.routes import current_drift_report
+    from models.retrain_trigger import RetrainTrigger
+    
     scheduler = BackgroundScheduler()
+    trigger = RetrainTrigger(drift_source=current_drift_report)
     
-    # Schedule training every X hours (configured in Config)
+    # Poll retraining signals every X minutes (configured in Config)
     scheduler.add_job(
-        func=train_models_job,
+        func=check_retraining_job,
+        args=[trigger],
         trigger="interval",
-        hours=Config.TRAINING_SCHEDULE_HOURS,
+        minutes=Config.RETRAIN_POLL_MINUTES,
         id='model_training',
-        name='Automatic model retraining',
+        name='Change-driven model retraining',
+        max_instances=1,
+        coalesce=True,
         replace_existing=True
     )
     
+    if Config.LEAVE_AGGREGATES_ENABLED:
+        scheduler.add_job(
+            func=rebuild_leave_aggregates_job,
+            trigger="cron",
+            hour=Config.LEAVE_AGGREGATES_REBUILD_HOUR,
+            id='leave_aggregates_rebuild',
+            name='Daily leave aggregates rebuild',
+            max_instances=1,
+            coalesce=True,
+            replace_existing=True
+        )
+
+    if Config.SIMILAR_REFRESH_MINUTES > 0:
+        scheduler.add_job(
+            func=refresh_similarity_index_job,
+            trigger="interval",
+            minutes=Config.SIMILAR_REFRESH_MINUTES,
+            id='similarity_index_refresh',
+            name='Similar requests index refresh',
+            max_instances=1,
+            coalesce=True,
+            replace_existing=True
+        )
+
     scheduler.start()
-    logger.info(f"Scheduler started. Models will retrain every {Config.TRAINING_SCHEDULE_HOURS} hours")
+    logger.info(
+        f"Scheduler started. Retraining signals checked every {Config.RETRAIN_POLL_MINUTES} minutes "
+        f"(min new labels: {Config.RETRAIN_MIN_NEW_LABELS}, "
+        f"label drift threshold: {Config.RETRAIN_LABEL_DRIFT_THRESHOLD})"
+    )
     
     return scheduler
 
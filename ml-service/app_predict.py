@@ -5,12 +5,25 @@ ML-based leave approval probability prediction
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 import joblib
-import pandas as pd
+import logging
 import numpy as np
+import pandas as pd
+from contextlib import asynccontextmanager
 from datetime import datetime
 import os
-from models import PredictionRequest, PredictionResponse, HealthResponse
+from models import (
+    PredictionRequest, PredictionResponse, BatchPredictionRequest, BatchPredictionResponse, HealthResponse
+)
+from category_encoding import FEATURE_COLUMNS, UNKNOWN_CODE, maps_from_label_encoders
+from log_config import configure_logging, SAMPLED
+from config import Config
+from api.admission import AsyncAdmissionController, Overloaded, build_controllers
+
+# Queued logging: request handlers never wait on disk or terminal I/O
+configure_logging(log_file=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs', 'predict_service.log'))
+logger = logging.getLogger(__name__)
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -31,37 +44,155 @@ app.add_middleware(
 # Global variables for model and encoders
 model = None
 label_encoders = None
+category_maps = None
+feature_plan = None  # [(feature_name, category map or None)] in the model's feature order
+feature_index = None  # Column names the model was fitted with (None if fitted on an array)
+
+CONFIDENCE_LEVELS = [
+    (0.8, "ALTA", "Alta probabilidad de aprobación"),
+    (0.6, "MEDIA-ALTA", "Buena probabilidad de aprobación"),
+    (0.4, "MEDIA", "Probabilidad moderada de aprobación"),
+    (0.2, "MEDIA-BAJA", "Baja probabilidad de aprobación"),
+    (0.0, "BAJA", "Muy baja probabilidad de aprobación"),
+]
 
+# Concurrency limit + bounded wait queue per endpoint class (ADMISSION_* settings)
+admission = build_controllers(AsyncAdmissionController)
 
 def load_model_artifacts():
     """
     Load trained model and label encoders
     """
-    global model, label_encoders
+    global model, label_encoders, category_maps, feature_plan, feature_index
     
     try:
         if os.path.exists('model.pkl') and os.path.exists('label_encoders.pkl'):
             model = joblib.load('model.pkl')
             label_encoders = joblib.load('label_encoders.pkl')
-            print("✓ Model and encoders loaded successfully")
+            # Precomputed category -> code maps (derived from the encoders for older artifacts)
+            if os.path.exists('category_maps.pkl'):
+                category_maps = joblib.load('category_maps.pkl')
+            else:
+                category_maps = maps_from_label_encoders(label_encoders)
+            feature_names = list(getattr(model, 'feature_names_in_', FEATURE_COLUMNS))
+            feature_plan = [(name, category_maps.get(name)) for name in feature_names]
+            # Built once: every scored matrix is wrapped in a frame with these columns
+            feature_index = pd.Index(feature_names) if hasattr(model, 'feature_names_in_') else None
+            logger.info("Model and encoders loaded successfully")
             return True
         else:
-            print("⚠ Model files not found. Please run train.py first.")
+            logger.warning("Model files not found. Please run train.py first.")
             return False
     except Exception as e:
-        print(f"✗ Error loading model: {e}")
+        logger.error(f"Error loading model: {e}")
         return False
 
 
+def assemble_features(requests):
+    """
+    Map PredictionRequests into a float64 matrix in the model's feature order,
+    wrapped in a DataFrame with the fitted column names when the model has them
+    (the frame reuses the array, no copy). Categorical values are encoded with the
+    category maps (unknown -> UNKNOWN_CODE); the unknown values are logged once per
+    call, not once per row.
+    """
+    X = np.empty((len(requests), len(feature_plan)), dtype=np.float64)
+    unknown = {}
+    for row, request in enumerate(requests):
+        for col, (name, mapping) in enumerate(feature_plan):
+            value = getattr(request, name)
+            if mapping is not None:
+                code = mapping.get(str(value))
+                if code is None:
+                    unknown.setdefault(name, set()).add(str(value))
+                    code = UNKNOWN_CODE
+                value = code
+            X[row, col] = value
+    if unknown:
+        # Sampled: a client sending an unseen category would otherwise log on every request
+        logger.info("Unknown categorical values, using unknown code: %s",
+                    "; ".join(f"{name}={sorted(values)}" for name, values in unknown.items()),
+                    extra=SAMPLED)
+    if feature_index is not None:
+        return pd.DataFrame(X, columns=feature_index, copy=False)
+    return X
+
+
+def confidence_level(probability):
+    """Confidence label and message for an approval probability"""
+    for threshold, confianza, mensaje in CONFIDENCE_LEVELS:
+        if probability >= threshold:
+            return confianza, mensaje
+    return CONFIDENCE_LEVELS[-1][1], CONFIDENCE_LEVELS[-1][2]
+
+
+@asynccontextmanager
+async def admitted(endpoint_class):
+    """Run the block in an admission slot; 429/503 with Retry-After when overloaded"""
+    if not Config.ADMISSION_ENABLED:
+        yield
+        return
+    try:
+        async with admission[endpoint_class].slot():
+            yield
+    except Overloaded as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=f"Service overloaded: {e.reason}",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+
+def score_request(request):
+    """Approval probability of one request (runs in the thread pool)"""
+    # Map the request straight into a feature row (no DataFrame)
+    X = assemble_features([request])
+    
+    # Make prediction
+    probability = float(model.predict_proba(X)[0][1])  # Probability of approval (class 1)
+    confianza, mensaje = confidence_level(probability)
+    
+    # Log prediction (sampled, see LOG_SAMPLE_RATE)
+    logger.info("Prediction: %.4f (%s) - %s, %s días", probability, confianza,
+                request.tipo_permiso_real, request.dias_solicitados, extra=SAMPLED)
+    
+    return {
+        "probabilidad_aprobacion": round(probability, 4),
+        "confianza": confianza,
+        "mensaje": mensaje
+    }
+
+
+def score_batch(solicitudes):
+    """Approval probabilities of many requests with one predict_proba call (runs in the thread pool)"""
+    X = assemble_features(solicitudes)
+    probabilities = model.predict_proba(X)[:, 1]
+    
+    predicciones = []
+    for probability in probabilities.tolist():
+        confianza, mensaje = confidence_level(probability)
+        predicciones.append({
+            "probabilidad_aprobacion": round(probability, 4),
+            "confianza": confianza,
+            "mensaje": mensaje
+        })
+    
+    logger.info("Batch prediction: %d requests, mean probability %.4f", len(predicciones),
+                probabilities.mean(), extra=SAMPLED)
+    
+    return {
+        "predicciones": predicciones,
+        "total": len(predicciones)
+    }
+
+
 # Load model on startup
 @app.on_event("startup")
 async def startup_event():
     """
     Load model when service starts
     """
-    print("=" * 60)
-    print("Starting ML Prediction Service...")
-    print("=" * 60)
+    logger.info("Starting ML Prediction Service...")
     load_model_artifacts()
 
 
@@ -77,7 +208,9 @@ async def root():
         "model_loaded": model is not None,
         "endpoints": {
             "predict": "/predict",
+            "predict_batch": "/predict/batch",
             "health": "/health",
+            "admission": "/admission",
             "docs": "/docs"
         }
     }
@@ -95,6 +228,17 @@ async def health_check():
     }
 
 
+@app.get("/admission", tags=["Health"])
+async def admission_status():
+    """
+    Concurrency limits, queue depth and rejections per endpoint class
+    """
+    return {
+        "enabled": Config.ADMISSION_ENABLED,
+        "classes": {name: controller.report() for name, controller in admission.items()}
+    }
+
+
 @app.post("/predict", response_model=PredictionResponse, tags=["Prediction"])
 async def predict(request: PredictionRequest):
     """
@@ -103,77 +247,66 @@ async def predict(request: PredictionRequest):
     Returns probability between 0 and 1:
     - 0.0 = Very unlikely to be approved
     - 1.0 = Very likely to be approved
+    
+    Scoring runs in the thread pool, limited by ADMISSION_PREDICT_CONCURRENCY
+    (429/503 with Retry-After when the wait queue is full or times out).
     """
-    if model is None or label_encoders is None:
+    if model is None or category_maps is None:
         raise HTTPException(
             status_code=503,
             detail="Model not loaded. Please train the model first by running train.py"
         )
     
     try:
-        # Convert request to DataFrame
-        data = pd.DataFrame([request.dict()])
-        
-        # Preprocess features
-        categorical_cols = ['genero', 'estado_civil', 'area', 'cargo', 'tipo_contrato', 
-                           'sede', 'tipo_permiso_real', 'impacto_area']
-        
-        for col in categorical_cols:
-            if col in label_encoders:
-                le = label_encoders[col]
-                value = str(data[col].iloc[0])
-                
-                # Handle unknown categories
-                if value in le.classes_:
-                    data[col] = le.transform([value])[0]
-                else:
-                    # Use most common class for unknown values
-                    data[col] = 0
-                    print(f"⚠ Unknown value '{value}' for {col}, using default")
-        
-        # Make prediction
-        probability = model.predict_proba(data)[0][1]  # Probability of approval (class 1)
-        
-        # Determine confidence level
-        if probability >= 0.8:
-            confianza = "ALTA"
-            mensaje = "Alta probabilidad de aprobación"
-        elif probability >= 0.6:
-            confianza = "MEDIA-ALTA"
-            mensaje = "Buena probabilidad de aprobación"
-        elif probability >= 0.4:
-            confianza = "MEDIA"
-            mensaje = "Probabilidad moderada de aprobación"
-        elif probability >= 0.2:
-            confianza = "MEDIA-BAJA"
-            mensaje = "Baja probabilidad de aprobación"
-        else:
-            confianza = "BAJA"
-            mensaje = "Muy baja probabilidad de aprobación"
-        
-        # Log prediction
-        print(f"📊 Prediction: {probability:.4f} ({confianza}) - {request.tipo_permiso_real}, {request.dias_solicitados} días")
-        
-        return {
-            "probabilidad_aprobacion": round(probability, 4),
-            "confianza": confianza,
-            "mensaje": mensaje
-        }
+        async with admitted("predict"):
+            return await run_in_threadpool(score_request, request)
         
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"✗ Prediction error: {e}")
+        logger.error(f"Prediction error: {e}")
         raise HTTPException(
             status_code=500,
             detail=f"Error making prediction: {str(e)}"
         )
 
 
+@app.post("/predict/batch", response_model=BatchPredictionResponse, tags=["Prediction"])
+async def predict_batch(request: BatchPredictionRequest):
+    """
+    Predict approval probability for many leave requests in one call
+    
+    All requests are assembled into one feature matrix and scored with a
+    single predict_proba call. Results keep the order of `solicitudes`.
+    Limited by ADMISSION_BATCH_CONCURRENCY.
+    """
+    if model is None or category_maps is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Model not loaded. Please train the model first by running train.py"
+        )
+    
+    try:
+        async with admitted("batch"):
+            return await run_in_threadpool(score_batch, request.solicitudes)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch prediction error: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error making batch prediction: {str(e)}"
+        )
+
+
 @app.post("/reload-model", tags=["Admin"])
 async def reload_model():
     """
     Reload model from disk (useful after retraining)
     """
-    success = load_model_artifacts()
+    async with admitted("train"):
+        success = await run_in_threadpool(load_model_artifacts)
     
     if success:
         return {
@@ -197,4 +330,5 @@ if __name__ == "__main__":
     print("API Documentation: http://localhost:8000/docs")
     print("=" * 60 + "\n")
     
-    uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
+    # log_config=None keeps uvicorn's loggers on the queued root handler
+    uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info", log_config=None)
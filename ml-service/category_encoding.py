@@ -0,0 +1,48 @@
+"""
+Categorical encoding shared by train.py and app_predict.py
+
+Label encoders are exported as plain category -> code hash maps, so encoding
+is a dict lookup per value at serve time and one vectorized Series.map per
+column at train time. Codes match sklearn's LabelEncoder (sorted classes);
+unseen categories get UNKNOWN_CODE.
+"""
+import numpy as np
+
+CATEGORICAL_COLUMNS = ['genero', 'estado_civil', 'area', 'cargo', 'tipo_contrato',
+                       'sede', 'tipo_permiso_real', 'impacto_area']
+
+# Feature order of train.py (fallback when a model has no feature_names_in_)
+FEATURE_COLUMNS = ['edad', 'genero', 'estado_civil', 'numero_hijos', 'area', 'cargo',
+                   'antiguedad_anios', 'salario', 'tipo_contrato', 'sede', 'dias_ult_ano',
+                   'dias_solicitados', 'tipo_permiso_real', 'impacto_area', 'sanciones_activas',
+                   'inasistencias']
+
+UNKNOWN_CODE = -1
+
+
+def fit_category_maps(df, columns=CATEGORICAL_COLUMNS):
+    """Build {column: {category: code}} from training data (same codes as LabelEncoder)"""
+    return {
+        col: {category: code for code, category in enumerate(np.unique(df[col].astype(str)))}
+        for col in columns
+    }
+
+
+def maps_from_label_encoders(label_encoders):
+    """Convert fitted LabelEncoders (label_encoders.pkl) into category maps"""
+    return {
+        col: {str(category): code for code, category in enumerate(le.classes_)}
+        for col, le in label_encoders.items()
+    }
+
+
+def encode_frame(df, category_maps):
+    """
+    Return a copy of df with every mapped column encoded.
+    One hash lookup pass per column; unknown categories become UNKNOWN_CODE.
+    """
+    df = df.copy()
+    for col, mapping in category_maps.items():
+        if col in df.columns:
+            df[col] = df[col].astype(str).map(mapping).fillna(UNKNOWN_CODE).astype(np.int64)
+    return df
@@ -39,21 +39,115 @@ class Config:
         'tree': os.path.join(MODELS_DIR, 'modelo_tree.pkl'),
         'kmeans': os.path.join(MODELS_DIR, 'modelo_kmeans.pkl'),
         'scaler': os.path.join(MODELS_DIR, 'scaler.pkl'),
-        'knn': os.path.join(MODELS_DIR, 'modelo_knn.pkl')
+        'knn': os.path.join(MODELS_DIR, 'modelo_knn.pkl'),
+        'similarity_index': os.path.join(MODELS_DIR, 'similarity_index.pkl')
     }
     
     # Training Configuration
-    TRAINING_SCHEDULE_HOURS = int(os.getenv('TRAINING_SCHEDULE_HOURS', '24'))  # Retrain every 24 hours
+    TRAINING_SCHEDULE_HOURS = int(os.getenv('TRAINING_SCHEDULE_HOURS', '24'))  # Max model age once new labels exist
     MIN_TRAINING_SAMPLES = int(os.getenv('MIN_TRAINING_SAMPLES', '100'))  # Minimum samples needed for training
     
+    # Text features: 'tfidf' (fitted vocabulary) or 'hashing' (stateless feature hashing)
+    TEXT_FEATURES_MODE = os.getenv('TEXT_FEATURES_MODE', 'tfidf').lower()
+    HASHING_N_FEATURES = int(os.getenv('HASHING_N_FEATURES', str(2 ** 16)))  # Hash space size in 'hashing' mode
+    HASHING_USE_IDF = os.getenv('HASHING_USE_IDF', 'True').lower() == 'true'  # IDF reweighting in 'hashing' mode
+    
+    # Opt-in model compaction at save time (float32 weights, sparse/pruned text coefficients)
+    MODEL_COMPACTION = os.getenv('MODEL_COMPACTION', 'False').lower() == 'true'
+    COEF_PRUNE_THRESHOLD = float(os.getenv('COEF_PRUNE_THRESHOLD', '0.001'))  # |w| below this is set to 0
+    
+    # Opt-in supervised vocabulary pruning of the text models: 'chi2', 'mutual_info' or 'none' (ignored in 'hashing' mode)
+    VOCAB_SELECTION = os.getenv('VOCAB_SELECTION', 'none').lower()
+    VOCAB_SELECTION_K = int(os.getenv('VOCAB_SELECTION_K', '3000'))  # n-grams kept per text model, 0 = no size limit
+    VOCAB_SELECTION_MIN_SCORE = float(os.getenv('VOCAB_SELECTION_MIN_SCORE', '0'))  # Drop n-grams scoring at or below this
+    VOCAB_SELECTION_MAX_ACCURACY_LOSS = float(os.getenv('VOCAB_SELECTION_MAX_ACCURACY_LOSS', '0.005'))  # Else keep the full vocabulary
+    
+    # Opt-in: fold the cv=3 sigmoid-calibrated logistic ensemble into one linear scorer + one sigmoid per class
+    COLLAPSE_CALIBRATION = os.getenv('COLLAPSE_CALIBRATION', 'False').lower() == 'true'
+    
+    # Change-driven retraining (polls cheap signals instead of retraining on a fixed interval)
+    RETRAIN_POLL_MINUTES = int(os.getenv('RETRAIN_POLL_MINUTES', '15'))  # How often signals are checked
+    RETRAIN_MIN_NEW_LABELS = int(os.getenv('RETRAIN_MIN_NEW_LABELS', '50'))  # New AUTORIZADO/RECHAZADO rows since last training
+    RETRAIN_LABEL_DRIFT_THRESHOLD = float(os.getenv('RETRAIN_LABEL_DRIFT_THRESHOLD', '0.10'))  # Total variation distance of the label mix
+    RETRAIN_MIN_SPACING_HOURS = float(os.getenv('RETRAIN_MIN_SPACING_HOURS', '1'))  # Minimum time between two trainings
+    
+    # Training jobs (run in a separate, lower-priority worker process)
+    TRAINING_NICE = int(os.getenv('TRAINING_NICE', '10'))  # Niceness increment of the training process
+    TRAINING_MAX_MEMORY_MB = int(os.getenv('TRAINING_MAX_MEMORY_MB', '0'))  # Address-space limit, 0 = unlimited
+    TRAINING_MAX_CPU_SECONDS = int(os.getenv('TRAINING_MAX_CPU_SECONDS', '0'))  # CPU time limit, 0 = unlimited
+    TRAINING_MAX_THREADS = int(os.getenv('TRAINING_MAX_THREADS', '1'))  # BLAS/OpenMP threads in the training process
+    TRAINING_JOB_HISTORY = int(os.getenv('TRAINING_JOB_HISTORY', '20'))  # Finished jobs kept for GET /train/<id>
+    
+    # Materialized per-employee leave aggregates (database/add_leave_aggregates.sql)
+    LEAVE_AGGREGATES_ENABLED = os.getenv('LEAVE_AGGREGATES_ENABLED', 'True').lower() == 'true'
+    LEAVE_AGGREGATES_REBUILD_HOUR = int(os.getenv('LEAVE_AGGREGATES_REBUILD_HOUR', '3'))  # Daily rebuild (ages the windows)
+    
+    # Input drift monitoring (models/drift.py)
+    DRIFT_BINS = int(os.getenv('DRIFT_BINS', '10'))  # Quantile bins of the reference histograms
+    DRIFT_PSI_THRESHOLD = float(os.getenv('DRIFT_PSI_THRESHOLD', '0.2'))  # PSI at which a feature counts as drifted
+    DRIFT_MIN_SAMPLES = int(os.getenv('DRIFT_MIN_SAMPLES', '200'))  # Live predictions needed before drift is reported
+    RETRAIN_ON_DRIFT = os.getenv('RETRAIN_ON_DRIFT', 'True').lower() == 'true'
+    
+    # Shadow evaluation of a challenger model set (models/shadow.py); empty = disabled
+    SHADOW_MODELS_DIR = os.getenv('SHADOW_MODELS_DIR') or None
+    SHADOW_SAMPLE_RATE = float(os.getenv('SHADOW_SAMPLE_RATE', '0.1'))  # Fraction of live predictions also scored by the challenger
+    SHADOW_QUEUE_SIZE = int(os.getenv('SHADOW_QUEUE_SIZE', '100'))  # Pending shadow evaluations; extra work is dropped
+    
+    # Suggested days: KNN over the employee history (models/neighbor_index.py)
+    KNN_ENGINE = os.getenv('KNN_ENGINE', 'grid')  # grid (condensed cells), kdtree (every row) or sklearn (unscaled, brute force)
+    KNN_NEIGHBORS = int(os.getenv('KNN_NEIGHBORS', '5'))  # Past requests averaged per suggestion
+    KNN_CELL_SIZE = float(os.getenv('KNN_CELL_SIZE', '1'))  # Grid cell width (feature units) in grid mode
+    
+    # Similar past solicitudes search (models/similarity_index.py)
+    SIMILAR_DEFAULT_K = int(os.getenv('SIMILAR_DEFAULT_K', '5'))  # Results when the request does not send k
+    SIMILAR_TEXT_WEIGHT = float(os.getenv('SIMILAR_TEXT_WEIGHT', '0.7'))  # Share of motivo similarity (rest: employee features)
+    SIMILAR_POSTINGS_LIMIT = int(os.getenv('SIMILAR_POSTINGS_LIMIT', '1000'))  # Documents kept per term, heaviest first
+    SIMILAR_CANDIDATE_DOCS = int(os.getenv('SIMILAR_CANDIDATE_DOCS', '20'))  # Best motivo matches expanded to rows
+    SIMILAR_CANDIDATE_ROWS = int(os.getenv('SIMILAR_CANDIDATE_ROWS', '2000'))  # Rows re-ranked by employee similarity
+    SIMILAR_REFRESH_MINUTES = int(os.getenv('SIMILAR_REFRESH_MINUTES', '10'))  # Incremental update interval, 0 = only at training
+    
+    # Rescoring of pending solicitudes (models/rescoring.py)
+    RESCORE_CHUNK_SIZE = int(os.getenv('RESCORE_CHUNK_SIZE', '5000'))  # Rows scored and updated per chunk
+    RESCORE_AFTER_TRAINING = os.getenv('RESCORE_AFTER_TRAINING', 'True').lower() == 'true'
+    
+    # Bulk loading (synthetic data generators)
+    BULK_BATCH_SIZE = int(os.getenv('BULK_BATCH_SIZE', '5000'))  # Rows per executemany batch
+    
     # API Configuration
     API_PORT = int(os.getenv('API_PORT', '8000'))
     API_HOST = os.getenv('API_HOST', '0.0.0.0')
     DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
+    LATENCY_WINDOW = int(os.getenv('LATENCY_WINDOW', '500'))  # Predictions kept for rolling latency stats
+    WARMUP_ON_STARTUP = os.getenv('WARMUP_ON_STARTUP', 'True').lower() == 'true'  # Load and warm models before /ready
+    WARMUP_ITERATIONS = int(os.getenv('WARMUP_ITERATIONS', '5'))  # Passes over the synthetic warm-up requests
+    
+    # Deadline-aware prediction (models/deadline.py)
+    PREDICT_DEADLINE_MS = float(os.getenv('PREDICT_DEADLINE_MS', '3000'))  # Budget when the request sends none, 0 = unlimited
+    PREDICT_DEADLINE_RESERVE_MS = float(os.getenv('PREDICT_DEADLINE_RESERVE_MS', '50'))  # Kept for serializing the response
+    PREDICT_STAGE_ESTIMATE_MS = float(os.getenv('PREDICT_STAGE_ESTIMATE_MS', '5'))  # Stage cost before any latency is recorded
+    PREDICT_FALLBACK_CACHE_SIZE = int(os.getenv('PREDICT_FALLBACK_CACHE_SIZE', '10000'))  # Employees whose last segment/suggestion is kept
+    
+    # Admission control per endpoint class (api/admission.py)
+    ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', 'True').lower() == 'true'
+    ADMISSION_QUEUE_TIMEOUT_MS = float(os.getenv('ADMISSION_QUEUE_TIMEOUT_MS', '1000'))  # Longest wait for a slot before 503
+    ADMISSION_PREDICT_CONCURRENCY = int(os.getenv('ADMISSION_PREDICT_CONCURRENCY', '8'))  # Predictions in flight
+    ADMISSION_PREDICT_QUEUE = int(os.getenv('ADMISSION_PREDICT_QUEUE', '16'))  # Predictions waiting; more are rejected (429)
+    ADMISSION_BATCH_CONCURRENCY = int(os.getenv('ADMISSION_BATCH_CONCURRENCY', '1'))  # Rescoring / batch scoring
+    ADMISSION_BATCH_QUEUE = int(os.getenv('ADMISSION_BATCH_QUEUE', '2'))
+    ADMISSION_TRAIN_CONCURRENCY = int(os.getenv('ADMISSION_TRAIN_CONCURRENCY', '1'))  # Training submissions
+    ADMISSION_TRAIN_QUEUE = int(os.getenv('ADMISSION_TRAIN_QUEUE', '2'))
+    ADMISSION_STATUS_CONCURRENCY = int(os.getenv('ADMISSION_STATUS_CONCURRENCY', '4'))  # Status, drift, shadow and job reports
+    ADMISSION_STATUS_QUEUE = int(os.getenv('ADMISSION_STATUS_QUEUE', '8'))
     
     # Logging
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
     LOG_FILE = os.path.join(os.path.dirname(__file__), 'logs', 'ml_service.log')
+    LOG_ROTATION = os.getenv('LOG_ROTATION', 'size').lower()  # 'size' or 'time'
+    LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))  # File size before rotating ('size')
+    LOG_ROTATE_WHEN = os.getenv('LOG_ROTATE_WHEN', 'midnight')  # TimedRotatingFileHandler interval ('time')
+    LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', '7'))  # Rotated files kept
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))  # Records buffered for the writer thread; extra ones are dropped
+    LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', '0.1'))  # Fraction of per-request INFO lines kept
     
     @classmethod
     def ensure_directories(cls):
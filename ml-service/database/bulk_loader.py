@@ -0,0 +1,82 @@
+import logging
+import sqlite3
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Columns written by the synthetic data generators, in insert order
+SOLICITUD_INSERT_COLUMNS = [
+    'empleado_id', 'edad', 'genero', 'estado_civil', 'numero_hijos', 'area', 'cargo',
+    'antiguedad_anios', 'salario', 'tipo_contrato', 'sede', 'dias_ult_ano', 'dias_solicitados',
+    'motivo_texto', 'tipo_permiso_real', 'impacto_area', 'es_anomala',
+    'ml_probabilidad_aprobacion', 'sanciones_activas', 'inasistencias',
+    'fecha_inicio', 'fecha_fin', 'resultado_rrhh', 'dias_autorizados'
+]
+
+
+def _batches(rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(tuple(row))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def bulk_insert(connection, table, columns, rows, batch_size=None, input_sizes=None, progress=None):
+    """
+    Insert many rows with batched parameter arrays and a single commit.
+
+    - pyodbc (SQL Server): cursor.fast_executemany sends each batch as one parameter array
+      instead of one round trip per row
+    - sqlite3: plain executemany inside one transaction
+
+    Args:
+        connection: open pyodbc or sqlite3 connection
+        table: target table name
+        columns: column names, in the same order as the values of each row
+        rows: iterable of tuples/lists (consumed lazily, batch by batch)
+        batch_size: rows per executemany call (Config.BULK_BATCH_SIZE by default)
+        input_sizes: optional pyodbc setinputsizes() list, e.g. to bound NVARCHAR(MAX) columns
+        progress: optional callback(inserted_so_far) called after each batch
+
+    Returns:
+        number of inserted rows
+    """
+    batch_size = batch_size or Config.BULK_BATCH_SIZE
+    placeholders = ', '.join('?' for _ in columns)
+    query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+
+    is_sqlite = isinstance(connection, sqlite3.Connection)
+    cursor = connection.cursor()
+    if not is_sqlite:
+        cursor.fast_executemany = True
+        if input_sizes:
+            cursor.setinputsizes(input_sizes)
+
+    inserted = 0
+    try:
+        for batch in _batches(rows, batch_size):
+            cursor.executemany(query, batch)
+            inserted += len(batch)
+            if progress:
+                progress(inserted)
+        connection.commit()
+    except Exception as e:
+        connection.rollback()
+        logger.error(f"Bulk insert into {table} failed after {inserted} rows: {str(e)}")
+        raise
+    finally:
+        cursor.close()
+
+    logger.info(f"Bulk inserted {inserted} rows into {table}")
+    return inserted
+
+
+def motivo_input_sizes(pyodbc_module):
+    """setinputsizes() list for SOLICITUD_INSERT_COLUMNS that bounds motivo_texto (NVARCHAR(MAX))"""
+    sizes = [None] * len(SOLICITUD_INSERT_COLUMNS)
+    sizes[SOLICITUD_INSERT_COLUMNS.index('motivo_texto')] = (pyodbc_module.SQL_WVARCHAR, 1000, 0)
+    return sizes
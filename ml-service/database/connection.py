@@ -1,6 +1,7 @@
 import pyodbc
 import logging
 from config import Config
+from log_config import SAMPLED
 
 logger = logging.getLogger(__name__)
 
@@ -15,7 +16,7 @@ class DatabaseConnection:
         """Establish database connection"""
         try:
             self.connection = pyodbc.connect(self.connection_string)
-            logger.info("Database connection established successfully")
+            logger.info("Database connection established successfully", extra=SAMPLED)
             return self.connection
         except Exception as e:
             logger.error(f"Failed to connect to database: {str(e)}")
@@ -25,7 +26,7 @@ class DatabaseConnection:
         """Close database connection"""
         if self.connection:
             self.connection.close()
-            logger.info("Database connection closed")
+            logger.info("Database connection closed", extra=SAMPLED)
     
     def execute_query(self, query, params=None):
         """Execute a SELECT query and return results"""
@@ -58,7 +59,7 @@ class DatabaseConnection:
             
             self.connection.commit()
             cursor.close()
-            logger.info("Non-query executed successfully")
+            logger.info("Non-query executed successfully", extra=SAMPLED)
         except Exception as e:
             self.connection.rollback()
             logger.error(f"Non-query execution failed: {str(e)}")
@@ -0,0 +1,78 @@
+"""
+Materialized per-employee leave aggregates (table empleado_permiso_agregados,
+created by database/add_leave_aggregates.sql).
+
+Usage:
+    python -m database.leave_aggregates rebuild
+    python -m database.leave_aggregates show <empleado_id>
+"""
+import logging
+import sys
+from database.connection import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+AGGREGATE_WINDOWS = (30, 90, 365)
+AGGREGATE_COLUMNS = [
+    f'{metric}_{window}d'
+    for metric in ('dias_autorizados', 'solicitudes', 'rechazos')
+    for window in AGGREGATE_WINDOWS
+]
+
+
+def empty_aggregates():
+    """Aggregates of an employee without decided requests"""
+    return {column: 0 for column in AGGREGATE_COLUMNS}
+
+
+def get_aggregates(db, empleado_id):
+    """Aggregates of one employee (primary key lookup), None if the row does not exist"""
+    query = f"""
+    SELECT {', '.join(AGGREGATE_COLUMNS)}
+    FROM empleado_permiso_agregados
+    WHERE empleado_id = ?
+    """
+    results = db.execute_query(query, (empleado_id,))
+    if not results:
+        return None
+    return {column: int(results[0][column] or 0) for column in AGGREGATE_COLUMNS}
+
+
+def rebuild():
+    """Recompute every employee's aggregates (ages the windows). Returns the number of rows."""
+    with get_db_connection() as db:
+        cursor = db.connection.cursor()
+        try:
+            cursor.execute("EXEC sp_rebuild_empleado_permiso_agregados")
+            row = cursor.fetchone()
+            db.connection.commit()
+        finally:
+            cursor.close()
+    count = int(row[0]) if row else 0
+    logger.info(f"Leave aggregates rebuilt for {count} employees")
+    return count
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in ('rebuild', 'show') or (argv[0] == 'show' and len(argv) < 2):
+        print(__doc__)
+        return 1
+
+    if argv[0] == 'rebuild':
+        print(f"✅ Aggregates rebuilt for {rebuild()} employees")
+        return 0
+
+    with get_db_connection() as db:
+        aggregates = get_aggregates(db, int(argv[1]))
+    if aggregates is None:
+        print(f"No aggregates for employee {argv[1]}")
+        return 1
+    for column, value in aggregates.items():
+        print(f"  {column}: {value}")
+    return 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Import-time report for the ML service (cold start / worker respawn cost)
+
+Runs the target in a fresh interpreter with `python -X importtime` and
+prints the most expensive modules, the cost per top-level package and any
+training-only dependency that leaked into the serving path.
+
+Usage:
+    python import_profile.py                 # serving path: import api.routes
+    python import_profile.py --load-models   # ... plus loading the trained models
+    python import_profile.py --module models.trainer --top 40
+"""
+import argparse
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+# Modules that should only be imported by the training process or batch jobs
+TRAINING_ONLY_MODULES = ['pandas', 'models.trainer', 'models.stage_cache', 'models.compaction', 'models.vocabulary',
+                         'models.features', 'synthetic_data']
+
+# Entry points of the serving processes (where training-only imports are reported)
+SERVING_MODULES = ['app', 'app_predict', 'api.routes']
+
+_LOAD_MODELS = "from models.predictor import ModelPredictor; ModelPredictor()"
+
+
+def profile_imports(module='api.routes', load_models=False):
+    """
+    Import module in a subprocess with -X importtime.
+    Returns [(name, self_us, cumulative_us, depth)] in import order.
+    """
+    code = f"import {module}" + (f"; {_LOAD_MODELS}" if load_models else "")
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-W', 'ignore', '-c', code],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line.split(':', 1)[1].split('|', 2)
+        depth = (len(name) - len(name.lstrip(' '))) // 2
+        entries.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    if result.returncode != 0:
+        raise RuntimeError(f"Import of {module} failed:\n{result.stderr[-2000:]}")
+    return entries
+
+
+def summarize(entries, top=25):
+    """Top modules by cumulative time, self time per top-level package, training-only leaks"""
+    total_us = sum(self_us for _, self_us, _, _ in entries)
+    by_package = defaultdict(int)
+    for name, self_us, _, _ in entries:
+        by_package[name.split('.')[0]] += self_us
+    loaded = {name for name, _, _, _ in entries}
+    return {
+        'total_ms': round(total_us / 1000, 1),
+        'modules': len(entries),
+        'slowest': sorted(entries, key=lambda e: e[2], reverse=True)[:top],
+        'packages': sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top],
+        'training_only_loaded': [name for name in TRAINING_ONLY_MODULES if name in loaded]
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Import-time report of the ML service')
+    parser.add_argument('--module', default='api.routes', help='module to import (default: api.routes)')
+    parser.add_argument('--load-models', action='store_true', help='also load the trained models')
+    parser.add_argument('--top', type=int, default=25, help='rows per table')
+    args = parser.parse_args(argv)
+
+    summary = summarize(profile_imports(args.module, args.load_models), args.top)
+
+    print(f"Import of {args.module}{' + models' if args.load_models else ''}: "
+          f"{summary['total_ms']} ms in {summary['modules']} modules\n")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for name, self_us, cumulative_us, depth in summary['slowest']:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {'  ' * depth}{name}")
+    print(f"\n{'self ms':>9}  package")
+    for package, self_us in summary['packages']:
+        print(f"{self_us / 1000:>9.1f}  {package}")
+
+    if args.module not in SERVING_MODULES:
+        return 0
+    if summary['training_only_loaded']:
+        print(f"\n⚠ Training-only modules imported: {', '.join(summary['training_only_loaded'])}")
+        return 1
+    print("\n✅ No training-only modules on this path")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""
+Non-blocking logging shared by app.py (Flask) and app_predict.py (FastAPI)
+
+Request threads only put records on a bounded in-memory queue; a
+QueueListener thread does the disk and terminal writes through a
+rotating file handler and a stdout handler. When the queue is
+full records are dropped (and counted) instead of blocking the request.
+
+High-volume INFO lines are logged with extra=SAMPLED and only a fraction
+LOG_SAMPLE_RATE of them is kept; WARNING and above are never sampled.
+"""
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from config import Config
+
+# Pass as extra= on per-request INFO lines
+SAMPLED = {'sampled': True}
+
+_listener = None
+
+
+class SampledInfoFilter(logging.Filter):
+    """Keep a fraction of the records marked with extra=SAMPLED below WARNING"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+        self._random = random.Random()
+
+    def filter(self, record):
+        if not getattr(record, 'sampled', False) or record.levelno >= logging.WARNING:
+            return True
+        return self.rate >= 1 or self._random.random() < self.rate
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler over a bounded queue that drops records instead of blocking when full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _file_handler(log_file):
+    os.makedirs(os.path.dirname(log_file), exist_ok=True)
+    if Config.LOG_ROTATION == 'time':
+        return logging.handlers.TimedRotatingFileHandler(
+            log_file, when=Config.LOG_ROTATE_WHEN, backupCount=Config.LOG_BACKUP_COUNT, encoding='utf-8'
+        )
+    return logging.handlers.RotatingFileHandler(
+        log_file, maxBytes=Config.LOG_MAX_BYTES, backupCount=Config.LOG_BACKUP_COUNT, encoding='utf-8'
+    )
+
+
+def configure_logging(log_file=None, level=None):
+    """
+    Route the root logger through a queue to a background writer.
+    Safe to call more than once (later calls are no-ops). Returns the queue handler.
+    """
+    global _listener
+    root = logging.getLogger()
+    if _listener is not None:
+        return next(h for h in root.handlers if isinstance(h, DroppingQueueHandler))
+
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    handlers = [logging.StreamHandler(sys.stdout), _file_handler(log_file or Config.LOG_FILE)]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    queue_handler = DroppingQueueHandler(queue.Queue(maxsize=Config.LOG_QUEUE_SIZE))
+    queue_handler.addFilter(SampledInfoFilter(Config.LOG_SAMPLE_RATE))
+
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(getattr(logging, level or Config.LOG_LEVEL))
+
+    _listener = logging.handlers.QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return queue_handler
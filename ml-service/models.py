@@ -4,7 +4,10 @@ Request and response validation schemas
 """
 
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
+
+# Upper bound of requests accepted by POST /predict/batch
+MAX_BATCH_SIZE = 1000
 
 
 class PredictionRequest(BaseModel):
@@ -70,6 +73,23 @@ class PredictionResponse(BaseModel):
         }
 
 
+class BatchPredictionRequest(BaseModel):
+    """
+    Request model for batch prediction
+    """
+    solicitudes: List[PredictionRequest] = Field(
+        ..., min_length=1, max_length=MAX_BATCH_SIZE, description="Leave requests to score"
+    )
+
+
+class BatchPredictionResponse(BaseModel):
+    """
+    Response model for batch prediction (same order as the request)
+    """
+    predicciones: List[PredictionResponse]
+    total: int
+
+
 class HealthResponse(BaseModel):
     """
     Health check response
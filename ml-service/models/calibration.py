@@ -0,0 +1,120 @@
+import numpy as np
+from scipy.special import expit
+
+
+def brier_score(y_true, proba, classes):
+    """Multiclass Brier score: mean squared distance between probabilities and one-hot labels"""
+    onehot = (np.asarray(y_true)[:, None] == np.asarray(classes)[None, :]).astype(float)
+    return float(np.mean(np.sum((proba - onehot) ** 2, axis=1)))
+
+
+def expected_calibration_error(y_true, proba, classes, n_bins=10):
+    """ECE of the top-label confidence over n_bins equal-width bins"""
+    confidence = proba.max(axis=1)
+    correct = np.asarray(classes)[proba.argmax(axis=1)] == np.asarray(y_true)
+    bins = np.minimum((confidence * n_bins).astype(int), n_bins - 1)
+    ece = 0.0
+    for b in np.unique(bins):
+        mask = bins == b
+        ece += mask.mean() * abs(correct[mask].mean() - confidence[mask].mean())
+    return float(ece)
+
+
+def _fit_sigmoid(scores, target):
+    """
+    Platt scaling: P(target | score) = expit(slope * score + offset).
+    Fitted on Platt's smoothed targets ((N+ + 1) / (N+ + 2) and 1 / (N- + 2)), like
+    sklearn's sigmoid calibration, so small or separable classes keep finite slopes.
+    """
+    from scipy.optimize import minimize
+
+    target = np.asarray(target, dtype=bool)
+    positives = float(target.sum())
+    negatives = len(target) - positives
+    soft = np.where(target, (positives + 1) / (positives + 2), 1 / (negatives + 2))
+
+    def loss(params):
+        z = params[0] * scores + params[1]
+        # Log loss against the soft targets and its gradient
+        residual = expit(z) - soft
+        return np.sum(np.logaddexp(0, z) - soft * z), np.array([residual @ scores, residual.sum()])
+
+    start = [0.0, np.log((positives + 1) / (negatives + 1))]
+    slope, offset = minimize(loss, start, jac=True, method='L-BFGS-B').x
+    return float(slope), float(offset)
+
+
+class CollapsedSigmoidClassifier:
+    """
+    Single linear scorer + one sigmoid per class, folded from a sigmoid
+    CalibratedClassifierCV over linear models.
+
+    The k fold models are replaced by their averaged coefficients (the mean of
+    their decision functions). The per-class sigmoids are refitted on the
+    out-of-fold scores of the fold models, the same held-out scores the
+    ensemble calibrated on. predict_proba is one matrix product and one expit
+    instead of k predict_proba calls plus k calibrators.
+    """
+
+    def __init__(self, coef, intercept, slopes, offsets, classes):
+        self.coef_ = np.asarray(coef, dtype=float)
+        self.intercept_ = np.asarray(intercept, dtype=float)
+        self.slopes_ = np.asarray(slopes, dtype=float)
+        self.offsets_ = np.asarray(offsets, dtype=float)
+        self.classes_ = np.asarray(classes)
+        self.n_features_in_ = self.coef_.shape[1]
+
+    @classmethod
+    def from_calibrated(cls, calibrated, X, y):
+        """
+        Collapse a fitted CalibratedClassifierCV (linear base estimator, cross-validated ensemble).
+        X, y: data the calibrated ensemble was fitted on. Its cv splits are replayed so that
+        each fold model scores the split it was not trained on; in-sample scores of the
+        averaged scorer would make the sigmoids overconfident.
+        """
+        from sklearn.model_selection import check_cv
+
+        if isinstance(calibrated.cv, str) or not getattr(calibrated, 'ensemble', True):
+            raise ValueError("Only a cross-validated CalibratedClassifierCV (ensemble=True) can be collapsed")
+        estimators = [
+            getattr(c, 'estimator', None) or getattr(c, 'base_estimator', None)
+            for c in calibrated.calibrated_classifiers_
+        ]
+        X = np.asarray(X, dtype=float)
+        y = np.asarray(y)
+        splits = list(check_cv(calibrated.cv, y, classifier=True).split(X, y))
+        if len(splits) != len(estimators):
+            raise ValueError(f"Expected {len(estimators)} cv splits to replay, got {len(splits)}")
+
+        coef = np.mean([e.coef_ for e in estimators], axis=0)
+        intercept = np.mean([e.intercept_ for e in estimators], axis=0)
+        classes = calibrated.classes_
+
+        scores = np.empty((len(X), coef.shape[0]))
+        for estimator, (_, held_out) in zip(estimators, splits):
+            scores[held_out] = X[held_out] @ estimator.coef_.T + estimator.intercept_
+        if len(classes) == 2:
+            # Binary models have a single score for classes[1]
+            slopes, offsets = zip(_fit_sigmoid(scores[:, 0], y == classes[1]))
+        else:
+            slopes, offsets = zip(*[
+                _fit_sigmoid(scores[:, k], y == label) for k, label in enumerate(classes)
+            ])
+        return cls(coef, intercept, slopes, offsets, classes)
+
+    def decision_function(self, X):
+        scores = np.asarray(X, dtype=float) @ self.coef_.T + self.intercept_
+        return scores[:, 0] if scores.shape[1] == 1 else scores
+
+    def predict_proba(self, X):
+        scores = np.asarray(X, dtype=float) @ self.coef_.T + self.intercept_
+        proba = expit(scores * self.slopes_ + self.offsets_)
+        if len(self.classes_) == 2:
+            return np.hstack([1.0 - proba, proba])
+        # Same normalization as CalibratedClassifierCV (uniform if every sigmoid is 0)
+        total = proba.sum(axis=1, keepdims=True)
+        uniform = np.full_like(proba, 1.0 / len(self.classes_))
+        return np.divide(proba, total, out=uniform, where=total != 0)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
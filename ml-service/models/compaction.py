@@ -0,0 +1,94 @@
+import logging
+import pickle
+import numpy as np
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+# CSR stores 8 bytes per nonzero (float32 value + int32 column index) against 4 bytes per dense
+# float32 entry, so it breaks even at 50% density. It is only used below a third, where its size
+# (2 x density of the dense size, plus the row pointers) is at most two thirds of the dense one.
+SPARSE_DENSITY_LIMIT = 0.33
+
+
+def artifact_size(obj):
+    """Serialized size of an artifact in bytes"""
+    return len(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def _compact_linear(model, prune_threshold):
+    """Cast coefficients to float32, prune tiny weights and store them sparsely when worth it"""
+    coef = model.coef_
+    if sparse.issparse(coef):
+        coef = coef.toarray()
+    coef = np.asarray(coef, dtype=np.float32)
+    if prune_threshold > 0:
+        coef[np.abs(coef) < prune_threshold] = 0.0
+
+    density = np.count_nonzero(coef) / max(coef.size, 1)
+    model.coef_ = sparse.csr_matrix(coef) if density < SPARSE_DENSITY_LIMIT else coef
+    model.intercept_ = np.asarray(model.intercept_, dtype=np.float32)
+    return density
+
+
+def _compact_naive_bayes(model):
+    for attribute in ('feature_log_prob_', 'class_log_prior_', 'feature_count_', 'class_count_'):
+        if hasattr(model, attribute):
+            setattr(model, attribute, np.asarray(getattr(model, attribute), dtype=np.float32))
+
+
+def _compact_idf(transformer):
+    """Store the IDF weights as float32"""
+    # TfidfVectorizer delegates the IDF to an inner TfidfTransformer
+    transformer = getattr(transformer, '_tfidf', transformer)
+    if not hasattr(transformer, 'idf_'):
+        return
+    try:
+        transformer.idf_ = np.asarray(transformer.idf_, dtype=np.float32)
+    except Exception as e:
+        logger.debug(f"IDF kept in original dtype: {e}")
+    # sklearn < 1.5 keeps the IDF as a float64 sparse diagonal matrix
+    if sparse.issparse(getattr(transformer, '_idf_diag', None)):
+        transformer._idf_diag = transformer._idf_diag.astype(np.float32)
+
+
+def compact_artifact(obj, prune_threshold=0.0):
+    """
+    Compact a fitted artifact in place and return (obj, coef_density).
+
+    - linear text models (LinearSVC, LogisticRegression, OneVsRest of them):
+      float32 weights, pruned below prune_threshold, sparse when mostly zero
+    - MultinomialNB: float32 log-probabilities and counts
+    - TF-IDF / hashing vectorizers: float32 IDF, stop_words_ dropped (only used for inspection)
+    Other artifacts are returned untouched (density None).
+    """
+    name = type(obj).__name__
+
+    if name == 'OneVsRestClassifier':
+        densities = [_compact_linear(estimator, prune_threshold) for estimator in obj.estimators_
+                     if hasattr(estimator, 'coef_')]
+        return obj, (float(np.mean(densities)) if densities else None)
+
+    if name in ('LinearSVC', 'LogisticRegression'):
+        return obj, _compact_linear(obj, prune_threshold)
+
+    if name == 'MultinomialNB':
+        _compact_naive_bayes(obj)
+        return obj, None
+
+    if name == 'TfidfVectorizer':
+        if hasattr(obj, 'stop_words_'):
+            obj.stop_words_ = None
+        _compact_idf(obj)
+        return obj, None
+
+    if name == 'Pipeline':
+        for _, step in obj.steps:
+            compact_artifact(step, prune_threshold)
+        return obj, None
+
+    if name == 'TfidfTransformer':
+        _compact_idf(obj)
+        return obj, None
+
+    return obj, None
@@ -1,14 +1,18 @@
-import pandas as pd
-import numpy as np
 from datetime import datetime, timedelta
 import logging
+from config import Config
 from database.connection import get_db_connection
+from database import leave_aggregates
 
 logger = logging.getLogger(__name__)
 
 class DataLoader:
     """Loads and prepares data from SQL Server for ML models"""
     
+    # Set to False after the first failed read of empleado_permiso_agregados
+    # (migration not applied): later calls go straight to the SUM query
+    aggregates_available = None
+    
     def __init__(self):
         self.db = None
     
@@ -17,6 +21,10 @@ class DataLoader:
         Load historical data for model training
         Returns a pandas DataFrame with all necessary features
         """
+        # Training-only dependencies: kept off the serving import path
+        import pandas as pd
+        from models.features import fill_antiguedad
+        
         query = """
         SELECT 
             s.solicitud_id,
@@ -46,12 +54,13 @@ class DataLoader:
             s.fecha_solicitud,
             s.fecha_inicio,
             s.fecha_fin,
+            s.fecha_decision,
             e.fecha_ingreso,
             e.segmento_ml
         FROM solicitudes_permiso s
         INNER JOIN empleados e ON s.empleado_id = e.empleado_id
         WHERE s.resultado_rrhh IN ('AUTORIZADO', 'RECHAZADO')
-        ORDER BY s.fecha_solicitud DESC
+        ORDER BY s.fecha_solicitud DESC, s.solicitud_id DESC
         """
         
         try:
@@ -63,13 +72,8 @@ class DataLoader:
                     logger.warning("No training data found in database")
                     return df
                 
-                # Calculate antiguedad_anios if not present
-                if 'antiguedad_anios' not in df.columns or df['antiguedad_anios'].isna().any():
-                    df['antiguedad_anios'] = df.apply(
-                        lambda row: self._calculate_antiguedad(row['fecha_ingreso']) 
-                        if pd.isna(row.get('antiguedad_anios')) else row['antiguedad_anios'],
-                        axis=1
-                    )
+                # Calculate antiguedad_anios if not present (vectorized over fecha_ingreso)
+                df = fill_antiguedad(df)
                 
                 logger.info(f"Loaded {len(df)} training samples from database")
                 return df
@@ -78,8 +82,37 @@ class DataLoader:
             logger.error(f"Failed to load training data: {str(e)}")
             raise
     
-    def load_employee_data(self, empleado_id):
-        """Load data for a specific employee"""
+    def load_label_stats(self, since=None):
+        """
+        Cheap aggregate used by the retraining trigger.
+        Returns {resultado_rrhh: {'total': int, 'nuevos': int}} where 'nuevos' counts
+        the rows decided after the given watermark.
+        """
+        query = """
+        SELECT 
+            resultado_rrhh,
+            COUNT(*) AS total,
+            SUM(CASE WHEN COALESCE(fecha_decision, fecha_solicitud) > ? THEN 1 ELSE 0 END) AS nuevos
+        FROM solicitudes_permiso
+        WHERE resultado_rrhh IN ('AUTORIZADO', 'RECHAZADO')
+        GROUP BY resultado_rrhh
+        """
+        
+        since = since or datetime(1900, 1, 1)
+        try:
+            with get_db_connection() as db:
+                results = db.execute_query(query, (since,))
+                return {
+                    row['resultado_rrhh']: {'total': int(row['total'] or 0), 'nuevos': int(row['nuevos'] or 0)}
+                    for row in results
+                }
+                
+        except Exception as e:
+            logger.error(f"Failed to load label stats: {str(e)}")
+            raise
+    
+    def load_employee_data(self, empleado_id, deadline=None):
+        """Load data for a specific employee (queries time out with the request deadline, if given)"""
         query = """
         SELECT 
             empleado_id,
@@ -104,6 +137,8 @@ class DataLoader:
         
         try:
             with get_db_connection() as db:
+                if deadline is not None:
+                    db.connection.timeout = deadline.query_timeout()
                 results = db.execute_query(query, (empleado_id,))
                 if not results:
                     logger.warning(f"Employee {empleado_id} not found")
@@ -111,7 +146,14 @@ class DataLoader:
                 
                 employee = results[0]
                 employee['antiguedad_anios'] = self._calculate_antiguedad(employee['fecha_ingreso'])
-                employee['dias_ult_ano'] = self._calculate_dias_ultimo_ano(empleado_id)
+                
+                # Leave history from the materialized aggregates (primary key lookup)
+                aggregates = self._load_aggregates(db, empleado_id)
+                if aggregates is not None:
+                    employee.update(aggregates)
+                    employee['dias_ult_ano'] = aggregates['dias_autorizados_365d']
+                else:
+                    employee['dias_ult_ano'] = self._calculate_dias_ultimo_ano(empleado_id)
                 
                 return employee
                 
@@ -119,6 +161,23 @@ class DataLoader:
             logger.error(f"Failed to load employee data: {str(e)}")
             raise
     
+    def _load_aggregates(self, db, empleado_id):
+        """
+        Row of empleado_permiso_agregados for the employee, zeros if the employee
+        has no row yet, None when the aggregates are disabled or unavailable.
+        """
+        if not Config.LEAVE_AGGREGATES_ENABLED or DataLoader.aggregates_available is False:
+            return None
+        try:
+            aggregates = leave_aggregates.get_aggregates(db, empleado_id)
+            DataLoader.aggregates_available = True
+            return aggregates if aggregates is not None else leave_aggregates.empty_aggregates()
+        except Exception as e:
+            if DataLoader.aggregates_available is None:
+                DataLoader.aggregates_available = False
+                logger.warning(f"Leave aggregates unavailable, falling back to SUM queries: {str(e)}")
+            return None
+    
     def _calculate_antiguedad(self, fecha_ingreso):
         """Calculate years of service from fecha_ingreso"""
         if not fecha_ingreso:
@@ -155,18 +214,19 @@ class DataLoader:
             logger.error(f"Failed to calculate dias_ult_ano: {str(e)}")
             return 0
     
-    def prepare_prediction_data(self, request_data):
+    def prepare_prediction_data(self, request_data, deadline=None):
         """
         Prepare data for prediction from a new request
         
         Args:
             request_data: dict with keys: empleado_id, dias_solicitados, motivo_texto, etc.
+            deadline: optional models.deadline.Deadline bounding the database queries
         
         Returns:
             dict with all features needed for prediction
         """
         empleado_id = request_data.get('empleado_id')
-        employee = self.load_employee_data(empleado_id)
+        employee = self.load_employee_data(empleado_id, deadline)
         
         if not employee:
             raise ValueError(f"Employee {empleado_id} not found")
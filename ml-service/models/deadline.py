@@ -0,0 +1,110 @@
+"""
+Per-request time budgets for /api/ml/predict.
+
+A Deadline starts when the request is received and is shared by the
+DataLoader (database query timeout) and the model stages. Stages that do
+not affect the approval decision (KMeans segment, KNN day suggestion) are
+skipped when the remaining budget is below their recent p95 latency; their
+value then comes from StageFallbacks (last value computed for the employee,
+or a default) and the response is flagged as degraded.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+
+class DeadlineExceeded(Exception):
+    """The budget ran out before the essential stages could start"""
+
+
+class Deadline:
+    """Remaining time of one request (monotonic clock)"""
+
+    def __init__(self, budget_ms, reserve_ms=0, started=None):
+        """
+        Args:
+            budget_ms: total budget of the request
+            reserve_ms: part of the budget kept for serializing and sending the response
+            started: time.perf_counter() value the budget counts from (default: now)
+        """
+        self.budget_ms = budget_ms
+        self.reserve_seconds = reserve_ms / 1000
+        self.started = time.perf_counter() if started is None else started
+        self.expires_at = self.started + budget_ms / 1000
+
+    @classmethod
+    def from_request(cls, value, default_ms, reserve_ms=0, started=None):
+        """
+        Deadline for a client-supplied budget in milliseconds (body field or header).
+        Falls back to default_ms; None when neither is positive. Raises ValueError on bad input.
+        """
+        if value is None or value == '':
+            budget_ms = default_ms
+        else:
+            try:
+                budget_ms = float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"deadline_ms must be a number of milliseconds, got {value!r}")
+        if not budget_ms or budget_ms <= 0:
+            return None
+        return cls(budget_ms, reserve_ms, started)
+
+    def remaining(self):
+        """Seconds left for work (reserve excluded); negative once expired"""
+        return self.expires_at - self.reserve_seconds - time.perf_counter()
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def allows(self, expected_seconds):
+        """True if a step expected to take expected_seconds still fits"""
+        return self.remaining() >= expected_seconds
+
+    def query_timeout(self):
+        """Whole seconds for a database query timeout (pyodbc: 0 disables it, so at least 1)"""
+        return max(1, math.ceil(self.remaining()))
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+
+class StageFallbacks:
+    """
+    Values served for skipped optional stages: the last value computed for the
+    employee (LRU, bounded), else a default. Also counts skipped stages per source.
+    """
+
+    def __init__(self, max_employees=10000):
+        self.max_employees = max_employees
+        self._values = OrderedDict()
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def remember(self, empleado_id, stage, value):
+        with self._lock:
+            values = self._values.get(empleado_id)
+            if values is None:
+                values = self._values[empleado_id] = {}
+                if len(self._values) > self.max_employees:
+                    self._values.popitem(last=False)
+            else:
+                self._values.move_to_end(empleado_id)
+            values[stage] = value
+
+    def get(self, empleado_id, stage, default, default_source='default'):
+        """(value, source) for a skipped stage; source is 'cache' or default_source"""
+        with self._lock:
+            cached = self._values.get(empleado_id, {}).get(stage)
+            source = 'cache' if cached is not None else default_source
+            key = (stage, source)
+            self._counts[key] = self._counts.get(key, 0) + 1
+        return (cached, source) if cached is not None else (default, source)
+
+    def report(self):
+        """{'employees_cached': int, 'skipped': {stage: {source: count}}}"""
+        with self._lock:
+            skipped = {}
+            for (stage, source), count in self._counts.items():
+                skipped.setdefault(stage, {})[source] = count
+            return {'employees_cached': len(self._values), 'skipped': skipped}
@@ -0,0 +1,153 @@
+"""
+Input drift monitoring with fixed-size histograms.
+
+The trainer stores a reference histogram per monitored feature in the
+training metadata (quantile bin edges for numeric features, category counts
+for tipo_permiso_real). The predictor keeps a matching streaming histogram:
+each request increments one counter per feature, so memory is constant and
+no prediction log is needed to compute PSI and (binned) KS scores.
+"""
+import math
+import threading
+from bisect import bisect_right
+from datetime import datetime
+import numpy as np
+
+NUMERIC_FEATURES = ['dias_solicitados', 'dias_ult_ano', 'texto_largo']
+CATEGORICAL_FEATURES = ['tipo_permiso_real']
+OTHER_CATEGORY = '__otro__'
+
+# Floor for empty bins so PSI stays finite
+_EPSILON = 1e-4
+
+
+def build_reference(df, bins=10):
+    """
+    Reference histograms of the training data:
+    {feature: {'kind': 'numeric', 'edges': [...], 'counts': [...]}
+              | {'kind': 'categorical', 'categories': [...], 'counts': [...]}}
+    Numeric edges are training quantiles, so every reference bin holds a similar share.
+    """
+    # Training-time only (pandas is not imported on the serving path)
+    from models.features import numeric_column, text_column
+
+    reference = {}
+    for feature in NUMERIC_FEATURES:
+        if feature == 'texto_largo':
+            values = np.array([len(text) for text in text_column(df, 'motivo_texto')], dtype=float)
+        else:
+            values = numeric_column(df, feature)
+        quantiles = np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1]) if len(values) else []
+        edges = sorted(set(float(q) for q in quantiles))
+        counts = np.bincount(np.searchsorted(edges, values, side='right'), minlength=len(edges) + 1)
+        reference[feature] = {'kind': 'numeric', 'edges': edges, 'counts': counts.tolist()}
+
+    for feature in CATEGORICAL_FEATURES:
+        values = text_column(df, feature)
+        categories, counts = np.unique(values, return_counts=True)
+        reference[feature] = {
+            'kind': 'categorical',
+            'categories': [str(c) for c in categories] + [OTHER_CATEGORY],
+            'counts': counts.tolist() + [0]
+        }
+    return reference
+
+
+def psi(reference_counts, current_counts):
+    """Population stability index between two histograms over the same bins"""
+    reference = np.maximum(np.asarray(reference_counts, dtype=float) / max(sum(reference_counts), 1), _EPSILON)
+    current = np.maximum(np.asarray(current_counts, dtype=float) / max(sum(current_counts), 1), _EPSILON)
+    return float(np.sum((current - reference) * np.log(current / reference)))
+
+
+def binned_ks(reference_counts, current_counts):
+    """Kolmogorov-Smirnov statistic evaluated at the bin edges"""
+    reference = np.cumsum(reference_counts) / max(sum(reference_counts), 1)
+    current = np.cumsum(current_counts) / max(sum(current_counts), 1)
+    return float(np.max(np.abs(current - reference)))
+
+
+class StreamingHistogram:
+    """Counts of one feature over the reference bins (O(log bins) update, constant memory)"""
+
+    def __init__(self, spec):
+        self.kind = spec['kind']
+        if self.kind == 'numeric':
+            self.edges = spec['edges']
+            size = len(self.edges) + 1
+        else:
+            self.index = {category: i for i, category in enumerate(spec['categories'])}
+            size = len(spec['categories'])
+        self.counts = [0] * size
+
+    def update(self, value):
+        if self.kind == 'numeric':
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                return
+            if math.isnan(value):
+                return
+            self.counts[bisect_right(self.edges, value)] += 1
+        else:
+            position = self.index.get(str(value), self.index[OTHER_CATEGORY])
+            self.counts[position] += 1
+
+
+class DriftMonitor:
+    """Streaming histograms of live requests compared against the training reference"""
+
+    def __init__(self, reference, psi_threshold=0.2, min_samples=200):
+        self.reference = reference
+        self.psi_threshold = psi_threshold
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {feature: StreamingHistogram(spec) for feature, spec in self.reference.items()}
+            self.samples = 0
+            self.since = datetime.now()
+
+    def update(self, data, predictions):
+        """Add one prediction (prepared request data + its predictions)"""
+        values = {
+            'dias_solicitados': data.get('dias_solicitados'),
+            'dias_ult_ano': data.get('dias_ult_ano'),
+            'texto_largo': len(str(data.get('motivo_texto') or '')),
+            'tipo_permiso_real': predictions.get('tipo_permiso_real')
+        }
+        with self._lock:
+            self.samples += 1
+            for feature, histogram in self._histograms.items():
+                if feature in values:
+                    histogram.update(values[feature])
+
+    def report(self):
+        """PSI / KS per feature and whether drift crossed the threshold"""
+        with self._lock:
+            current = {feature: list(h.counts) for feature, h in self._histograms.items()}
+            samples = self.samples
+            since = self.since
+
+        features = {}
+        for feature, spec in self.reference.items():
+            scores = {'psi': round(psi(spec['counts'], current[feature]), 4)}
+            if spec['kind'] == 'numeric':
+                scores['ks'] = round(binned_ks(spec['counts'], current[feature]), 4)
+            features[feature] = scores if samples else {'psi': None}
+
+        drifted = [
+            feature for feature, scores in features.items()
+            if samples >= self.min_samples and scores['psi'] is not None and scores['psi'] >= self.psi_threshold
+        ]
+        return {
+            'samples': samples,
+            'since': since.isoformat(),
+            'psi_threshold': self.psi_threshold,
+            'min_samples': self.min_samples,
+            'drifted_features': drifted,
+            'drift_detected': bool(drifted),
+            'features': features
+        }
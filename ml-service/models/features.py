@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+# Feature order expected by the logistic regression (and by the predictor)
+DECISION_FEATURES = [
+    'impacto_area',
+    'dias_solicitados',
+    'antiguedad_anios',
+    'dias_ult_ano',
+    'texto_largo',
+    'anomala_bin',
+    'vacaciones_bin',
+    'enfermedad_bin',
+    'sanciones_bin',
+    'inasistencias',
+    'segmento_ml'
+]
+
+# The decision tree uses the first 8 enriched features
+TREE_FEATURES = DECISION_FEATURES[:8]
+
+
+def numeric_column(df, column, default=0.0):
+    """Return a column as a float64 array, filling missing values with default"""
+    if column not in df.columns:
+        return np.full(len(df), float(default))
+    values = pd.to_numeric(df[column], errors='coerce')
+    return values.fillna(default).to_numpy(dtype=float)
+
+
+def text_column(df, column):
+    """Return a column as an object array of strings, '' for missing values"""
+    if column not in df.columns:
+        return np.full(len(df), '', dtype=object)
+    return df[column].fillna('').astype(str).to_numpy(dtype=object)
+
+
+def years_of_service(fecha_ingreso, reference=None):
+    """
+    Vectorized equivalent of DataLoader._calculate_antiguedad.
+    Accepts a Series of dates (str, date, datetime) and returns whole years of service.
+    """
+    fechas = pd.to_datetime(pd.Series(fecha_ingreso), errors='coerce')
+    reference = pd.Timestamp(reference if reference is not None else datetime.now())
+    dias = (reference - fechas).dt.days
+    return np.trunc(dias / 365.25).fillna(0).astype(int)
+
+
+def fill_antiguedad(df, reference=None):
+    """Fill missing antiguedad_anios from fecha_ingreso in a single vectorized pass"""
+    if 'fecha_ingreso' not in df.columns:
+        return df
+    if 'antiguedad_anios' not in df.columns:
+        df['antiguedad_anios'] = years_of_service(df['fecha_ingreso'], reference).to_numpy()
+        return df
+
+    missing = df['antiguedad_anios'].isna()
+    if missing.any():
+        calculated = years_of_service(df.loc[missing, 'fecha_ingreso'], reference)
+        df.loc[missing, 'antiguedad_anios'] = calculated.to_numpy()
+    return df
+
+
+def build_decision_features(df):
+    """
+    Build the enriched feature matrix used by the logistic regression and decision tree.
+
+    Everything is computed with array operations over the whole dataset, so the
+    trainer can build it once per run and slice the columns each model needs.
+    """
+    dias_solicitados = numeric_column(df, 'dias_solicitados')
+    dias_ult_ano = numeric_column(df, 'dias_ult_ano')
+    antiguedad = numeric_column(df, 'antiguedad_anios')
+    tipo_permiso = text_column(df, 'tipo_permiso_real')
+
+    # Impacto: use impacto_area_numerico if available, otherwise calculate it
+    # con refuerzo para motivos médicos
+    if 'impacto_area_numerico' not in df.columns or df['impacto_area_numerico'].isna().all():
+        base = dias_solicitados * 1.9 + dias_ult_ano * 0.30 - antiguedad * 0.20
+        ref_med = np.where(tipo_permiso == 'ENFERMEDAD', 8.0, 0.0)
+        impacto = np.clip(base + ref_med, 0, 100)
+    else:
+        impacto = numeric_column(df, 'impacto_area_numerico')
+
+    features = pd.DataFrame({
+        'impacto_area': impacto,
+        'dias_solicitados': dias_solicitados,
+        'antiguedad_anios': antiguedad,
+        'dias_ult_ano': dias_ult_ano,
+        'texto_largo': df['motivo_texto'].fillna('').astype(str).str.len().to_numpy(),
+        'anomala_bin': (numeric_column(df, 'es_anomala') == 1).astype(int),
+        'vacaciones_bin': (tipo_permiso == 'VACACIONES').astype(int),
+        'enfermedad_bin': (tipo_permiso == 'ENFERMEDAD').astype(int),
+        'sanciones_bin': (numeric_column(df, 'sanciones_activas') == 1).astype(int),
+        'inasistencias': numeric_column(df, 'inasistencias'),
+        'segmento_ml': numeric_column(df, 'segmento_ml')
+    }, index=df.index)
+
+    return features[DECISION_FEATURES]
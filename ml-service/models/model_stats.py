@@ -0,0 +1,149 @@
+"""
+Size and latency statistics of the loaded model set, reported by /models/status.
+
+deep_sizeof and count_parameters describe each fitted artifact (memory,
+fitted parameters, model-specific size indicators) once at load time;
+LatencyTracker keeps a rolling window of per-stage prediction latencies.
+"""
+import sys
+import threading
+from collections import deque
+import numpy as np
+from scipy import sparse
+
+
+def deep_sizeof(obj, _seen=None):
+    """
+    Approximate in-memory size of a fitted artifact in bytes.
+    Counts NumPy/SciPy buffers by nbytes and walks containers and object attributes.
+    """
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if sparse.issparse(obj):
+        return sum(deep_sizeof(getattr(obj, attr), _seen)
+                   for attr in ('data', 'indices', 'indptr', 'offsets', 'row', 'col') if hasattr(obj, attr))
+
+    size = sys.getsizeof(obj, 0)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, _seen) + deep_sizeof(v, _seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        size += sum(deep_sizeof(item, _seen) for item in obj)
+    elif hasattr(obj, '__dict__') and not isinstance(obj, type):
+        size += deep_sizeof(vars(obj), _seen)
+    # Cython extension objects (e.g. sklearn trees) expose their state via __getstate__
+    if type(obj).__name__ == 'Tree' and hasattr(obj, '__getstate__'):
+        size += deep_sizeof(obj.__getstate__(), _seen)
+    return size
+
+
+def _array_size(value):
+    if value is None:
+        return 0
+    if sparse.issparse(value):
+        return int(value.nnz)
+    return int(np.asarray(value).size)
+
+
+def count_parameters(model):
+    """Number of fitted parameters of an artifact, plus model-specific size indicators"""
+    name = type(model).__name__
+    info = {}
+
+    if name == 'OneVsRestClassifier':
+        estimators = getattr(model, 'estimators_', [])
+        info['parameters'] = sum(count_parameters(e).get('parameters', 0) for e in estimators)
+        info['estimators'] = len(estimators)
+        return info
+
+    if name == 'Pipeline':
+        info['parameters'] = sum(count_parameters(step).get('parameters', 0) for _, step in model.steps)
+        return info
+
+    if name == 'CalibratedClassifierCV':
+        calibrated = getattr(model, 'calibrated_classifiers_', [])
+        info['parameters'] = sum(
+            count_parameters(getattr(c, 'estimator', getattr(c, 'base_estimator', None))).get('parameters', 0)
+            + 2 * len(getattr(c, 'calibrators', []))
+            for c in calibrated
+        )
+        info['estimators'] = len(calibrated)
+        return info
+
+    if name == 'CollapsedSigmoidClassifier':
+        info['parameters'] = sum(_array_size(getattr(model, attribute))
+                                 for attribute in ('coef_', 'intercept_', 'slopes_', 'offsets_'))
+        info['calibrators'] = int(model.slopes_.size)
+        info['classes'] = len(model.classes_)
+        return info
+
+    parameters = 0
+    for attribute in ('coef_', 'intercept_', 'dual_coef_', 'feature_log_prob_', 'class_log_prior_',
+                      'cluster_centers_', 'mean_', 'scale_', 'idf_'):
+        if hasattr(model, attribute):
+            try:
+                parameters += _array_size(getattr(model, attribute))
+            except Exception:
+                pass
+
+    if hasattr(model, 'support_vectors_'):
+        info['support_vectors'] = int(model.support_vectors_.shape[0])
+        parameters += _array_size(model.support_vectors_)
+    if hasattr(model, 'tree_'):
+        info['tree_nodes'] = int(model.tree_.node_count)
+        parameters += int(model.tree_.node_count)
+    if hasattr(model, 'vocabulary_'):
+        info['vocabulary_size'] = len(model.vocabulary_)
+    if hasattr(model, 'cells_'):
+        info['training_samples'] = int(model.n_samples_fit_)
+        info['cells'] = int(len(model.cells_))
+        parameters += _array_size(model.cells_) + _array_size(model.cell_counts_) + _array_size(model.cell_means_)
+    if hasattr(model, '_fit_X'):
+        info['training_samples'] = int(model._fit_X.shape[0])
+        parameters += _array_size(model._fit_X)
+    if hasattr(model, 'classes_'):
+        info['classes'] = len(model.classes_)
+
+    info['parameters'] = int(parameters)
+    return info
+
+
+class LatencyTracker:
+    """Rolling window of latencies per prediction stage (thread-safe)"""
+
+    def __init__(self, window=500):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def summary(self, stage):
+        with self._lock:
+            samples = np.array(self._samples.get(stage, ()), dtype=float)
+        if samples.size == 0:
+            return None
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99]) * 1000
+        return {
+            'count': int(samples.size),
+            'mean_ms': round(float(samples.mean() * 1000), 3),
+            'p50_ms': round(float(p50), 3),
+            'p95_ms': round(float(p95), 3),
+            'p99_ms': round(float(p99), 3),
+            'last_ms': round(float(samples[-1] * 1000), 3)
+        }
+
+    def summaries(self):
+        with self._lock:
+            stages = list(self._samples)
+        return {stage: self.summary(stage) for stage in stages}
@@ -0,0 +1,79 @@
+import numpy as np
+from scipy.spatial import cKDTree
+
+KNN_ENGINES = ('grid', 'kdtree', 'sklearn')
+
+
+class CellNeighborRegressor:
+    """
+    k-nearest-neighbors regressor over standardized features, stored as a grid of cells.
+
+    Training rows are snapped to cells of cell_size (in the units of each
+    feature) and every occupied cell keeps only its row count and target mean,
+    so the model size depends on the number of distinct profiles, not on the
+    history length. With the integer features used for the day suggestion
+    (dias_ult_ano, antiguedad_anios, edad) and cell_size=1 the cells are the
+    exact feature values, and predict() returns the mean target of the
+    n_neighbors nearest rows (count-weighted over the nearest cells). Cell
+    centers are searched with a KD-tree, rebuilt on load instead of pickled.
+    cell_size=0 keeps every row as its own cell (plain KD-tree KNN).
+    """
+
+    def __init__(self, n_neighbors=5, cell_size=1.0):
+        self.n_neighbors = n_neighbors
+        self.cell_size = cell_size
+
+    def fit(self, X, y):
+        X = np.asarray(X, dtype=float)
+        y = np.asarray(y, dtype=float)
+        self.n_features_in_ = X.shape[1]
+        self.n_samples_fit_ = X.shape[0]
+        self.mean_ = X.mean(axis=0)
+        std = X.std(axis=0)
+        self.scale_ = np.where(std > 0, std, 1.0)
+
+        if self.cell_size:
+            snapped = np.round(X / self.cell_size) * self.cell_size
+            cells, inverse = np.unique(snapped, axis=0, return_inverse=True)
+            inverse = inverse.ravel()
+            counts = np.bincount(inverse, minlength=len(cells))
+            means = np.bincount(inverse, weights=y, minlength=len(cells)) / counts
+        else:
+            cells, counts, means = X, np.ones(len(X), dtype=np.int64), y
+        self.cells_ = cells.astype(np.float32)
+        self.cell_counts_ = counts.astype(np.int32)
+        self.cell_means_ = means.astype(np.float32)
+        self._build_tree()
+        return self
+
+    def _build_tree(self):
+        self._tree = cKDTree((self.cells_ - self.mean_) / self.scale_)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_tree', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._build_tree()
+
+    def predict(self, X):
+        """Mean target of the n_neighbors nearest training rows of every row of X (raw feature values)"""
+        X = np.asarray(X, dtype=float).reshape(-1, self.n_features_in_)
+        # Every cell holds at least one row, so n_neighbors cells always cover n_neighbors rows
+        n_cells = min(self.n_neighbors, len(self.cells_))
+        _, nearest = self._tree.query((X - self.mean_) / self.scale_, k=n_cells)
+        nearest = nearest.reshape(len(X), n_cells)
+
+        counts = self.cell_counts_[nearest]
+        before = np.cumsum(counts, axis=1) - counts
+        taken = np.clip(self.n_neighbors - before, 0, counts)
+        return (taken * self.cell_means_[nearest]).sum(axis=1) / taken.sum(axis=1)
+
+    def score(self, X, y):
+        """R2 of predict(X), like sklearn regressors"""
+        y = np.asarray(y, dtype=float)
+        residual = ((y - self.predict(X)) ** 2).sum()
+        total = ((y - y.mean()) ** 2).sum()
+        return float(1 - residual / total) if total > 0 else 0.0
@@ -2,17 +2,90 @@ import numpy as np
 import joblib
 import logging
 import os
+import time
 from config import Config
+from log_config import SAMPLED
 from models.data_loader import DataLoader
+from models.deadline import DeadlineExceeded, StageFallbacks
+from models.drift import DriftMonitor
+from models.similarity_index import ROW_FEATURES
+from models.model_stats import LatencyTracker, count_parameters, deep_sizeof
+from models.text_processing import normalize_text, compile_keywords
 
 logger = logging.getLogger(__name__)
 
+# Lexical override rules for Spanish intents, matched against normalize_text output
+# (keywords are accent-folded, so each spelling is listed once)
+LEXICAL_RULES = [
+    # ENFERMEDAD / MÉDICO
+    ('ENFERMEDAD', compile_keywords([
+        'medico', 'cita medica', 'cita medico', 'especialista', 'examen', 'laboratorio',
+        'eps', 'incapacidad', 'urgencias', 'hospital', 'clinica', 'odontologo'
+    ])),
+    # VACACIONES
+    ('VACACIONES', compile_keywords([
+        'vacaciones', 'viaje', 'descanso', 'licencia vacacional', 'turismo', 'salida familiar'
+    ])),
+    # PERSONAL (trámites)
+    ('PERSONAL', compile_keywords([
+        'tramite', 'notaria', 'banco', 'documentos', 'diligencia'
+    ]))
+]
+
+# Prediction stage that uses each artifact (for per-model latency reporting)
+MODEL_STAGES = {
+    'naive_bayes': 'tipo_permiso',
+    'vectorizer': 'tipo_permiso',
+    'tfidf': 'tipo_permiso',
+    'svm_text': 'tipo_permiso',
+    'logreg_text': 'tipo_permiso',
+    'tfidf_logreg': 'tipo_permiso',
+    'svm': 'anomaly',
+    'regression': 'impacto',
+    'logistic': 'probabilities',
+    'logistic_calibrated': 'probabilities',
+    'label_encoder': 'probabilities',
+    'tree': 'decision',
+    'kmeans': 'segment',
+    'scaler': 'segment',
+    'knn': 'suggest_days',
+    'similarity_index': 'similar'
+}
+
+# Prepared requests (no database access) pushed through every stage by warm_up
+WARMUP_REQUESTS = [
+    {'empleado_id': None, 'edad': 35, 'antiguedad_anios': 5, 'dias_ult_ano': 4, 'dias_solicitados': 2,
+     'motivo_texto': 'Cita médica con especialista', 'tipo_permiso_real': 'ENFERMEDAD',
+     'sanciones_activas': False, 'inasistencias': 0, 'segmento_ml': 0},
+    {'empleado_id': None, 'edad': 28, 'antiguedad_anios': 1, 'dias_ult_ano': 12, 'dias_solicitados': 10,
+     'motivo_texto': 'Vacaciones familiares de fin de año', 'tipo_permiso_real': 'VACACIONES',
+     'sanciones_activas': False, 'inasistencias': 1, 'segmento_ml': 1},
+    {'empleado_id': None, 'edad': 47, 'antiguedad_anios': 15, 'dias_ult_ano': 0, 'dias_solicitados': 1,
+     'motivo_texto': 'Trámite en notaría', 'tipo_permiso_real': 'PERSONAL',
+     'sanciones_activas': True, 'inasistencias': 3, 'segmento_ml': 2}
+]
+
 class ModelPredictor:
     """Makes predictions using trained ML models"""
     
-    def __init__(self):
+    def __init__(self, models_dir=None):
+        """
+        Args:
+            models_dir: directory with the .pkl artifacts (default Config.MODELS_DIR);
+                used to load a challenger model set next to the live one
+        """
+        self.models_dir = models_dir or Config.MODELS_DIR
         self.models = {}
+        self.model_info = {}
+        self.metadata = {}
+        self.latency = LatencyTracker(window=Config.LATENCY_WINDOW)
         self.data_loader = DataLoader()
+        # Optional ShadowEvaluator fed with every live prediction (see models/shadow.py)
+        self.shadow = None
+        self.drift = None
+        self.warmup = None
+        # Values served when a deadline forces an optional stage to be skipped
+        self.fallbacks = StageFallbacks(Config.PREDICT_FALLBACK_CACHE_SIZE)
         self._load_models()
 
     def _to_float(self, v, default=0.0):
@@ -33,23 +106,67 @@ class ModelPredictor:
             return int(default)
     
     def _load_models(self):
-        """Load all trained models from disk"""
+        """Load all trained models (and training metadata) from disk"""
         try:
-            for model_name, model_path in Config.MODEL_PATHS.items():
+            for model_name, default_path in Config.MODEL_PATHS.items():
+                model_path = os.path.join(self.models_dir, os.path.basename(default_path))
                 if os.path.exists(model_path):
+                    started = time.perf_counter()
                     self.models[model_name] = joblib.load(model_path)
-                    logger.info(f"Loaded {model_name} from {model_path}")
+                    load_seconds = time.perf_counter() - started
+                    self.model_info[model_name] = self._describe_model(model_name, model_path, load_seconds)
+                    logger.info(f"Loaded {model_name} from {model_path} in {load_seconds * 1000:.1f} ms")
                 else:
                     logger.warning(f"Model file not found: {model_path}")
             
             if not self.models:
                 raise FileNotFoundError("No trained models found. Please train models first.")
+            
+            # Training metadata is served from memory by get_model_status
+            metadata_path = os.path.join(self.models_dir, 'training_metadata.pkl')
+            if os.path.exists(metadata_path):
+                self.metadata = joblib.load(metadata_path)
+            
+            # Streaming input histograms compared against the training data
+            if self.metadata.get('drift_reference'):
+                self.drift = DriftMonitor(
+                    self.metadata['drift_reference'],
+                    psi_threshold=Config.DRIFT_PSI_THRESHOLD,
+                    min_samples=Config.DRIFT_MIN_SAMPLES
+                )
                 
         except Exception as e:
             logger.error(f"Failed to load models: {str(e)}")
             raise
     
-    def predict(self, request_data):
+    def _describe_model(self, model_name, model_path, load_seconds):
+        """Static facts about a loaded artifact: size on disk and in memory, load time, parameters"""
+        model = self.models[model_name]
+        info = {
+            'type': type(model).__name__,
+            'stage': MODEL_STAGES.get(model_name),
+            'file_bytes': os.path.getsize(model_path),
+            'load_seconds': round(load_seconds, 4)
+        }
+        try:
+            info['memory_bytes'] = deep_sizeof(model)
+            info.update(count_parameters(model))
+        except Exception as e:
+            logger.warning(f"Could not measure {model_name}: {e}")
+        return info
+    
+    def _timed(self, stage, func, *args, timings=None):
+        """Run one prediction stage and record its latency (also into timings, if given)"""
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            seconds = time.perf_counter() - started
+            self.latency.record(stage, seconds)
+            if timings is not None:
+                timings[stage] = seconds
+    
+    def predict(self, request_data, deadline=None):
         """
         Make predictions for a new leave request
         
@@ -60,120 +177,220 @@ class ModelPredictor:
                 - motivo_texto: str
                 - fecha_inicio: date
                 - fecha_fin: date
+            deadline: optional models.deadline.Deadline; optional stages are
+                skipped when it runs low (see predict_prepared)
         
         Returns:
             dict with all predictions
+        
+        Raises:
+            DeadlineExceeded: the budget was spent before the models could run
         """
+        started = time.perf_counter()
         try:
-            # Prepare data
-            data = self.data_loader.prepare_prediction_data(request_data)
-
-            # Coerce numeric fields to proper types to avoid dtype errors
-            data['dias_solicitados'] = self._to_float(data.get('dias_solicitados', 0))
-            data['dias_ult_ano'] = self._to_float(data.get('dias_ult_ano', 0))
-            data['antiguedad_anios'] = self._to_float(data.get('antiguedad_anios', 0))
-            data['edad'] = self._to_float(data.get('edad', 0))
-            
-            # Model 1: Naive Bayes - Classify tipo_permiso
-            tipo_permiso = self._predict_tipo_permiso(data['motivo_texto'])
-            
-            # Model 2: One-Class SVM - Detect anomalies
-            es_anomala = self._detect_anomaly(data)
+            timings = {}
             
-            # Model 3: Linear Regression - Predict impacto_area
-            impacto_area = self._predict_impacto(data)
-            
-            # Model 4: Logistic Regression - Predict probabilities
-            probabilidades = self._predict_probabilities(data, impacto_area)
-            
-            # Model 5: Decision Tree - Final decision
-            decision_final = self._predict_decision(data, impacto_area)
-            
-            # Model 6: KMeans - Employee segment
-            segmento = self._predict_segment(data)
+            # Prepare data
+            data = self._timed('prepare_data', self.data_loader.prepare_prediction_data, request_data, deadline,
+                               timings=timings)
+            if deadline is not None and deadline.expired():
+                raise DeadlineExceeded(
+                    f"Deadline of {deadline.budget_ms:.0f} ms spent loading employee data "
+                    f"({deadline.elapsed_ms():.0f} ms)"
+                )
+            predictions = self.predict_prepared(data, timings, deadline)
             
-            # Model 7: KNN - Suggest days
-            dias_sugeridos = self._suggest_days(data)
+            self.latency.record('total', time.perf_counter() - started)
+            logger.info("Predictions made for employee %s", data['empleado_id'], extra=SAMPLED)
             
-            # Compile results
-            predictions = {
-                'tipo_permiso_real': str(tipo_permiso),
-                'es_anomala': bool(es_anomala),
-                'impacto_area_numerico': float(round(impacto_area, 2)),
-                'ml_probabilidad_aprobacion': float(round(probabilidades['prob_aprobado'], 4)),
-                'probabilidades': {
-                    'aprobado': float(round(probabilidades['prob_aprobado'], 4)),
-                    'rechazado': float(round(probabilidades['prob_rechazado'], 4)),
-                    'revisar': float(round(probabilidades['prob_revisar'], 4))
-                },
-                'resultado_rrhh': str(decision_final),
-                'segmento_ml': int(segmento),
-                'ml_dias_sugeridos': int(dias_sugeridos)
-            }
+            if self.drift is not None:
+                self.drift.update(data, predictions)
             
-            logger.info(f"Predictions made for employee {data['empleado_id']}")
+            # Challenger scoring happens on the shadow worker; submit never blocks
+            if self.shadow is not None:
+                self.shadow.submit(data, predictions, timings)
             return predictions
             
+        except DeadlineExceeded as e:
+            logger.warning(str(e))
+            raise
         except Exception as e:
             logger.error(f"Prediction failed: {str(e)}")
             raise
     
+    def predict_prepared(self, data, timings=None, deadline=None):
+        """
+        Run every model stage on an already prepared request (output of
+        DataLoader.prepare_prediction_data). Stage latencies go to timings if given.
+        
+        With a deadline, the segment and suggest_days stages only run if their
+        recent p95 latency fits in the remaining budget; otherwise their value
+        comes from self.fallbacks and the stage is listed in etapas_degradadas.
+        """
+        # Coerce numeric fields to proper types to avoid dtype errors
+        data['dias_solicitados'] = self._to_float(data.get('dias_solicitados', 0))
+        data['dias_ult_ano'] = self._to_float(data.get('dias_ult_ano', 0))
+        data['antiguedad_anios'] = self._to_float(data.get('antiguedad_anios', 0))
+        data['edad'] = self._to_float(data.get('edad', 0))
+        
+        # Model 1: Naive Bayes - Classify tipo_permiso
+        tipo_permiso = self._timed('tipo_permiso', self._predict_tipo_permiso, data['motivo_texto'],
+                                   timings=timings)
+        
+        # Model 2: One-Class SVM - Detect anomalies
+        es_anomala = self._timed('anomaly', self._detect_anomaly, data, timings=timings)
+        
+        # Model 3: Linear Regression - Predict impacto_area
+        impacto_area = self._timed('impacto', self._predict_impacto, data, timings=timings)
+        
+        # Model 4: Logistic Regression - Predict probabilities
+        probabilidades = self._timed('probabilities', self._predict_probabilities, data, impacto_area,
+                                     timings=timings)
+        
+        # Model 5: Decision Tree - Final decision
+        decision_final = self._timed('decision', self._predict_decision, data, impacto_area, timings=timings)
+        
+        # Optional stages: stage -> source of the fallback value used instead
+        degradadas = {}
+        empleado_id = data.get('empleado_id')
+        
+        # Model 6: KMeans - Employee segment
+        if self._stage_fits(deadline, 'segment'):
+            segmento = self._timed('segment', self._predict_segment, data, timings=timings)
+            self._remember(empleado_id, 'segment', int(segmento))
+        else:
+            stored = data.get('segmento_ml')
+            segmento, degradadas['segment'] = self.fallbacks.get(
+                empleado_id, 'segment', self._to_int(stored), 'empleado' if stored is not None else 'default'
+            )
+        
+        # Model 7: KNN - Suggest days
+        if self._stage_fits(deadline, 'suggest_days'):
+            dias_sugeridos = self._timed('suggest_days', self._suggest_days, data, timings=timings)
+            self._remember(empleado_id, 'suggest_days', int(dias_sugeridos))
+        else:
+            dias_sugeridos, degradadas['suggest_days'] = self.fallbacks.get(
+                empleado_id, 'suggest_days', max(1, int(round(data['dias_solicitados'])))
+            )
+        
+        # Compile results
+        return {
+            'tipo_permiso_real': str(tipo_permiso),
+            'es_anomala': bool(es_anomala),
+            'impacto_area_numerico': float(round(impacto_area, 2)),
+            'ml_probabilidad_aprobacion': float(round(probabilidades['prob_aprobado'], 4)),
+            'probabilidades': {
+                'aprobado': float(round(probabilidades['prob_aprobado'], 4)),
+                'rechazado': float(round(probabilidades['prob_rechazado'], 4)),
+                'revisar': float(round(probabilidades['prob_revisar'], 4))
+            },
+            'resultado_rrhh': str(decision_final),
+            'segmento_ml': int(segmento),
+            'ml_dias_sugeridos': int(dias_sugeridos),
+            'degradado': bool(degradadas),
+            'etapas_degradadas': degradadas
+        }
+    
+    def _stage_fits(self, deadline, stage):
+        """True without a deadline, else if the stage's rolling p95 fits in the remaining budget"""
+        if deadline is None:
+            return True
+        summary = self.latency.summary(stage)
+        expected_ms = summary['p95_ms'] if summary else Config.PREDICT_STAGE_ESTIMATE_MS
+        return deadline.allows(expected_ms / 1000)
+    
+    def _remember(self, empleado_id, stage, value):
+        # Warm-up requests have no employee
+        if empleado_id is not None:
+            self.fallbacks.remember(empleado_id, stage, value)
+    
+    def predict_batch(self, df):
+        """
+        Vectorized scoring of many stored solicitudes (used by the rescoring job).
+        
+        Args:
+            df: DataFrame with dias_solicitados, dias_ult_ano, antiguedad_anios,
+                motivo_texto, tipo_permiso_real, sanciones_activas, inasistencias, segmento_ml
+        
+        Returns:
+            DataFrame (same index) with es_anomala, impacto_area_numerico,
+            ml_probabilidad_aprobacion, prob_rechazado, ml_dias_sugeridos
+        
+        Unlike predict(), the stored tipo_permiso_real and the freshly predicted
+        anomaly flag feed the probability model, as in training.
+        """
+        # pandas-based feature building is only needed by batch jobs, not by predict()
+        import pandas as pd
+        from models.features import build_decision_features, numeric_column
+        
+        started = time.perf_counter()
+        base = np.column_stack([
+            numeric_column(df, 'dias_solicitados'),
+            numeric_column(df, 'dias_ult_ano'),
+            numeric_column(df, 'antiguedad_anios')
+        ])
+        
+        es_anomala = self.models['svm'].predict(base) == -1
+        impacto = np.clip(self.models['regression'].predict(base), 0, 100)
+        dias_sugeridos = self.models['knn'].predict(np.column_stack([
+            base[:, 1], base[:, 2], numeric_column(df, 'edad')
+        ]))
+        
+        enriched = df.copy()
+        enriched['impacto_area_numerico'] = impacto
+        enriched['es_anomala'] = es_anomala.astype(int)
+        X = build_decision_features(enriched).to_numpy(dtype=float)
+        
+        model = self.models.get('logistic_calibrated', self.models['logistic'])
+        proba = model.predict_proba(X)
+        classes = list(self.models['label_encoder'].classes_)
+        
+        def class_column(label):
+            return proba[:, classes.index(label)] if label in classes else np.zeros(len(df))
+        
+        result = pd.DataFrame({
+            'es_anomala': es_anomala,
+            'impacto_area_numerico': np.round(impacto, 2),
+            'ml_probabilidad_aprobacion': np.round(class_column('AUTORIZADO'), 4),
+            'prob_rechazado': np.round(class_column('RECHAZADO'), 4),
+            'ml_dias_sugeridos': np.maximum(1, np.round(dias_sugeridos)).astype(int)
+        }, index=df.index)
+        self.latency.record('batch', time.perf_counter() - started)
+        return result
+    
     def _predict_tipo_permiso(self, motivo_texto):
         """Model 1: Classify leave type from text.
         Prefer Linear SVM + TF-IDF if available; fallback to Naive Bayes.
         """
-        # Normalize text for lexical rules
-        texto = (motivo_texto or '').lower()
-
-        # Lexical override rules for Spanish intents
-        reglas = [
-            # ENFERMEDAD / MÉDICO
-            {
-                'clase': 'ENFERMEDAD',
-                'any': [
-                    'médico', 'medico', 'cita médica', 'cita medico', 'especialista', 'examen', 'laboratorio',
-                    'eps', 'incapacidad', 'urgencias', 'hospital', 'clinica', 'clínica', 'odontologo', 'odontólogo'
-                ]
-            },
-            # VACACIONES
-            {
-                'clase': 'VACACIONES',
-                'any': [
-                    'vacaciones', 'viaje', 'descanso', 'licencia vacacional', 'turismo', 'salida familiar'
-                ]
-            },
-            # PERSONAL (trámites)
-            {
-                'clase': 'PERSONAL',
-                'any': [
-                    'trámite', 'tramite', 'notaría', 'notaria', 'banco', 'documentos', 'diligencia', 'diligencias'
-                ]
-            }
-        ]
+        # Normalize text for lexical rules (lowercase + accent folding)
+        texto = normalize_text(motivo_texto)
+        # The vectorizers get the raw text: current ones fold it in their own preprocessor,
+        # artifacts trained before the shared tokenizer keep the preprocessing they were fitted with
+        documento = [motivo_texto or '']
 
         # First try ML prediction (prefer SVM, then LogReg, then NB)
         if 'svm_text' in self.models and 'tfidf' in self.models:
             vectorizer = self.models['tfidf']
             model = self.models['svm_text']
-            tipo_ml = model.predict(vectorizer.transform([texto]))[0]
+            tipo_ml = model.predict(vectorizer.transform(documento))[0]
         elif 'logreg_text' in self.models and 'tfidf_logreg' in self.models:
             vectorizer = self.models['tfidf_logreg']
             model = self.models['logreg_text']
-            tipo_ml = model.predict(vectorizer.transform([texto]))[0]
+            tipo_ml = model.predict(vectorizer.transform(documento))[0]
         else:
             vectorizer = self.models.get('tfidf', self.models['vectorizer'])
             model = self.models['naive_bayes']
-            tipo_ml = model.predict(vectorizer.transform([texto]))[0]
+            tipo_ml = model.predict(vectorizer.transform(documento))[0]
 
         # Apply lexical overrides on top of ML to fix common misclassifications
-        for regla in reglas:
-            if any(token in texto for token in regla['any']):
+        for clase, patron in LEXICAL_RULES:
+            if patron.search(texto):
                 # If ML predicts PERSONAL but intent is clearly medical or vacation, override
-                if regla['clase'] in ['ENFERMEDAD', 'VACACIONES']:
-                    return regla['clase']
+                if clase in ['ENFERMEDAD', 'VACACIONES']:
+                    return clase
                 # Otherwise keep ML unless completely uninformative
                 if tipo_ml is None or str(tipo_ml).strip() == '':
-                    return regla['clase']
+                    return clase
 
         # Default to ML result
         return tipo_ml
@@ -283,7 +500,8 @@ class ModelPredictor:
             segmento_ml
         ]], dtype=float)
         
-        prediction = model.predict(X)[0]
+        # The tree is trained on the first len(TREE_FEATURES) enriched features
+        prediction = model.predict(X[:, :getattr(model, 'n_features_in_', X.shape[1])])[0]
         decision = le.inverse_transform([prediction])[0]
         
         return decision
@@ -317,19 +535,74 @@ class ModelPredictor:
         dias_sugeridos = model.predict(X)[0]
         return max(1, int(round(dias_sugeridos)))  # At least 1 day
     
+    def find_similar(self, request_data, k=None):
+        """
+        Past solicitudes most similar to a request (motivo_texto plus employee
+        features), best first. Features missing from request_data are read from
+        the employee record when empleado_id is given.
+        
+        Raises:
+            LookupError: no similarity index has been trained yet
+        """
+        index = self.models.get('similarity_index')
+        if index is None:
+            raise LookupError("Similarity index not available. Please train models first.")
+        
+        features = {feature: request_data.get(feature) for feature in ROW_FEATURES}
+        missing = [feature for feature, value in features.items() if value is None and feature != 'dias_solicitados']
+        if missing and request_data.get('empleado_id') is not None:
+            employee = self.data_loader.load_employee_data(request_data['empleado_id'])
+            if employee:
+                features.update({feature: employee.get(feature) for feature in missing})
+        
+        return self._timed('similar', index.query, request_data.get('motivo_texto') or '', features,
+                           k or Config.SIMILAR_DEFAULT_K, request_data.get('solicitud_id'))
+    
+    def warm_up(self, iterations=None):
+        """
+        Push synthetic requests through every stage, so the first real
+        prediction does not pay sklearn/scipy first-call costs.
+        Warm-up latencies are discarded. Returns {'seconds': float, 'predictions': int}.
+        """
+        iterations = iterations or Config.WARMUP_ITERATIONS
+        started = time.perf_counter()
+        for _ in range(iterations):
+            for request in WARMUP_REQUESTS:
+                self.predict_prepared(dict(request))
+        seconds = time.perf_counter() - started
+        
+        # Synthetic calls are not traffic
+        self.latency = LatencyTracker(window=Config.LATENCY_WINDOW)
+        self.warmup = {'seconds': round(seconds, 4), 'predictions': iterations * len(WARMUP_REQUESTS)}
+        logger.info(f"Models warmed up with {self.warmup['predictions']} synthetic predictions in {seconds * 1000:.1f} ms")
+        return self.warmup
+    
     def get_model_status(self):
-        """Get status of loaded models"""
-        metadata_path = os.path.join(Config.MODELS_DIR, 'training_metadata.pkl')
+        """Get status of loaded models: memory, load time, parameters and rolling latency"""
+        stage_latency = self.latency.summaries()
+        models = {}
+        for model_name, info in self.model_info.items():
+            models[model_name] = {
+                **info,
+                'latency': stage_latency.get(info.get('stage'))
+            }
         
         status = {
             'models_loaded': list(self.models.keys()),
-            'models_count': len(self.models)
+            'models_count': len(self.models),
+            'total_memory_bytes': sum(info.get('memory_bytes', 0) for info in self.model_info.values()),
+            'total_file_bytes': sum(info.get('file_bytes', 0) for info in self.model_info.values()),
+            'total_load_seconds': round(sum(info.get('load_seconds', 0) for info in self.model_info.values()), 4),
+            'models': models,
+            'stages': stage_latency,
+            'warmup': self.warmup,
+            'fallbacks': self.fallbacks.report()
         }
         
-        if os.path.exists(metadata_path):
-            metadata = joblib.load(metadata_path)
-            status['last_training'] = metadata.get('training_date')
-            status['training_samples'] = metadata.get('sample_count')
-            status['metrics'] = metadata.get('metrics')
+        if self.metadata:
+            status['last_training'] = self.metadata.get('training_date')
+            status['training_samples'] = self.metadata.get('sample_count')
+            status['metrics'] = self.metadata.get('metrics')
+            status['training_stage_timings'] = self.metadata.get('stage_timings')
         
         return status
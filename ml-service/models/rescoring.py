@@ -0,0 +1,193 @@
+"""
+Set-based rescoring of PENDIENTE solicitudes after a training run.
+
+Pending rows are streamed in keyset-paginated chunks, scored with
+ModelPredictor.predict_batch and written back with one staged
+UPDATE ... FROM per chunk.
+
+Usage:
+    python -m models.rescoring [chunk_size]
+"""
+import logging
+import sys
+import threading
+import time
+import uuid
+from config import Config
+from database.connection import get_db_connection
+from database.bulk_loader import bulk_insert
+from models.data_loader import DataLoader
+
+logger = logging.getLogger(__name__)
+
+RESCORED_COLUMNS = ['ml_probabilidad_aprobacion', 'es_anomala', 'impacto_area_numerico', 'ml_dias_sugeridos']
+
+_PENDING_QUERY = """
+SELECT TOP ({chunk_size})
+    s.solicitud_id,
+    s.edad,
+    s.antiguedad_anios,
+    {dias_ult_ano} AS dias_ult_ano,
+    s.dias_solicitados,
+    s.motivo_texto,
+    s.tipo_permiso_real,
+    s.sanciones_activas,
+    s.inasistencias,
+    e.fecha_ingreso,
+    e.segmento_ml
+FROM solicitudes_permiso s
+INNER JOIN empleados e ON s.empleado_id = e.empleado_id
+{aggregates_join}
+WHERE s.resultado_rrhh = 'PENDIENTE'
+AND s.solicitud_id > ?
+ORDER BY s.solicitud_id
+"""
+
+# Global (##) temp table: bulk_insert uses fast_executemany, whose parameter description
+# (SQLDescribeParam) cannot see session-local #temp tables ("Invalid object name").
+# The name is unique per run and the table is dropped with the session at the latest.
+_STAGING_TABLE = """
+CREATE TABLE {table} (
+    solicitud_id INT NOT NULL PRIMARY KEY,
+    ml_probabilidad_aprobacion DECIMAL(5,4) NULL,
+    es_anomala BIT NULL,
+    impacto_area_numerico DECIMAL(5,2) NULL,
+    ml_dias_sugeridos INT NULL
+)
+"""
+
+# Rows decided while the job was running are left untouched
+_UPDATE_FROM_STAGING = """
+UPDATE s SET
+    s.ml_probabilidad_aprobacion = r.ml_probabilidad_aprobacion,
+    s.es_anomala = r.es_anomala,
+    s.impacto_area_numerico = r.impacto_area_numerico,
+    s.ml_dias_sugeridos = r.ml_dias_sugeridos
+FROM solicitudes_permiso s
+INNER JOIN {table} r ON r.solicitud_id = s.solicitud_id
+WHERE s.resultado_rrhh = 'PENDIENTE'
+"""
+
+_rescoring_lock = threading.Lock()
+
+
+class RescoringInProgress(RuntimeError):
+    """Raised when a rescoring run is requested while another one is running"""
+
+
+class PendingRescorer:
+    """Rescores every PENDIENTE solicitud with the currently loaded models"""
+
+    def __init__(self, predictor, chunk_size=None):
+        self.predictor = predictor
+        self.chunk_size = chunk_size or Config.RESCORE_CHUNK_SIZE
+
+    def _pending_query(self):
+        # Current leave history from the materialized aggregates when available
+        if Config.LEAVE_AGGREGATES_ENABLED and DataLoader.aggregates_available is not False:
+            return _PENDING_QUERY.format(
+                chunk_size=int(self.chunk_size),
+                dias_ult_ano='COALESCE(a.dias_autorizados_365d, s.dias_ult_ano, 0)',
+                aggregates_join='LEFT JOIN empleado_permiso_agregados a ON a.empleado_id = s.empleado_id'
+            )
+        return _PENDING_QUERY.format(
+            chunk_size=int(self.chunk_size),
+            dias_ult_ano='COALESCE(s.dias_ult_ano, 0)',
+            aggregates_join=''
+        )
+
+    def _fetch_chunk(self, db, last_id):
+        import pandas as pd
+        from models.features import fill_antiguedad
+
+        try:
+            rows = db.execute_query(self._pending_query(), (last_id,))
+        except Exception as e:
+            if DataLoader.aggregates_available is False or not Config.LEAVE_AGGREGATES_ENABLED:
+                raise
+            logger.warning(f"Leave aggregates unavailable for rescoring, using stored dias_ult_ano: {str(e)}")
+            DataLoader.aggregates_available = False
+            rows = db.execute_query(self._pending_query(), (last_id,))
+        return fill_antiguedad(pd.DataFrame(rows)) if rows else None
+
+    def run(self):
+        """Rescore all pending rows. Returns a summary dict."""
+        started = time.perf_counter()
+        rows = chunks = 0
+        last_id = 0
+        score_seconds = write_seconds = 0.0
+
+        with get_db_connection() as db:
+            connection = db.connection
+            cursor = connection.cursor()
+            staging = f"##rescoring_{uuid.uuid4().hex}"
+            cursor.execute(_STAGING_TABLE.format(table=staging))
+            try:
+                while True:
+                    chunk = self._fetch_chunk(db, last_id)
+                    if chunk is None:
+                        break
+
+                    scoring_started = time.perf_counter()
+                    scores = self.predictor.predict_batch(chunk)
+                    score_seconds += time.perf_counter() - scoring_started
+
+                    writing_started = time.perf_counter()
+                    cursor.execute(f"TRUNCATE TABLE {staging}")
+                    staged = zip(
+                        chunk['solicitud_id'].astype(int).tolist(),
+                        scores['ml_probabilidad_aprobacion'].astype(float).tolist(),
+                        scores['es_anomala'].astype(bool).tolist(),
+                        scores['impacto_area_numerico'].astype(float).tolist(),
+                        scores['ml_dias_sugeridos'].astype(int).tolist()
+                    )
+                    bulk_insert(connection, staging, ['solicitud_id'] + RESCORED_COLUMNS, staged)
+                    cursor.execute(_UPDATE_FROM_STAGING.format(table=staging))
+                    connection.commit()
+                    write_seconds += time.perf_counter() - writing_started
+
+                    rows += len(chunk)
+                    chunks += 1
+                    last_id = int(chunk['solicitud_id'].max())
+            finally:
+                cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+                cursor.close()
+
+        seconds = time.perf_counter() - started
+        summary = {
+            'rows': rows,
+            'chunks': chunks,
+            'chunk_size': self.chunk_size,
+            'seconds': round(seconds, 3),
+            'score_seconds': round(score_seconds, 3),
+            'write_seconds': round(write_seconds, 3),
+            'rows_per_second': round(rows / seconds, 1) if seconds > 0 else None
+        }
+        logger.info(f"Rescored {rows} pending solicitudes in {chunks} chunks ({summary['seconds']}s)")
+        return summary
+
+
+def rescore_pending(predictor, chunk_size=None):
+    """Run a rescoring pass unless one is already running (raises RescoringInProgress)"""
+    if not _rescoring_lock.acquire(blocking=False):
+        raise RescoringInProgress("A rescoring run is already in progress")
+    try:
+        return PendingRescorer(predictor, chunk_size).run()
+    finally:
+        _rescoring_lock.release()
+
+
+def main(argv=None):
+    from models.predictor import ModelPredictor
+
+    argv = sys.argv[1:] if argv is None else argv
+    chunk_size = int(argv[0]) if argv else None
+    summary = rescore_pending(ModelPredictor(), chunk_size)
+    print(f"✅ Rescored {summary['rows']} pending solicitudes in {summary['seconds']}s "
+          f"({summary['rows_per_second']} rows/s)")
+    return 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
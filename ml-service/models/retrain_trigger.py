@@ -0,0 +1,121 @@
+import joblib
+import logging
+import os
+from datetime import datetime
+from config import Config
+from models.data_loader import DataLoader
+
+logger = logging.getLogger(__name__)
+
+
+class RetrainTrigger:
+    """
+    Decides whether the models should be retrained based on cheap database signals:
+    - number of AUTORIZADO/RECHAZADO rows decided since the last training watermark
+    - drift of the label mix with respect to the training data
+    - input drift of live requests (PSI of the streaming histograms, see models/drift.py);
+      drift alone never retrains: the cached stages would rebuild the same models from the
+      same labels, so it only lowers the bar to "any newly decided request"
+    Consecutive trainings are always spaced by at least RETRAIN_MIN_SPACING_HOURS.
+    """
+
+    def __init__(self, data_loader=None, drift_source=None):
+        """drift_source: optional callable returning the live DriftMonitor report (or None)"""
+        self.data_loader = data_loader or DataLoader()
+        self.drift_source = drift_source
+        self.metadata_path = os.path.join(Config.MODELS_DIR, 'training_metadata.pkl')
+        self.last_triggered = None
+
+    def _load_metadata(self):
+        if not os.path.exists(self.metadata_path):
+            return {}
+        try:
+            return joblib.load(self.metadata_path)
+        except Exception as e:
+            logger.warning(f"Could not read training metadata: {e}")
+            return {}
+
+    @staticmethod
+    def label_drift(reference_counts, current_counts):
+        """Total variation distance between two label distributions (0 = same mix, 1 = disjoint)"""
+        reference_total = sum(reference_counts.values())
+        current_total = sum(current_counts.values())
+        if not reference_total or not current_total:
+            return 0.0
+        labels = set(reference_counts) | set(current_counts)
+        return 0.5 * sum(
+            abs(reference_counts.get(label, 0) / reference_total - current_counts.get(label, 0) / current_total)
+            for label in labels
+        )
+
+    def _hours_since(self, moment):
+        if moment is None:
+            return None
+        return (datetime.now() - moment).total_seconds() / 3600
+
+    def evaluate(self):
+        """
+        Check the signals and return a dict with the decision and the values that led to it:
+        {'should_train': bool, 'reason': str, 'new_labels': int, 'label_drift': float, ...}
+        """
+        metadata = self._load_metadata()
+        last_training = metadata.get('training_date')
+        last_training = datetime.fromisoformat(last_training) if last_training else None
+
+        # The most recent of the last recorded training and the last trigger fired by this process
+        last_run = max(filter(None, [last_training, self.last_triggered]), default=None)
+        hours_since_run = self._hours_since(last_run)
+
+        decision = {
+            'should_train': False,
+            'reason': None,
+            'new_labels': 0,
+            'label_drift': 0.0,
+            'hours_since_training': None if hours_since_run is None else round(hours_since_run, 2)
+        }
+
+        if last_run is None:
+            decision.update(should_train=True, reason='no previous training')
+            return decision
+
+        if hours_since_run < Config.RETRAIN_MIN_SPACING_HOURS:
+            decision['reason'] = 'minimum spacing between trainings not reached'
+            return decision
+
+        stats = self.data_loader.load_label_stats(metadata.get('data_watermark'))
+        current_counts = {label: values['total'] for label, values in stats.items()}
+        decision['new_labels'] = sum(values['nuevos'] for values in stats.values())
+        decision['label_drift'] = round(self.label_drift(metadata.get('label_counts', {}), current_counts), 4)
+
+        input_drift = self._input_drift()
+        decision['input_drift'] = input_drift
+        
+        if decision['new_labels'] >= Config.RETRAIN_MIN_NEW_LABELS:
+            decision.update(should_train=True, reason=f"{decision['new_labels']} newly decided requests")
+        elif decision['label_drift'] >= Config.RETRAIN_LABEL_DRIFT_THRESHOLD:
+            decision.update(should_train=True, reason=f"label mix drift {decision['label_drift']:.4f}")
+        elif input_drift and Config.RETRAIN_ON_DRIFT and decision['new_labels'] > 0:
+            decision.update(should_train=True, reason=f"input drift in {', '.join(input_drift)}")
+        elif decision['new_labels'] > 0 and hours_since_run >= Config.TRAINING_SCHEDULE_HOURS:
+            decision.update(should_train=True, reason=f"models older than {Config.TRAINING_SCHEDULE_HOURS} hours")
+        elif input_drift:
+            decision['reason'] = f"input drift in {', '.join(input_drift)}, no newly decided requests to learn from"
+        else:
+            decision['reason'] = 'thresholds not crossed'
+
+        return decision
+
+    def _input_drift(self):
+        """Features whose live distribution drifted past DRIFT_PSI_THRESHOLD ([] if unknown)"""
+        if self.drift_source is None:
+            return []
+        try:
+            report = self.drift_source()
+        except Exception as e:
+            logger.warning(f"Could not read input drift: {e}")
+            return []
+        return report['drifted_features'] if report else []
+
+    def mark_triggered(self):
+        """Record that a training was just started (enforces the minimum spacing)"""
+        self.last_triggered = datetime.now()
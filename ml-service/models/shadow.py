@@ -0,0 +1,174 @@
+"""
+Shadow evaluation of a challenger model set.
+
+The live ModelPredictor hands each prepared request, its predictions and its
+per-stage timings to ShadowEvaluator.submit, which samples and enqueues them
+without blocking. A background worker scores the sampled requests with the
+challenger and records per-stage agreement and latency deltas.
+"""
+import copy
+import logging
+import queue
+import random
+import threading
+from models.model_stats import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+# Stage -> (prediction key, tolerance). None compares labels exactly, a number
+# counts numeric outputs within that absolute difference as agreeing.
+STAGE_OUTPUTS = {
+    'tipo_permiso': ('tipo_permiso_real', None),
+    'anomaly': ('es_anomala', None),
+    'impacto': ('impacto_area_numerico', 1.0),
+    'probabilities': ('ml_probabilidad_aprobacion', 0.05),
+    'decision': ('resultado_rrhh', None),
+    'segment': ('segmento_ml', None),
+    'suggest_days': ('ml_dias_sugeridos', 0)
+}
+
+
+class _StageStats:
+    __slots__ = ('compared', 'agreed', 'abs_diff', 'live_seconds', 'challenger_seconds', 'timed')
+
+    def __init__(self):
+        self.compared = 0
+        self.agreed = 0
+        self.abs_diff = 0.0
+        self.live_seconds = 0.0
+        self.challenger_seconds = 0.0
+        self.timed = 0
+
+    def report(self, numeric):
+        report = {
+            'compared': self.compared,
+            'agreement_rate': round(self.agreed / self.compared, 4) if self.compared else None
+        }
+        if numeric:
+            report['mean_abs_diff'] = round(self.abs_diff / self.compared, 4) if self.compared else None
+        if self.timed:
+            live_ms = self.live_seconds / self.timed * 1000
+            challenger_ms = self.challenger_seconds / self.timed * 1000
+            report.update({
+                'live_mean_ms': round(live_ms, 3),
+                'challenger_mean_ms': round(challenger_ms, 3),
+                'latency_delta_ms': round(challenger_ms - live_ms, 3)
+            })
+        return report
+
+
+class ShadowEvaluator:
+    """Scores a sampled fraction of live requests with a challenger predictor, off the request path"""
+
+    def __init__(self, challenger, sample_rate=0.1, queue_size=100, models_dir=None):
+        self.challenger = challenger
+        self.sample_rate = sample_rate
+        self.models_dir = models_dir
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._worker = None
+        self._random = random.Random()
+        self.reset()
+
+    def reset(self):
+        """Clear the comparison counters (e.g. after the live models were reloaded)"""
+        with self._lock:
+            self._stages = {stage: _StageStats() for stage in STAGE_OUTPUTS}
+            self._counters = {'seen': 0, 'sampled': 0, 'dropped': 0, 'scored': 0, 'errors': 0}
+            self._full_agreement = 0
+            self._total_delta = LatencyTracker(window=1000)
+
+    def submit(self, data, predictions, timings):
+        """Called by the live predictor after each prediction. Never blocks: drops work when the queue is full."""
+        with self._lock:
+            self._counters['seen'] += 1
+            if self._random.random() >= self.sample_rate:
+                return False
+            self._counters['sampled'] += 1
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((copy.deepcopy(data), predictions, dict(timings)))
+            return True
+        except queue.Full:
+            with self._lock:
+                self._counters['dropped'] += 1
+            return False
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='shadow-evaluator', daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            data, live, live_timings = self._queue.get()
+            try:
+                self._evaluate(data, live, live_timings)
+            except Exception as e:
+                with self._lock:
+                    self._counters['errors'] += 1
+                logger.warning(f"Shadow evaluation failed: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def _evaluate(self, data, live, live_timings):
+        challenger_timings = {}
+        challenger = self.challenger.predict_prepared(data, challenger_timings)
+
+        with self._lock:
+            self._counters['scored'] += 1
+            all_agree = True
+            for stage, (key, tolerance) in STAGE_OUTPUTS.items():
+                # A fallback value served under a deadline says nothing about the live model
+                if stage in live.get('etapas_degradadas', {}):
+                    continue
+                stats = self._stages[stage]
+                stats.compared += 1
+                if tolerance is None:
+                    agreed = live[key] == challenger[key]
+                else:
+                    diff = abs(float(live[key]) - float(challenger[key]))
+                    stats.abs_diff += diff
+                    agreed = diff <= tolerance
+                stats.agreed += int(agreed)
+                all_agree = all_agree and agreed
+
+                if stage in live_timings and stage in challenger_timings:
+                    stats.timed += 1
+                    stats.live_seconds += live_timings[stage]
+                    stats.challenger_seconds += challenger_timings[stage]
+            self._full_agreement += int(all_agree)
+
+        model_stages = set(STAGE_OUTPUTS)
+        delta = (sum(s for stage, s in challenger_timings.items() if stage in model_stages)
+                 - sum(s for stage, s in live_timings.items() if stage in model_stages))
+        self._total_delta.record('total', delta)
+
+    def wait(self):
+        """Block until every queued request was evaluated (tests and CLI use)"""
+        self._queue.join()
+
+    def report(self):
+        """Agreement per stage, latency deltas and sampling/drop counters"""
+        with self._lock:
+            counters = dict(self._counters)
+            stages = {
+                stage: self._stages[stage].report(numeric=tolerance is not None)
+                for stage, (_, tolerance) in STAGE_OUTPUTS.items()
+            }
+            full_agreement = self._full_agreement
+        return {
+            'enabled': True,
+            'challenger_models_dir': self.models_dir,
+            'sample_rate': self.sample_rate,
+            'queue_size': self._queue.maxsize,
+            'queued': self._queue.qsize(),
+            **counters,
+            'full_agreement_rate': round(full_agreement / counters['scored'], 4) if counters['scored'] else None,
+            # Mean/percentiles of (challenger - live) model time per request
+            'total_latency_delta': self._total_delta.summary('total'),
+            'stages': stages
+        }
@@ -0,0 +1,335 @@
+"""
+Similar past solicitudes for RRHH reviewers.
+
+Built by the trainer over the decided solicitudes and updated incrementally
+from the database afterwards. Identical motivos (after normalize_text) are
+collapsed into one document, so the template-like corpus indexes far fewer
+documents than rows. Every TF-IDF term keeps an impact-ordered postings list
+truncated to its postings_limit heaviest documents, so a lookup only touches
+the postings of the query's own terms. The best text matches are expanded to
+their rows and re-ranked with employee-feature similarity.
+"""
+import logging
+import math
+import threading
+import time
+from collections import Counter
+import numpy as np
+from models.text_processing import normalize_text, text_vectorizer_params
+
+logger = logging.getLogger(__name__)
+
+# Standardized employee features compared between the request and past rows
+ROW_FEATURES = ['edad', 'antiguedad_anios', 'dias_ult_ano', 'dias_solicitados']
+
+_NEW_ROWS_QUERY = """
+SELECT
+    s.solicitud_id,
+    s.empleado_id,
+    s.edad,
+    s.antiguedad_anios,
+    s.dias_ult_ano,
+    s.dias_solicitados,
+    s.motivo_texto,
+    s.tipo_permiso_real,
+    s.resultado_rrhh,
+    COALESCE(s.fecha_decision, s.fecha_solicitud) AS fecha_decision
+FROM solicitudes_permiso s
+WHERE s.resultado_rrhh IN ('AUTORIZADO', 'RECHAZADO')
+AND COALESCE(s.fecha_decision, s.fecha_solicitud) > ?
+ORDER BY COALESCE(s.fecha_decision, s.fecha_solicitud), s.solicitud_id
+"""
+
+
+def _missing(value):
+    # None, NaN and NaT (NaN != NaN)
+    return value is None or value != value
+
+
+def _float(value, default):
+    try:
+        value = float(value)
+        return default if math.isnan(value) else value
+    except (TypeError, ValueError):
+        return default
+
+
+class SimilarityIndex:
+    """Inverted index over motivo_texto with employee-feature re-ranking (thread-safe)"""
+
+    def __init__(self, vectorizer, postings_limit=1000, text_weight=0.7, candidate_docs=20,
+                 candidate_rows=2000):
+        """
+        Args:
+            vectorizer: fitted TfidfVectorizer (its vocabulary and IDF are fixed until the next training)
+            postings_limit: documents kept per term, heaviest first
+            text_weight: share of the text similarity in the final score (rest: employee features)
+            candidate_docs: best text matches expanded to rows
+            candidate_rows: rows re-ranked per lookup (most recent rows of each candidate document)
+        """
+        self.vectorizer = vectorizer
+        self.postings_limit = postings_limit
+        self.text_weight = text_weight
+        self.candidate_docs = candidate_docs
+        self.candidate_rows = candidate_rows
+        self._analyzer = vectorizer.build_analyzer()
+        self._vocabulary = vectorizer.vocabulary_
+        self._idf = np.asarray(vectorizer.idf_, dtype=np.float64)
+
+        # Documents (distinct normalized motivos)
+        self._doc_ids = {}
+        # Raw motivo -> document, skips re-normalizing repeated texts
+        self._raw_doc_ids = {}
+        self._doc_text = []
+        self._doc_rows = []
+        self._pending_doc_rows = {}
+        # term -> (doc ids, weights) sorted by descending weight
+        self._postings = {}
+        self._pending_postings = {}
+
+        # Rows (one per solicitud), in growable arrays
+        self._n_rows = 0
+        self._solicitud_id = np.empty(0, dtype=np.int64)
+        self._empleado_id = np.empty(0, dtype=np.int64)
+        self._features = np.empty((0, len(ROW_FEATURES)), dtype=np.float32)
+        self._row_doc = np.empty(0, dtype=np.int32)
+        self._resultado = np.empty(0, dtype=object)
+        self._tipo = np.empty(0, dtype=object)
+        self._feature_mean = np.zeros(len(ROW_FEATURES))
+        self._feature_std = np.ones(len(ROW_FEATURES))
+        self.watermark = None
+        self._lock = threading.RLock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock'], state['_analyzer']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+        self._analyzer = self.vectorizer.build_analyzer()
+
+    @classmethod
+    def build(cls, df, **params):
+        """Index every row of a training DataFrame (solicitud_id, empleado_id, motivo_texto, resultado_rrhh, ...)"""
+        # Training-time only
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        texts = df['motivo_texto'].fillna('').astype(str)
+        vectorizer = TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True, **text_vectorizer_params())
+        vectorizer.fit(texts.drop_duplicates().map(normalize_text).drop_duplicates())
+        index = cls(vectorizer, **params)
+
+        features = np.column_stack([
+            np.nan_to_num(np.asarray(df[column] if column in df else np.zeros(len(df)), dtype=np.float64))
+            for column in ROW_FEATURES
+        ])
+        if len(df):
+            std = features.std(axis=0)
+            index._feature_mean = features.mean(axis=0)
+            index._feature_std = np.where(std > 0, std, 1.0)
+        index.add(df.to_dict('records'))
+        return index
+
+    def _vector(self, text):
+        """Sparse TF-IDF vector of a motivo as (term ids, l2-normalized weights), same weighting as the vectorizer"""
+        counts = Counter(term for term in self._analyzer(text) if term in self._vocabulary)
+        if not counts:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        terms = np.fromiter((self._vocabulary[term] for term in counts), dtype=np.int64, count=len(counts))
+        weights = (1.0 + np.log(np.fromiter(counts.values(), dtype=np.float64, count=len(counts)))) * self._idf[terms]
+        return terms, weights / np.linalg.norm(weights)
+
+    def _ensure_capacity(self, extra):
+        needed = self._n_rows + extra
+        if needed <= len(self._solicitud_id):
+            return
+        capacity = max(needed, 2 * len(self._solicitud_id), 1024)
+
+        def grow(array):
+            grown = np.empty((capacity,) + array.shape[1:], dtype=array.dtype)
+            grown[:self._n_rows] = array[:self._n_rows]
+            return grown
+
+        self._solicitud_id = grow(self._solicitud_id)
+        self._empleado_id = grow(self._empleado_id)
+        self._features = grow(self._features)
+        self._row_doc = grow(self._row_doc)
+        self._resultado = grow(self._resultado)
+        self._tipo = grow(self._tipo)
+
+    def add(self, rows):
+        """
+        Add decided solicitudes (dicts). A solicitud already indexed only gets its
+        resultado_rrhh updated. New motivos become new documents scored with the
+        training vocabulary (terms unseen in training are ignored until the next build).
+        Returns the number of new rows.
+        """
+        with self._lock:
+            known = {}
+            if self._n_rows:
+                ids = np.array([_float(row.get('solicitud_id'), -1) for row in rows], dtype=np.int64)
+                positions = np.flatnonzero(np.isin(self._solicitud_id[:self._n_rows], ids))
+                known = {int(self._solicitud_id[p]): p for p in positions}
+
+            self._ensure_capacity(len(rows))
+            added = 0
+            for row in rows:
+                solicitud_id = int(_float(row.get('solicitud_id'), -1))
+                if solicitud_id in known:
+                    self._resultado[known[solicitud_id]] = row.get('resultado_rrhh')
+                    continue
+                text = row.get('motivo_texto')
+                doc = self._document('' if _missing(text) else str(text))
+                position = self._n_rows
+                self._solicitud_id[position] = solicitud_id
+                self._empleado_id[position] = int(_float(row.get('empleado_id'), -1))
+                self._features[position] = [
+                    _float(row.get(column), self._feature_mean[i]) for i, column in enumerate(ROW_FEATURES)
+                ]
+                self._row_doc[position] = doc
+                self._resultado[position] = row.get('resultado_rrhh')
+                self._tipo[position] = row.get('tipo_permiso_real')
+                self._pending_doc_rows.setdefault(doc, []).append(position)
+                self._n_rows += 1
+                known[solicitud_id] = position
+                added += 1
+
+                decided = row.get('fecha_decision')
+                if _missing(decided):
+                    decided = row.get('fecha_solicitud')
+                if not _missing(decided):
+                    try:
+                        if self.watermark is None or decided > self.watermark:
+                            self.watermark = decided
+                    except TypeError:
+                        pass
+            self.compact()
+            return added
+
+    def _document(self, text):
+        """Document id of a motivo, creating (and posting) it if new"""
+        doc = self._raw_doc_ids.get(text)
+        if doc is not None:
+            return doc
+        normalized = normalize_text(text)
+        doc = self._doc_ids.get(normalized)
+        if doc is not None:
+            self._raw_doc_ids[text] = doc
+            return doc
+        doc = len(self._doc_text)
+        self._doc_ids[normalized] = doc
+        self._raw_doc_ids[text] = doc
+        self._doc_text.append(text)
+        self._doc_rows.append(np.empty(0, dtype=np.int64))
+        terms, weights = self._vector(normalized)
+        for term, weight in zip(terms.tolist(), weights.tolist()):
+            self._pending_postings.setdefault(term, []).append((doc, weight))
+        return doc
+
+    def compact(self):
+        """Merge pending documents and rows into the sorted postings / row arrays"""
+        with self._lock:
+            for term, entries in self._pending_postings.items():
+                docs = np.fromiter((doc for doc, _ in entries), dtype=np.int32, count=len(entries))
+                weights = np.fromiter((weight for _, weight in entries), dtype=np.float32, count=len(entries))
+                if term in self._postings:
+                    docs = np.concatenate([self._postings[term][0], docs])
+                    weights = np.concatenate([self._postings[term][1], weights])
+                order = np.argsort(-weights, kind='stable')[:self.postings_limit]
+                self._postings[term] = (docs[order], weights[order])
+            for doc, positions in self._pending_doc_rows.items():
+                self._doc_rows[doc] = np.concatenate([self._doc_rows[doc], np.asarray(positions, dtype=np.int64)])
+            self._pending_postings = {}
+            self._pending_doc_rows = {}
+
+    def query(self, motivo_texto, features=None, k=5, exclude_solicitud_id=None):
+        """
+        Top-k past solicitudes for a motivo and the requesting employee's features
+        (dict with any of ROW_FEATURES; missing ones do not affect the ranking).
+        Returns a list of dicts, best first.
+        """
+        terms, weights = self._vector(normalize_text(motivo_texto))
+        if len(terms) == 0:
+            return []
+
+        with self._lock:
+            # Text score: accumulate query weight x document weight over the query's postings
+            doc_parts, score_parts = [], []
+            for term, weight in zip(terms.tolist(), weights.tolist()):
+                postings = self._postings.get(term)
+                if postings is not None:
+                    doc_parts.append(postings[0])
+                    score_parts.append(postings[1] * weight)
+            if not doc_parts:
+                return []
+            docs, inverse = np.unique(np.concatenate(doc_parts), return_inverse=True)
+            doc_scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+            if len(docs) > self.candidate_docs:
+                best = np.argpartition(-doc_scores, self.candidate_docs)[:self.candidate_docs]
+                docs, doc_scores = docs[best], doc_scores[best]
+
+            # Expand the candidate documents to their most recent rows
+            per_doc = max(1, self.candidate_rows // len(docs))
+            doc_rows = [self._doc_rows[doc][-per_doc:] for doc in docs.tolist()]
+            rows = np.concatenate(doc_rows)
+            text_similarity = np.repeat(doc_scores, [len(positions) for positions in doc_rows])
+            if exclude_solicitud_id is not None:
+                keep = self._solicitud_id[rows] != int(exclude_solicitud_id)
+                rows, text_similarity = rows[keep], text_similarity[keep]
+            if len(rows) == 0:
+                return []
+            employee_similarity = self._employee_similarity(rows, features or {})
+
+            score = self.text_weight * text_similarity + (1 - self.text_weight) * employee_similarity
+            top = np.argpartition(-score, k - 1)[:k] if len(score) > k else np.arange(len(score))
+            top = top[np.argsort(-score[top], kind='stable')]
+            return [
+                {
+                    'solicitud_id': int(self._solicitud_id[rows[i]]),
+                    'empleado_id': int(self._empleado_id[rows[i]]),
+                    'motivo_texto': self._doc_text[self._row_doc[rows[i]]],
+                    'tipo_permiso_real': self._tipo[rows[i]],
+                    'resultado_rrhh': self._resultado[rows[i]],
+                    'dias_solicitados': float(self._features[rows[i], ROW_FEATURES.index('dias_solicitados')]),
+                    'similitud': round(float(score[i]), 4),
+                    'similitud_texto': round(float(text_similarity[i]), 4),
+                    'similitud_empleado': round(float(employee_similarity[i]), 4)
+                }
+                for i in top.tolist()
+            ]
+
+    def _employee_similarity(self, rows, features):
+        """1 / (1 + standardized Euclidean distance) over the features given in the request"""
+        columns = [i for i, column in enumerate(ROW_FEATURES) if features.get(column) is not None]
+        if not columns:
+            return np.zeros(len(rows))
+        query = np.array([_float(features[ROW_FEATURES[i]], self._feature_mean[i]) for i in columns])
+        scale = self._feature_std[columns]
+        diff = (self._features[rows][:, columns] - query) / scale
+        return 1.0 / (1.0 + np.sqrt((diff * diff).sum(axis=1)))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rows': int(self._n_rows),
+                'documents': len(self._doc_text),
+                'terms': len(self._postings),
+                'postings': int(sum(len(docs) for docs, _ in self._postings.values())),
+                'watermark': self.watermark.isoformat() if hasattr(self.watermark, 'isoformat') else self.watermark
+            }
+
+
+def refresh(index):
+    """Add the solicitudes decided after the index watermark. Returns the number of new rows."""
+    from database.connection import get_db_connection
+
+    started = time.perf_counter()
+    since = index.watermark or '1900-01-01'
+    with get_db_connection() as db:
+        rows = db.execute_query(_NEW_ROWS_QUERY, (since,))
+    added = index.add(rows) if rows else 0
+    logger.info(f"Similarity index refreshed: {added} new of {len(rows)} decided rows "
+                f"in {(time.perf_counter() - started) * 1000:.1f} ms")
+    return added
@@ -0,0 +1,107 @@
+import hashlib
+import inspect
+import logging
+import os
+import joblib
+import pandas as pd
+from datetime import datetime
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class StageCache:
+    """
+    Keeps a manifest of the last successful run of every training stage.
+
+    Each entry stores the stage fingerprint (input data + hyperparameters + code
+    version), the artifacts it produced and its metrics, so an unchanged stage can
+    reuse its pickles instead of being refitted.
+    """
+
+    def __init__(self, models_dir=None):
+        self.models_dir = models_dir or Config.MODELS_DIR
+        self.manifest_path = os.path.join(self.models_dir, 'stage_manifest.pkl')
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {}
+        try:
+            return joblib.load(self.manifest_path)
+        except Exception as e:
+            logger.warning(f"Stage manifest unreadable, all stages will be retrained: {e}")
+            return {}
+
+    def _save_manifest(self):
+        Config.ensure_directories()
+        tmp_path = f"{self.manifest_path}.tmp"
+        joblib.dump(self.manifest, tmp_path)
+        os.replace(tmp_path, self.manifest_path)
+
+    @staticmethod
+    def data_fingerprint(df, columns):
+        """Hash the given columns of the training data (missing columns are ignored)"""
+        present = [c for c in columns if c in df.columns]
+        digest = hashlib.sha256()
+        digest.update(repr(present).encode())
+        digest.update(str(len(df)).encode())
+        if present:
+            try:
+                hashed = pd.util.hash_pandas_object(df[present], index=False)
+                digest.update(hashed.to_numpy().tobytes())
+            except TypeError:
+                # Unhashable objects in a column: fall back to the CSV representation
+                digest.update(df[present].to_csv(index=False).encode())
+        return digest.hexdigest()
+
+    @staticmethod
+    def code_fingerprint(*objects):
+        """Hash the source code of the callables/modules a stage depends on"""
+        digest = hashlib.sha256()
+        for obj in objects:
+            try:
+                digest.update(inspect.getsource(obj).encode())
+            except (OSError, TypeError):
+                digest.update(getattr(getattr(obj, '__code__', None), 'co_code', repr(obj).encode()))
+        return digest.hexdigest()
+
+    @staticmethod
+    def combine(*parts):
+        """Combine several fingerprints/values into the final stage fingerprint"""
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(repr(part).encode())
+        return digest.hexdigest()
+
+    def lookup(self, stage_name, fingerprint):
+        """Return the manifest entry if the stage is unchanged and its artifacts still exist"""
+        entry = self.manifest.get(stage_name)
+        if not entry or entry.get('fingerprint') != fingerprint:
+            return None
+        for artifact in entry.get('artifacts', []):
+            path = Config.MODEL_PATHS.get(artifact)
+            if not path or not os.path.exists(path):
+                logger.info(f"Stage {stage_name}: artifact {artifact} missing, retraining")
+                return None
+        return entry
+
+    def load_artifacts(self, entry):
+        """Load the pickles recorded for a stage"""
+        return {
+            artifact: joblib.load(Config.MODEL_PATHS[artifact])
+            for artifact in entry.get('artifacts', [])
+        }
+
+    def record(self, stage_name, fingerprint, artifacts, metrics):
+        """Persist a successful stage so later runs (or a resumed run) can reuse it"""
+        self.manifest[stage_name] = {
+            'fingerprint': fingerprint,
+            'artifacts': list(artifacts),
+            'metrics': metrics,
+            'trained_at': datetime.now().isoformat()
+        }
+        self._save_manifest()
+
+    def get(self, stage_name):
+        return self.manifest.get(stage_name)
@@ -0,0 +1,60 @@
+import re
+import unicodedata
+
+# Same token definition as sklearn's default token_pattern, compiled once
+TOKEN_RE = re.compile(r'\b\w\w+\b')
+
+# Non-ASCII characters (fast path: most motivos are already plain ASCII)
+_NON_ASCII_RE = re.compile(r'[^\x00-\x7f]')
+
+
+def fold_accents(text):
+    """Remove diacritics: 'clínica' -> 'clinica', 'odontólogo' -> 'odontologo'"""
+    if not _NON_ASCII_RE.search(text):
+        return text
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def normalize_text(text):
+    """Lowercase and accent-fold a motivo_texto (None-safe)"""
+    if not text:
+        return ''
+    return fold_accents(str(text).lower())
+
+
+_RAW_STOPWORDS = [
+    'de', 'la', 'que', 'el', 'en', 'y', 'a', 'los', 'del', 'se', 'las', 'por', 'un', 'para', 'con', 'no', 'una', 'su', 'al', 'lo', 'como', 'más', 'pero', 'sus', 'le', 'ya', 'o', 'este', 'sí', 'porque', 'esta', 'entre', 'cuando', 'muy', 'sin', 'sobre', 'también', 'me', 'hasta', 'hay', 'donde', 'quien', 'desde', 'todo', 'nos', 'durante', 'todos', 'uno', 'les', 'ni', 'contra', 'otros', 'ese', 'eso', 'ante', 'ellos', 'e', 'esto', 'mí', 'antes', 'algunos', 'qué', 'unos', 'yo', 'otro', 'otras', 'otra', 'él', 'tanto', 'esa', 'estos', 'mucho', 'quienes', 'nada', 'muchos', 'cual', 'poco', 'ella', 'estar', 'estas', 'algunas', 'algo', 'nosotros', 'mi', 'mis', 'tú', 'te', 'ti', 'tu', 'tus', 'ellas', 'nosotras', 'vosotros', 'vosotras', 'os', 'mío', 'mía', 'míos', 'mías', 'tuyo', 'tuya', 'tuyos', 'tuyas', 'suyo', 'suya', 'suyos', 'suyas', 'nuestro', 'nuestra', 'nuestros', 'nuestras', 'vuestro', 'vuestra', 'vuestros', 'vuestras', 'esos', 'esas'
+]
+
+# Spanish stopwords, accent-folded so they match normalized tokens
+SPANISH_STOPWORDS = frozenset(normalize_text(word) for word in _RAW_STOPWORDS)
+
+
+def tokenize(text):
+    """
+    Tokenizer shared by training and serving.
+    Expects text already passed through normalize_text (the vectorizers' preprocessor)
+    and drops Spanish stopwords.
+    """
+    return [token for token in TOKEN_RE.findall(text) if token not in SPANISH_STOPWORDS]
+
+
+def text_vectorizer_params():
+    """Keyword arguments that plug the shared preprocessing into sklearn text vectorizers"""
+    return {
+        'preprocessor': normalize_text,
+        'tokenizer': tokenize,
+        'token_pattern': None,
+        'lowercase': False,
+        'stop_words': None
+    }
+
+
+def compile_keywords(keywords):
+    """
+    Precompile a keyword list into one regex matched against normalize_text output.
+    Keywords are accent-folded and de-duplicated, so 'médico' and 'medico' are one entry.
+    """
+    folded = sorted({normalize_text(keyword) for keyword in keywords}, key=len, reverse=True)
+    return re.compile('|'.join(re.escape(keyword) for keyword in folded))
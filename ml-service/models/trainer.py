@@ -1,10 +1,15 @@
 import pandas as pd
 import numpy as np
+import copy
 import joblib
 import logging
+import time
+from collections import namedtuple
 from datetime import datetime
+from sklearn.base import clone
 from sklearn.model_selection import train_test_split
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer, TfidfTransformer
+from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 from sklearn.naive_bayes import MultinomialNB
 from sklearn.svm import OneClassSVM, LinearSVC
@@ -25,23 +30,128 @@ from sklearn.metrics import (
 
 from config import Config
 from models.data_loader import DataLoader
+from models.features import build_decision_features, DECISION_FEATURES, TREE_FEATURES
+from models.stage_cache import StageCache
+from models.compaction import compact_artifact, artifact_size
+from models.calibration import CollapsedSigmoidClassifier, brier_score, expected_calibration_error
+from models.drift import build_reference
+from models.similarity_index import SimilarityIndex
+from models.neighbor_index import CellNeighborRegressor, KNN_ENGINES
+from models import calibration, compaction, neighbor_index, similarity_index, text_processing, vocabulary
+from models.text_processing import text_vectorizer_params
 
 logger = logging.getLogger(__name__)
 
+# Bump to force every stage to retrain (e.g. after a library upgrade)
+STAGE_CODE_VERSION = '1'
+
+TEXT_COLUMNS = ['motivo_texto', 'tipo_permiso_real']
+TEXT_CONFIG_KEYS = ['TEXT_FEATURES_MODE', 'HASHING_N_FEATURES', 'HASHING_USE_IDF',
+                    'MODEL_COMPACTION', 'COEF_PRUNE_THRESHOLD', 'VOCAB_SELECTION', 'VOCAB_SELECTION_K',
+                    'VOCAB_SELECTION_MIN_SCORE', 'VOCAB_SELECTION_MAX_ACCURACY_LOSS']
+
+# Artifacts compacted at save time (float32 / sparse coefficients)
+COMPACTABLE_MODELS = {'naive_bayes', 'vectorizer', 'svm_text', 'tfidf', 'logreg_text', 'tfidf_logreg'}
+DECISION_COLUMNS = [
+    'dias_solicitados', 'dias_ult_ano', 'antiguedad_anios', 'motivo_texto', 'tipo_permiso_real',
+    'impacto_area_numerico', 'es_anomala', 'sanciones_activas', 'inasistencias', 'segmento_ml',
+    'resultado_rrhh'
+]
+
+
+class TrainingStage(namedtuple('TrainingStage', 'name method columns outputs depends_on required config_keys code',
+                               defaults=((),))):
+    """
+    One step of the training pipeline.
+
+    columns: input columns hashed into the stage fingerprint
+    outputs: keys of self.models (and Config.MODEL_PATHS) produced by the stage
+    depends_on: upstream stages whose fingerprints feed into this one
+    required: if False a failure is logged and the pipeline continues
+    config_keys: Config attributes that act as hyperparameters of the stage
+    code: trainer helpers (method names) and modules the stage relies on besides its
+          own method, hashed into the fingerprint so that editing them retrains the stage
+    """
+
+
+# Helpers shared by the text classifiers (compaction runs when their artifacts are saved)
+TEXT_STAGE_CODE = ('_build_text_vectorizer', '_select_vocabulary', '_compact_model', compaction, vocabulary)
+
+
+TRAINING_STAGES = [
+    # Text classification models (multi-clase tipo_permiso_real)
+    TrainingStage('naive_bayes', '_train_naive_bayes', TEXT_COLUMNS,
+                  ['naive_bayes', 'vectorizer'], [], True, TEXT_CONFIG_KEYS, TEXT_STAGE_CODE),
+    TrainingStage('svm_text', '_train_svm_text', TEXT_COLUMNS,
+                  ['svm_text', 'tfidf'], [], True, TEXT_CONFIG_KEYS, TEXT_STAGE_CODE),
+    TrainingStage('logreg_text', '_train_logreg_text', TEXT_COLUMNS,
+                  ['logreg_text', 'tfidf_logreg'], [], False, TEXT_CONFIG_KEYS, TEXT_STAGE_CODE),
+    # Anomaly detection (no split required unsupervised)
+    TrainingStage('one_class_svm', '_train_one_class_svm',
+                  ['dias_solicitados', 'dias_ult_ano', 'antiguedad_anios'],
+                  ['svm'], [], True, []),
+    # Regression / classification with business features
+    TrainingStage('linear_regression', '_train_linear_regression',
+                  ['dias_solicitados', 'dias_ult_ano', 'antiguedad_anios', 'impacto_area_numerico'],
+                  ['regression'], [], True, []),
+    TrainingStage('logistic_regression', '_train_logistic_regression', DECISION_COLUMNS,
+                  ['logistic', 'logistic_calibrated', 'label_encoder'], [], True, ['COLLAPSE_CALIBRATION'],
+                  ('_report_calibration', calibration)),
+    TrainingStage('decision_tree', '_train_decision_tree', DECISION_COLUMNS,
+                  ['tree'], ['logistic_regression'], True, []),
+    # Clustering & recommendation
+    TrainingStage('kmeans', '_train_kmeans', ['edad', 'antiguedad_anios', 'dias_ult_ano'],
+                  ['kmeans', 'scaler'], [], True, []),
+    TrainingStage('knn', '_train_knn', ['dias_ult_ano', 'antiguedad_anios', 'edad', 'dias_solicitados'],
+                  ['knn'], [], True, ['KNN_ENGINE', 'KNN_NEIGHBORS', 'KNN_CELL_SIZE'], (neighbor_index,)),
+    # Search index of past solicitudes (served by POST /api/ml/similar)
+    TrainingStage('similarity_index', '_build_similarity_index',
+                  ['solicitud_id', 'empleado_id', 'motivo_texto', 'tipo_permiso_real', 'resultado_rrhh',
+                   'edad', 'antiguedad_anios', 'dias_ult_ano', 'dias_solicitados', 'fecha_decision'],
+                  ['similarity_index'], [], False,
+                  ['SIMILAR_POSTINGS_LIMIT', 'SIMILAR_TEXT_WEIGHT', 'SIMILAR_CANDIDATE_DOCS', 'SIMILAR_CANDIDATE_ROWS'],
+                  (similarity_index,)),
+]
+
+
 class ModelTrainer:
     """Trains all 7 ML models using data from the database"""
     
-    def __init__(self):
+    def __init__(self, force=False, progress_callback=None):
         self.data_loader = DataLoader()
+        self.progress_callback = progress_callback
         self.models = {}
         self.training_metrics = {}
+        self.features = None
+        self.force = force
+        self.stage_cache = StageCache()
+        self.stage_fingerprints = {}
+        self.stage_status = {}
+        self.stage_timings = {}
+        self.holdouts = {}
+    
+    def _report(self, event_type, **details):
+        """Forward a progress event to the caller (e.g. the training job manager)"""
+        if self.progress_callback is None:
+            return
+        try:
+            self.progress_callback({'type': event_type, **details})
+        except Exception as e:
+            logger.warning(f"Progress callback failed: {e}")
     
     def train_all_models(self):
-        """Train all 7 models and save them"""
+        """
+        Train all 7 models and save them.
+        Stages whose fingerprint matches the previous run reuse their stored
+        artifacts and metrics instead of being refitted.
+        """
         logger.info("Starting model training process...")
         
         # Load training data
+        started = time.perf_counter()
         df = self.data_loader.load_training_data()
+        self.stage_timings['load_data'] = round(time.perf_counter() - started, 3)
+        self._report('data_loaded', samples=len(df), seconds=self.stage_timings['load_data'])
         
         if len(df) < Config.MIN_TRAINING_SAMPLES:
             raise ValueError(
@@ -49,36 +159,142 @@ class ModelTrainer:
                 f"but only {len(df)} found."
             )
         
-        # Train each model
-        # Text classification models (multi-clase tipo_permiso_real)
-        self._train_naive_bayes(df)
-        self._train_svm_text(df)
-        try:
-            self._train_logreg_text(df)
-        except Exception as e:
-            logger.warning(f"LogReg text training skipped: {e}")
-
-        # Anomaly detection (no split required unsupervised)
-        self._train_one_class_svm(df)
-
-        # Regression / classification with business features
-        self._train_linear_regression(df)
-        self._train_logistic_regression(df)
-        self._train_decision_tree(df)
-
-        # Clustering & recommendation
-        self._train_kmeans(df)
-        self._train_knn(df)
+        # Derived features are computed once per run and shared by the models
+        self.features = build_decision_features(df)
         
-        # Save all models
-        self._save_models()
+        # Train each model (each stage is saved as soon as it succeeds, so a
+        # failed run resumes from the last successful stage)
+        for index, stage in enumerate(TRAINING_STAGES):
+            self._report('stage_started', stage=stage.name, index=index, total=len(TRAINING_STAGES))
+            started = time.perf_counter()
+            try:
+                self._run_stage(stage, df)
+            except Exception as e:
+                self.stage_status[stage.name] = 'failed'
+                if stage.required:
+                    raise
+                logger.warning(f"Stage {stage.name} skipped: {e}")
+            finally:
+                self.stage_timings[stage.name] = round(time.perf_counter() - started, 3)
+                self._report('stage_finished', stage=stage.name, status=self.stage_status.get(stage.name),
+                             index=index, seconds=self.stage_timings[stage.name])
         
         # Save training metadata
         self._save_training_metadata(df)
         
-        logger.info("All models trained and saved successfully")
+        trained = [name for name, status in self.stage_status.items() if status == 'trained']
+        logger.info(f"All models ready. Retrained stages: {trained or 'none'}")
         return self.training_metrics
     
+    def _stage_fingerprint(self, stage, df):
+        """Fingerprint of a stage: input data, hyperparameters, code version and upstream stages"""
+        code_objects = [getattr(self, stage.method)]
+        code_objects.extend(getattr(self, obj) if isinstance(obj, str) else obj for obj in stage.code)
+        if any(c in DECISION_COLUMNS for c in stage.columns):
+            code_objects.append(build_decision_features)
+        if 'motivo_texto' in stage.columns:
+            code_objects.append(text_processing)
+        params = {key: getattr(Config, key, None) for key in stage.config_keys}
+        return StageCache.combine(
+            STAGE_CODE_VERSION,
+            StageCache.data_fingerprint(df, stage.columns),
+            params,
+            StageCache.code_fingerprint(*code_objects),
+            [self.stage_fingerprints.get(dep) for dep in stage.depends_on]
+        )
+    
+    def _run_stage(self, stage, df):
+        """Train a single stage, or restore it from the stage cache if unchanged"""
+        fingerprint = self._stage_fingerprint(stage, df)
+        self.stage_fingerprints[stage.name] = fingerprint
+        
+        cached = None if self.force else self.stage_cache.lookup(stage.name, fingerprint)
+        if cached:
+            self.models.update(self.stage_cache.load_artifacts(cached))
+            self.training_metrics.update(cached.get('metrics', {}))
+            self.stage_status[stage.name] = 'cached'
+            logger.info(f"Stage {stage.name} unchanged, reusing artifacts from {cached.get('trained_at')}")
+            return
+        
+        metrics_before = dict(self.training_metrics)
+        getattr(self, stage.method)(df)
+        
+        produced = [name for name in stage.outputs if name in self.models]
+        self._save_models(produced)
+        stage_metrics = {
+            key: value for key, value in self.training_metrics.items()
+            if key not in metrics_before or metrics_before[key] is not value
+        }
+        self.stage_cache.record(stage.name, fingerprint, produced, stage_metrics)
+        self.stage_status[stage.name] = 'trained'
+    
+    def _build_text_vectorizer(self, max_features):
+        """
+        Text feature extractor for the text models. Both modes use the shared
+        accent-folding tokenizer from models.text_processing (also used by the predictor).
+        'tfidf' (default): TfidfVectorizer with a fitted vocabulary of up to max_features n-grams.
+        'hashing': stateless HashingVectorizer (no vocabulary to store or load), optionally
+        reweighted by an IDF vector that is the only fitted state.
+        """
+        if Config.TEXT_FEATURES_MODE == 'hashing':
+            steps = [('hashing', HashingVectorizer(
+                n_features=Config.HASHING_N_FEATURES,
+                ngram_range=(1, 3),
+                alternate_sign=False,  # MultinomialNB needs non-negative features
+                norm=None if Config.HASHING_USE_IDF else 'l2',
+                **text_vectorizer_params()
+            ))]
+            if Config.HASHING_USE_IDF:
+                steps.append(('idf', TfidfTransformer(sublinear_tf=True)))
+            return Pipeline(steps)
+        return TfidfVectorizer(max_features=max_features, ngram_range=(1, 3), sublinear_tf=True, **text_vectorizer_params())
+    
+    def _select_vocabulary(self, name, model, vectorizer, X_train, X_test, y_train, y_test,
+                           X_train_vect, X_test_vect):
+        """
+        Supervised vocabulary pruning for a text model (VOCAB_SELECTION = 'chi2' or 'mutual_info').
+        Keeps the VOCAB_SELECTION_K best n-grams scoring above VOCAB_SELECTION_MIN_SCORE,
+        rewrites the vectorizer vocabulary/IDF to them and refits the model on the subset.
+        The pruned pair is kept unless holdout accuracy drops by more than
+        VOCAB_SELECTION_MAX_ACCURACY_LOSS. Accuracy and vocabulary size before/after go to
+        training_metrics. Hashing mode has no vocabulary and is left untouched.
+        
+        Returns (model, vectorizer, X_train_vect, X_test_vect) to use from here on.
+        """
+        unchanged = (model, vectorizer, X_train_vect, X_test_vect)
+        if Config.VOCAB_SELECTION == 'none' or Config.TEXT_FEATURES_MODE == 'hashing':
+            return unchanged
+        
+        vocab_before = X_train_vect.shape[1]
+        keep = vocabulary.select_features(X_train_vect, y_train, Config.VOCAB_SELECTION,
+                                          Config.VOCAB_SELECTION_K, Config.VOCAB_SELECTION_MIN_SCORE)
+        if len(keep) >= vocab_before:
+            return unchanged
+        
+        full_acc = model.score(X_test_vect, y_test)
+        pruned_vectorizer = vocabulary.prune_vectorizer(copy.deepcopy(vectorizer), keep)
+        X_train_sel = pruned_vectorizer.transform(X_train)
+        X_test_sel = pruned_vectorizer.transform(X_test)
+        pruned_model = clone(model).fit(X_train_sel, y_train)
+        pruned_acc = pruned_model.score(X_test_sel, y_test)
+        applied = full_acc - pruned_acc <= Config.VOCAB_SELECTION_MAX_ACCURACY_LOSS
+        
+        self.training_metrics.update({
+            f'{name}_vocab_selection': Config.VOCAB_SELECTION,
+            f'{name}_vocab_size_before': vocab_before,
+            f'{name}_vocab_size_after': len(keep) if applied else vocab_before,
+            f'{name}_vocab_full_test_accuracy': full_acc,
+            f'{name}_vocab_selected_test_accuracy': pruned_acc,
+            f'{name}_vocab_accuracy_delta': pruned_acc - full_acc,
+            f'{name}_vocab_selection_applied': applied
+        })
+        if not applied:
+            logger.warning(f"Vocabulary selection for {name} rejected: accuracy {full_acc:.4f} -> {pruned_acc:.4f}")
+            return unchanged
+        logger.info(f"Vocabulary of {name} pruned ({Config.VOCAB_SELECTION}): {vocab_before} -> {len(keep)} n-grams, "
+                    f"Acc(test) {full_acc:.4f} -> {pruned_acc:.4f}")
+        return pruned_model, pruned_vectorizer, X_train_sel, X_test_sel
+    
     def _train_naive_bayes(self, df):
         """Model 1A: Naive Bayes baseline for text classification (tipo_permiso_real)"""
         logger.info("Training Naive Bayes (TF-IDF) model...")
@@ -86,14 +302,14 @@ class ModelTrainer:
         y = df['tipo_permiso_real']
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
         # Spanish-oriented TF-IDF: with stopwords and wider n-grams
-        spanish_stopwords = [
-            'de','la','que','el','en','y','a','los','del','se','las','por','un','para','con','no','una','su','al','lo','como','más','pero','sus','le','ya','o','este','sí','porque','esta','entre','cuando','muy','sin','sobre','también','me','hasta','hay','donde','quien','desde','todo','nos','durante','todos','uno','les','ni','contra','otros','ese','eso','ante','ellos','e','esto','mí','antes','algunos','qué','unos','yo','otro','otras','otra','él','tanto','esa','estos','mucho','quienes','nada','muchos','cual','poco','ella','estar','estas','algunas','algo','nosotros','mi','mis','tú','te','ti','tu','tus','ellas','nosotras','vosotros','vosotras','os','mío','mía','míos','mías','tuyo','tuya','tuyos','tuyas','suyo','suya','suyos','suyas','nuestro','nuestra','nuestros','nuestras','vuestro','vuestra','vuestros','vuestras','esos','esas'
-        ]
-        vectorizer = TfidfVectorizer(max_features=20000, ngram_range=(1, 3), sublinear_tf=True, stop_words=spanish_stopwords)
+        vectorizer = self._build_text_vectorizer(max_features=20000)
         X_train_vect = vectorizer.fit_transform(X_train)
         X_test_vect = vectorizer.transform(X_test)
         model = MultinomialNB()
         model.fit(X_train_vect, y_train)
+        model, vectorizer, X_train_vect, X_test_vect = self._select_vocabulary(
+            'naive_bayes', model, vectorizer, X_train, X_test, y_train, y_test, X_train_vect, X_test_vect
+        )
         self.models['naive_bayes'] = model
         # Save under both keys for backward compatibility and new usage
         self.models['vectorizer'] = vectorizer
@@ -104,6 +320,7 @@ class ModelTrainer:
         test_acc = model.score(X_test_vect, y_test)
         prec, rec, f1, _ = precision_recall_fscore_support(y_test, y_test_pred, average='weighted', zero_division=0)
         cm = confusion_matrix(y_test, y_test_pred)
+        self.holdouts['naive_bayes'] = (X_test_vect, y_test, test_acc)
         self.training_metrics.update({
             'naive_bayes_train_accuracy': train_acc,
             'naive_bayes_test_accuracy': test_acc,
@@ -120,14 +337,14 @@ class ModelTrainer:
         X = df['motivo_texto'].fillna('')
         y = df['tipo_permiso_real']
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
-        spanish_stopwords = [
-            'de','la','que','el','en','y','a','los','del','se','las','por','un','para','con','no','una','su','al','lo','como','más','pero','sus','le','ya','o','este','sí','porque','esta','entre','cuando','muy','sin','sobre','también','me','hasta','hay','donde','quien','desde','todo','nos','durante','todos','uno','les','ni','contra','otros','ese','eso','ante','ellos','e','esto','mí','antes','algunos','qué','unos','yo','otro','otras','otra','él','tanto','esa','estos','mucho','quienes','nada','muchos','cual','poco','ella','estar','estas','algunas','algo','nosotros','mi','mis','tú','te','ti','tu','tus','ellas','nosotras','vosotros','vosotras','os','mío','mía','míos','mías','tuyo','tuya','tuyos','tuyas','suyo','suya','suyos','suyas','nuestro','nuestra','nuestros','nuestras','vuestro','vuestra','vuestros','vuestras','esos','esas'
-        ]
-        vectorizer = TfidfVectorizer(max_features=30000, ngram_range=(1, 3), sublinear_tf=True, stop_words=spanish_stopwords)
+        vectorizer = self._build_text_vectorizer(max_features=30000)
         X_train_tfidf = vectorizer.fit_transform(X_train)
         X_test_tfidf = vectorizer.transform(X_test)
         svm_clf = LinearSVC()
         svm_clf.fit(X_train_tfidf, y_train)
+        svm_clf, vectorizer, X_train_tfidf, X_test_tfidf = self._select_vocabulary(
+            'svm_text', svm_clf, vectorizer, X_train, X_test, y_train, y_test, X_train_tfidf, X_test_tfidf
+        )
         self.models['svm_text'] = svm_clf
         # ensure we persist this vectorizer; predictor will prefer tfidf
         self.models['tfidf'] = vectorizer
@@ -137,6 +354,7 @@ class ModelTrainer:
         test_acc = svm_clf.score(X_test_tfidf, y_test)
         prec, rec, f1, _ = precision_recall_fscore_support(y_test, y_test_pred, average='weighted', zero_division=0)
         cm = confusion_matrix(y_test, y_test_pred)
+        self.holdouts['svm_text'] = (X_test_tfidf, y_test, test_acc)
         self.training_metrics.update({
             'svm_text_train_accuracy': train_acc,
             'svm_text_test_accuracy': test_acc,
@@ -153,14 +371,14 @@ class ModelTrainer:
         X = df['motivo_texto'].fillna('')
         y = df['tipo_permiso_real']
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
-        spanish_stopwords = [
-            'de','la','que','el','en','y','a','los','del','se','las','por','un','para','con','no','una','su','al','lo','como','más','pero','sus','le','ya','o','este','sí','porque','esta','entre','cuando','muy','sin','sobre','también','me','hasta','hay','donde','quien','desde','todo','nos','durante','todos','uno','les','ni','contra','otros','ese','eso','ante','ellos','e','esto','mí','antes','algunos','qué','unos','yo','otro','otras','otra','él','tanto','esa','estos','mucho','quienes','nada','muchos','cual','poco','ella','estar','estas','algunas','algo','nosotros','mi','mis','tú','te','ti','tu','tus','ellas','nosotras','vosotros','vosotras','os','mío','mía','míos','mías','tuyo','tuya','tuyos','tuyas','suyo','suya','suyos','suyas','nuestro','nuestra','nuestros','nuestras','vuestro','vuestra','vuestros','vuestras','esos','esas'
-        ]
-        vectorizer = TfidfVectorizer(max_features=30000, ngram_range=(1, 3), sublinear_tf=True, stop_words=spanish_stopwords)
+        vectorizer = self._build_text_vectorizer(max_features=30000)
         X_train_tfidf = vectorizer.fit_transform(X_train)
         X_test_tfidf = vectorizer.transform(X_test)
         clf = OneVsRestClassifier(LogisticRegression(max_iter=1000))
         clf.fit(X_train_tfidf, y_train)
+        clf, vectorizer, X_train_tfidf, X_test_tfidf = self._select_vocabulary(
+            'logreg_text', clf, vectorizer, X_train, X_test, y_train, y_test, X_train_tfidf, X_test_tfidf
+        )
         self.models['logreg_text'] = clf
         self.models['tfidf_logreg'] = vectorizer
         y_train_pred = clf.predict(X_train_tfidf)
@@ -169,6 +387,7 @@ class ModelTrainer:
         test_acc = clf.score(X_test_tfidf, y_test)
         prec, rec, f1, _ = precision_recall_fscore_support(y_test, y_test_pred, average='weighted', zero_division=0)
         cm = confusion_matrix(y_test, y_test_pred)
+        self.holdouts['logreg_text'] = (X_test_tfidf, y_test, test_acc)
         self.training_metrics.update({
             'logreg_text_train_accuracy': train_acc,
             'logreg_text_test_accuracy': test_acc,
@@ -241,42 +460,8 @@ class ModelTrainer:
         """Model 4: Logistic Regression for resultado_rrhh prediction"""
         logger.info("Training Logistic Regression model...")
         
-        # Prepare data
-        # Calculate impacto if not present, con refuerzo para motivos médicos
-        if 'impacto_area_numerico' not in df.columns or df['impacto_area_numerico'].isna().all():
-            base = (
-                df['dias_solicitados'].fillna(0) * 1.9 +
-                df['dias_ult_ano'].fillna(0) * 0.30 -
-                df['antiguedad_anios'].fillna(0) * 0.20
-            )
-            # Refuerzo si el tipo de permiso es ENFERMEDAD
-            ref_med = np.where(df['tipo_permiso_real'].fillna('') == 'ENFERMEDAD', 8.0, 0.0)
-            impacto = np.clip(base + ref_med, 0, 100)
-        else:
-            impacto = df['impacto_area_numerico'].fillna(0)
-
-        # Feature engineering adicional
-        texto_largo = df['motivo_texto'].fillna('').str.len()
-        anomala_bin = (df['es_anomala'].fillna(0) == 1).astype(int)
-        vacaciones_bin = (df['tipo_permiso_real'].fillna('') == 'VACACIONES').astype(int)
-        enfermedad_bin = (df['tipo_permiso_real'].fillna('') == 'ENFERMEDAD').astype(int)
-        sanciones_bin = (df['sanciones_activas'].fillna(0) == 1).astype(int)
-        inasistencias = df['inasistencias'].fillna(0).astype(float)
-        segmento_ml = df.get('segmento_ml', pd.Series([0]*len(df))).fillna(0).astype(float)
-
-        X = pd.DataFrame({
-            'impacto_area': impacto,
-            'dias_solicitados': df['dias_solicitados'].fillna(0),
-            'antiguedad_anios': df['antiguedad_anios'].fillna(0),
-            'dias_ult_ano': df['dias_ult_ano'].fillna(0),
-            'texto_largo': texto_largo,
-            'anomala_bin': anomala_bin,
-            'vacaciones_bin': vacaciones_bin,
-            'enfermedad_bin': enfermedad_bin,
-            'sanciones_bin': sanciones_bin,
-            'inasistencias': inasistencias,
-            'segmento_ml': segmento_ml
-        })
+        # Enriched features (impacto, texto_largo, binary flags) built once per run
+        X = self.features[DECISION_FEATURES]
         
         # Encode labels
         le = LabelEncoder()
@@ -292,6 +477,7 @@ class ModelTrainer:
             calibrated.fit(X_train, y_train)
             self.models['logistic_calibrated'] = calibrated
             logger.info("Calibrated logistic regression trained (sigmoid, cv=3)")
+            self._report_calibration(base, calibrated, X_train, y_train, X_test, y_test)
         except Exception as e:
             logger.warning(f"Calibration skipped: {e}")
 
@@ -324,37 +510,46 @@ class ModelTrainer:
         })
         logger.info(f"Logistic Regression trained. Acc(train): {train_acc:.4f} Acc(test): {test_acc:.4f} F1(test): {f1:.4f} AUC(test): {auc if auc is not None else 'n/a'}")
     
+    def _report_calibration(self, base, calibrated, X_train, y_train, X_test, y_test):
+        """
+        Brier score / ECE of the raw and calibrated logistic models on the test split.
+        With COLLAPSE_CALIBRATION the cv=3 ensemble is folded into a single
+        CollapsedSigmoidClassifier, which replaces it when stored.
+        """
+        classes = calibrated.classes_
+        for prefix, model in (('logistic', base), ('logistic_calibrated', calibrated)):
+            proba = model.predict_proba(X_test)
+            self.training_metrics[f'{prefix}_test_brier'] = brier_score(y_test, proba, classes)
+            self.training_metrics[f'{prefix}_test_ece'] = expected_calibration_error(y_test, proba, classes)
+        
+        if not Config.COLLAPSE_CALIBRATION:
+            return
+        
+        collapsed = CollapsedSigmoidClassifier.from_calibrated(calibrated, X_train, y_train)
+        ensemble_proba = calibrated.predict_proba(X_test)
+        collapsed_proba = collapsed.predict_proba(X_test)
+        brier = brier_score(y_test, collapsed_proba, classes)
+        ece = expected_calibration_error(y_test, collapsed_proba, classes)
+        self.training_metrics.update({
+            'logistic_collapsed_test_brier': brier,
+            'logistic_collapsed_test_ece': ece,
+            'logistic_collapsed_brier_delta': brier - self.training_metrics['logistic_calibrated_test_brier'],
+            'logistic_collapsed_ece_delta': ece - self.training_metrics['logistic_calibrated_test_ece'],
+            'logistic_collapsed_max_proba_diff': float(np.abs(collapsed_proba - ensemble_proba).max())
+        })
+        self.models['logistic_calibrated'] = collapsed
+        logger.info(
+            f"Calibrated ensemble collapsed into one scorer. Brier(test): "
+            f"{self.training_metrics['logistic_calibrated_test_brier']:.4f} -> {brier:.4f}, "
+            f"ECE(test): {self.training_metrics['logistic_calibrated_test_ece']:.4f} -> {ece:.4f}"
+        )
+    
     def _train_decision_tree(self, df):
         """Model 5: Decision Tree for resultado_rrhh classification"""
         logger.info("Training Decision Tree model...")
         
         # Same enriched features as logistic regression
-        if 'impacto_area_numerico' not in df.columns or df['impacto_area_numerico'].isna().all():
-            base = (
-                df['dias_solicitados'].fillna(0) * 1.9 +
-                df['dias_ult_ano'].fillna(0) * 0.30 -
-                df['antiguedad_anios'].fillna(0) * 0.20
-            )
-            ref_med = np.where(df['tipo_permiso_real'].fillna('') == 'ENFERMEDAD', 8.0, 0.0)
-            impacto = np.clip(base + ref_med, 0, 100)
-        else:
-            impacto = df['impacto_area_numerico'].fillna(0)
-
-        texto_largo = df['motivo_texto'].fillna('').str.len()
-        anomala_bin = (df['es_anomala'].fillna(0) == 1).astype(int)
-        vacaciones_bin = (df['tipo_permiso_real'].fillna('') == 'VACACIONES').astype(int)
-        enfermedad_bin = (df['tipo_permiso_real'].fillna('') == 'ENFERMEDAD').astype(int)
-
-        X = pd.DataFrame({
-            'impacto_area': impacto,
-            'dias_solicitados': df['dias_solicitados'].fillna(0),
-            'antiguedad_anios': df['antiguedad_anios'].fillna(0),
-            'dias_ult_ano': df['dias_ult_ano'].fillna(0),
-            'texto_largo': texto_largo,
-            'anomala_bin': anomala_bin,
-            'vacaciones_bin': vacaciones_bin,
-            'enfermedad_bin': enfermedad_bin
-        })
+        X = self.features[TREE_FEATURES]
         
         # Use the same label encoder
         y = self.models['label_encoder'].transform(df['resultado_rrhh'])
@@ -417,7 +612,17 @@ class ModelTrainer:
         
         # Train model
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.25, random_state=42)
-        model = KNeighborsRegressor(n_neighbors=5)
+        engine = Config.KNN_ENGINE
+        if engine == 'sklearn':
+            # Unscaled brute-force KNN over every training row (previous behaviour)
+            model = KNeighborsRegressor(n_neighbors=Config.KNN_NEIGHBORS)
+        elif engine in KNN_ENGINES:
+            model = CellNeighborRegressor(
+                n_neighbors=Config.KNN_NEIGHBORS,
+                cell_size=Config.KNN_CELL_SIZE if engine == 'grid' else 0
+            )
+        else:
+            raise ValueError(f"Unknown KNN_ENGINE: {engine} (expected one of {KNN_ENGINES})")
         model.fit(X_train, y_train)
         self.models['knn'] = model
         y_train_pred = model.predict(X_train)
@@ -430,25 +635,94 @@ class ModelTrainer:
             'knn_r2_train': r2_train,
             'knn_r2_test': r2_test,
             'knn_test_mae': mae_test,
-            'knn_test_rmse': rmse_test
+            'knn_test_rmse': rmse_test,
+            'knn_engine': engine,
+            'knn_training_rows': len(X_train),
+            'knn_stored_points': len(getattr(model, 'cells_', X_train))
         })
-        logger.info(f"KNN trained. R2(train): {r2_train:.4f} R2(test): {r2_test:.4f} MAE(test): {mae_test:.2f}")
+        logger.info(f"KNN trained ({engine}, {self.training_metrics['knn_stored_points']} points for "
+                    f"{len(X_train)} rows). R2(train): {r2_train:.4f} R2(test): {r2_test:.4f} MAE(test): {mae_test:.2f}")
     
-    def _save_models(self):
-        """Save all trained models to disk"""
+    def _build_similarity_index(self, df):
+        """Inverted index of the decided solicitudes for the similar-requests search"""
+        logger.info("Building similarity index...")
+        index = SimilarityIndex.build(
+            df,
+            postings_limit=Config.SIMILAR_POSTINGS_LIMIT,
+            text_weight=Config.SIMILAR_TEXT_WEIGHT,
+            candidate_docs=Config.SIMILAR_CANDIDATE_DOCS,
+            candidate_rows=Config.SIMILAR_CANDIDATE_ROWS
+        )
+        self.models['similarity_index'] = index
+        stats = index.stats()
+        self.training_metrics.update({
+            'similarity_index_rows': stats['rows'],
+            'similarity_index_documents': stats['documents'],
+            'similarity_index_terms': stats['terms'],
+            'similarity_index_postings': stats['postings']
+        })
+        logger.info(f"Similarity index built: {stats['rows']} rows, {stats['documents']} distinct motivos, "
+                    f"{stats['terms']} terms")
+    
+    def _compact_model(self, model_name):
+        """
+        Compact a text artifact before saving it (float32 weights, sparse/pruned coefficients)
+        and record accuracy parity against the original on the stage holdout.
+        """
+        size_before = artifact_size(self.models[model_name])
+        compacted, density = compact_artifact(self.models[model_name], Config.COEF_PRUNE_THRESHOLD)
+        self.models[model_name] = compacted
+        size_after = artifact_size(compacted)
+        
+        metrics = {
+            f'{model_name}_compact_bytes_before': size_before,
+            f'{model_name}_compact_bytes_after': size_after
+        }
+        if density is not None:
+            metrics[f'{model_name}_compact_coef_density'] = density
+        if model_name in self.holdouts:
+            X_test, y_test, test_acc = self.holdouts[model_name]
+            compact_acc = compacted.score(X_test, y_test)
+            metrics[f'{model_name}_compact_test_accuracy'] = compact_acc
+            metrics[f'{model_name}_compact_accuracy_delta'] = compact_acc - test_acc
+            if compact_acc < test_acc:
+                logger.warning(f"Compacted {model_name} lost accuracy: {test_acc:.4f} -> {compact_acc:.4f}")
+        self.training_metrics.update(metrics)
+        logger.info(f"Compacted {model_name}: {size_before} -> {size_after} bytes")
+    
+    def _save_models(self, model_names=None):
+        """Save trained models to disk (all of them unless model_names is given)"""
         Config.ensure_directories()
         
         for model_name, model_path in Config.MODEL_PATHS.items():
+            if model_names is not None and model_name not in model_names:
+                continue
             if model_name in self.models:
+                if Config.MODEL_COMPACTION and model_name in COMPACTABLE_MODELS:
+                    self._compact_model(model_name)
                 joblib.dump(self.models[model_name], model_path)
                 logger.info(f"Saved {model_name} to {model_path}")
     
+    def _data_watermark(self, df):
+        """Latest decision time covered by the training data (used by the retraining trigger)"""
+        decided_at = pd.Series(pd.NaT, index=df.index)
+        for column in ('fecha_decision', 'fecha_solicitud'):
+            if column in df.columns:
+                decided_at = decided_at.fillna(pd.to_datetime(df[column], errors='coerce'))
+        watermark = decided_at.max()
+        return None if pd.isna(watermark) else watermark.to_pydatetime()
+    
     def _save_training_metadata(self, df):
-        """Save training metadata (date, sample count, metrics)"""
+        """Save training metadata (date, sample count, metrics, data watermark, drift reference)"""
         metadata = {
             'training_date': datetime.now().isoformat(),
             'sample_count': len(df),
-            'metrics': self.training_metrics
+            'metrics': self.training_metrics,
+            'stages': dict(self.stage_status),
+            'stage_timings': dict(self.stage_timings),
+            'data_watermark': self._data_watermark(df),
+            'label_counts': {str(k): int(v) for k, v in df['resultado_rrhh'].value_counts().items()},
+            'drift_reference': build_reference(df, bins=Config.DRIFT_BINS)
         }
         
         metadata_path = os.path.join(Config.MODELS_DIR, 'training_metadata.pkl')
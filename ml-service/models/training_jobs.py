@@ -0,0 +1,223 @@
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def _apply_resource_limits():
+    """Lower the priority of the training process and cap its CPU time and memory"""
+    if Config.TRAINING_NICE and hasattr(os, 'nice'):
+        try:
+            os.nice(Config.TRAINING_NICE)
+        except OSError as e:
+            logger.warning(f"Could not lower training priority: {e}")
+
+    try:
+        import resource
+    except ImportError:  # Windows
+        return
+
+    if Config.TRAINING_MAX_MEMORY_MB > 0:
+        limit = Config.TRAINING_MAX_MEMORY_MB * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    if Config.TRAINING_MAX_CPU_SECONDS > 0:
+        limit = Config.TRAINING_MAX_CPU_SECONDS
+        resource.setrlimit(resource.RLIMIT_CPU, (limit, limit + 5))
+
+
+def _training_worker(job_id, force, events):
+    """Entry point of the training process: runs ModelTrainer and streams progress events"""
+    from log_config import configure_logging
+
+    # Own log file: rotating the service log from two processes would lose records
+    configure_logging(log_file=os.path.join(os.path.dirname(Config.LOG_FILE), 'training.log'))
+    _apply_resource_limits()
+
+    # Training dependencies are only imported inside the worker process
+    from threadpoolctl import threadpool_limits
+    from models.trainer import ModelTrainer
+
+    def report(event):
+        events.put((job_id, event))
+
+    try:
+        with threadpool_limits(limits=Config.TRAINING_MAX_THREADS):
+            trainer = ModelTrainer(force=force, progress_callback=report)
+            metrics = trainer.train_all_models()
+        report({'type': 'completed', 'metrics': metrics, 'stages': trainer.stage_status})
+    except MemoryError:
+        report({'type': 'failed', 'error': f"Training exceeded the {Config.TRAINING_MAX_MEMORY_MB} MB memory limit"})
+    except Exception as e:
+        report({'type': 'failed', 'error': str(e), 'validation_error': isinstance(e, ValueError)})
+
+
+class TrainingJobManager:
+    """
+    Runs training jobs in a separate, lower-priority process so the Flask
+    workers keep serving predictions while models are retrained.
+    Only one job runs at a time; submitting while a job is active returns it.
+    """
+
+    def __init__(self):
+        self._context = multiprocessing.get_context('spawn')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._active_job_id = None
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """Register a callback invoked with the job dict when a job completes successfully"""
+        self._listeners.append(callback)
+
+    def submit(self, force=False, source='api'):
+        """Start a training job. Returns (job, created)."""
+        with self._lock:
+            if self._active_job_id is not None:
+                return self._snapshot(self._jobs[self._active_job_id]), False
+
+            job_id = uuid.uuid4().hex
+            events = self._context.Queue()
+            process = self._context.Process(
+                target=_training_worker,
+                args=(job_id, force, events),
+                name=f'training-{job_id[:8]}',
+                daemon=True
+            )
+            job = {
+                'job_id': job_id,
+                'status': 'queued',
+                'source': source,
+                'force': force,
+                'submitted_at': datetime.now().isoformat(),
+                'started_at': None,
+                'finished_at': None,
+                'duration_seconds': None,
+                'progress': 0.0,
+                'current_stage': None,
+                'samples': None,
+                'total_stages': None,
+                'stages': OrderedDict(),
+                'metrics': None,
+                'error': None
+            }
+            self._jobs[job_id] = job
+            self._active_job_id = job_id
+            self._trim_history()
+
+            process.start()
+            job['status'] = 'running'
+            job['started_at'] = datetime.now().isoformat()
+            job['pid'] = process.pid
+
+            monitor = threading.Thread(
+                target=self._monitor, args=(job_id, process, events),
+                name=f'training-monitor-{job_id[:8]}', daemon=True
+            )
+            monitor.start()
+            logger.info(f"Training job {job_id} started in process {process.pid} ({source})")
+            return self._snapshot(job), True
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._snapshot(job) if job else None
+
+    def active_job(self):
+        with self._lock:
+            if self._active_job_id is None:
+                return None
+            return self._snapshot(self._jobs[self._active_job_id])
+
+    def _monitor(self, job_id, process, events):
+        """Drain progress events of a job until the worker reports completion or dies"""
+        started = time.perf_counter()
+        finished = False
+        while not finished:
+            try:
+                _, event = events.get(timeout=1.0)
+            except queue.Empty:
+                if not process.is_alive():
+                    self._handle_event(job_id, {
+                        'type': 'failed',
+                        'error': f"Training process exited unexpectedly (exit code {process.exitcode})"
+                    })
+                    finished = True
+                continue
+            self._handle_event(job_id, event)
+            finished = event['type'] in ('completed', 'failed')
+
+        process.join(timeout=10)
+        with self._lock:
+            job = self._jobs[job_id]
+            job['finished_at'] = datetime.now().isoformat()
+            job['duration_seconds'] = round(time.perf_counter() - started, 3)
+            self._active_job_id = None
+            snapshot = self._snapshot(job)
+
+        logger.info(f"Training job {job_id} {snapshot['status']} in {snapshot['duration_seconds']}s")
+        if snapshot['status'] == 'completed':
+            for callback in self._listeners:
+                try:
+                    callback(snapshot)
+                except Exception as e:
+                    logger.error(f"Training job listener failed: {e}")
+
+    def _handle_event(self, job_id, event):
+        with self._lock:
+            job = self._jobs[job_id]
+            event_type = event['type']
+            if event_type == 'data_loaded':
+                job['samples'] = event['samples']
+                job['stages']['load_data'] = {'status': 'done', 'seconds': event['seconds']}
+            elif event_type == 'stage_started':
+                job['current_stage'] = event['stage']
+                job['total_stages'] = event['total']
+                job['stages'][event['stage']] = {'status': 'running', 'seconds': None}
+            elif event_type == 'stage_finished':
+                job['stages'][event['stage']] = {'status': event['status'], 'seconds': event['seconds']}
+                done = event.get('index', 0) + 1
+                job['progress'] = round(done / max(job.get('total_stages') or done, 1), 3)
+            elif event_type == 'completed':
+                job['status'] = 'completed'
+                job['progress'] = 1.0
+                job['current_stage'] = None
+                job['metrics'] = event['metrics']
+            elif event_type == 'failed':
+                job['status'] = 'failed'
+                job['current_stage'] = None
+                job['error'] = event['error']
+                job['validation_error'] = event.get('validation_error', False)
+
+    def _trim_history(self):
+        while len(self._jobs) > max(Config.TRAINING_JOB_HISTORY, 1):
+            oldest_id = next(iter(self._jobs))
+            if oldest_id == self._active_job_id:
+                break
+            self._jobs.pop(oldest_id)
+
+    @staticmethod
+    def _snapshot(job):
+        snapshot = dict(job)
+        snapshot['stages'] = {name: dict(stage) for name, stage in job['stages'].items()}
+        return snapshot
+
+
+_job_manager = None
+_job_manager_lock = threading.Lock()
+
+
+def get_job_manager():
+    """Process-wide training job manager"""
+    global _job_manager
+    with _job_manager_lock:
+        if _job_manager is None:
+            _job_manager = TrainingJobManager()
+        return _job_manager
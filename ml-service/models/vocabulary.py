@@ -0,0 +1,58 @@
+import logging
+import numpy as np
+from sklearn.feature_selection import chi2, mutual_info_classif
+
+logger = logging.getLogger(__name__)
+
+SELECTION_METHODS = ('chi2', 'mutual_info')
+
+
+def feature_scores(X, y, method='chi2'):
+    """Class-association score of every column of a (sparse, non-negative) document-term matrix"""
+    if method == 'chi2':
+        scores, _ = chi2(X, y)
+    elif method == 'mutual_info':
+        # MI of term presence: the TF-IDF weights themselves are continuous, and treating each
+        # distinct weight as a category would score how varied a term's weights are
+        presence = (X > 0).astype(np.int8)
+        scores = mutual_info_classif(presence, y, discrete_features=True, random_state=42)
+    else:
+        raise ValueError(f"Unknown vocabulary selection method: {method} (expected one of {SELECTION_METHODS})")
+    # chi2 is NaN for columns that are all zero in the training split
+    return np.nan_to_num(np.asarray(scores, dtype=float), nan=0.0)
+
+
+def select_features(X, y, method='chi2', k=None, min_score=0.0):
+    """
+    Sorted indices of the columns to keep: score above min_score, then the k
+    best of those (k None or 0 = no size limit). Always keeps at least one column.
+    """
+    scores = feature_scores(X, y, method)
+    candidates = np.flatnonzero(scores > min_score) if min_score > 0 else np.arange(len(scores))
+    if k and len(candidates) > k:
+        best = np.argpartition(scores[candidates], -k)[-k:]
+        candidates = candidates[best]
+    if len(candidates) == 0:
+        candidates = np.array([int(np.argmax(scores))])
+    return np.sort(candidates)
+
+
+def prune_vectorizer(vectorizer, keep):
+    """
+    Restrict a fitted TfidfVectorizer to the columns in keep (sorted indices), in place.
+    The vocabulary is renumbered in the same column order and the IDF weights subset,
+    so transform() yields exactly the kept columns (re-normalized over them).
+    """
+    keep = np.asarray(keep)
+    new_index = {int(old): new for new, old in enumerate(keep)}
+    vectorizer.vocabulary_ = {
+        term: new_index[index] for term, index in vectorizer.vocabulary_.items() if index in new_index
+    }
+    if hasattr(vectorizer, 'stop_words_'):
+        vectorizer.stop_words_ = None
+    if getattr(vectorizer, 'use_idf', False):
+        vectorizer.idf_ = np.asarray(vectorizer.idf_)[keep]
+    # Recent sklearn validates the column count against the inner transformer (with or without IDF)
+    if hasattr(vectorizer._tfidf, 'n_features_in_'):
+        vectorizer._tfidf.n_features_in_ = len(keep)
+    return vectorizer
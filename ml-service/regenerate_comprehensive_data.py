@@ -4,10 +4,15 @@ Based on Simulador_completo1.ipynb and user's specific examples
 """
 import pyodbc
 import random
+import time
 from datetime import datetime, timedelta
 import sys
 sys.path.append('ml-service')
 from config import Config
+from database.bulk_loader import bulk_insert, motivo_input_sizes, SOLICITUD_INSERT_COLUMNS
+
+# Multiplier for the per-tipo counts: python regenerate_comprehensive_data.py [scale]
+SCALE = int(sys.argv[1]) if len(sys.argv) > 1 else 1
 
 # Connection
 conn = pyodbc.connect(Config.DB_CONNECTION_STRING)
@@ -143,9 +148,15 @@ cursor.execute("SELECT empleado_id, edad, genero, estado_civil, numero_hijos, ar
 empleados = cursor.fetchall()
 
 print(f"Found {len(empleados)} employees")
-print("Generating 300 comprehensive leave requests...")
 
-generated = 0
+# Antiguedad per employee (computed once, not per request)
+antiguedad_por_empleado = {
+    emp[0]: (datetime.now() - datetime.strptime(str(emp[12])[:10], '%Y-%m-%d')).days // 365
+    for emp in empleados
+}
+print(f"Generating {300 * SCALE} comprehensive leave requests...")
+
+rows = []
 impactos = ['BAJO', 'MEDIO', 'ALTO']
 
 # Generate more samples for MEDICO, CALAMIDAD, VACACIONES (most common)
@@ -160,14 +171,12 @@ tipo_weights = {
 }
 
 for tipo_permiso, count in tipo_weights.items():
-    for i in range(count):
+    for i in range(count * SCALE):
         # Select random employee
         emp = random.choice(empleados)
         empleado_id, edad, genero, estado_civil, numero_hijos, area, cargo, salario, tipo_contrato, sede, sanciones_activas, inasistencias, fecha_ingreso = emp
         
-        # Calculate antiguedad
-        fecha_ing = datetime.strptime(str(fecha_ingreso)[:10], '%Y-%m-%d')
-        antiguedad_anios = (datetime.now() - fecha_ing).days // 365
+        antiguedad_anios = antiguedad_por_empleado[empleado_id]
         
         # Random motivo for this type
         motivo_texto = random.choice(MOTIVOS_POR_TIPO[tipo_permiso])
@@ -212,30 +221,22 @@ for tipo_permiso, count in tipo_weights.items():
         es_anomala = dias_solicitados > 15 or (sanciones_activas and dias_solicitados > 3)
         dias_autorizados = dias_solicitados if resultado == 'AUTORIZADO' else 0
         
-        try:
-            cursor.execute("""
-                INSERT INTO solicitudes_permiso (
-                    empleado_id, edad, genero, estado_civil, numero_hijos, area, cargo,
-                    antiguedad_anios, salario, tipo_contrato, sede, dias_ult_ano, dias_solicitados,
-                    motivo_texto, tipo_permiso_real, impacto_area, es_anomala,
-                    ml_probabilidad_aprobacion, sanciones_activas, inasistencias,
-                    fecha_inicio, fecha_fin, resultado_rrhh, dias_autorizados
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                empleado_id, edad, genero, estado_civil, numero_hijos, area, cargo,
-                antiguedad_anios, salario, tipo_contrato, sede, dias_ult_ano, dias_solicitados,
-                motivo_texto, tipo_permiso, impacto_area, es_anomala,
-                ml_prob, sanciones_activas, inasistencias,
-                fecha_inicio, fecha_fin, resultado, dias_autorizados
-            ))
-            generated += 1
-            if (generated % 50) == 0:
-                print(f"  Generated {generated} requests...")
-        except Exception as e:
-            print(f"Error inserting request: {e}")
+        rows.append((
+            empleado_id, edad, genero, estado_civil, numero_hijos, area, cargo,
+            antiguedad_anios, salario, tipo_contrato, sede, dias_ult_ano, dias_solicitados,
+            motivo_texto, tipo_permiso, impacto_area, bool(es_anomala),
+            ml_prob, sanciones_activas, inasistencias,
+            fecha_inicio, fecha_fin, resultado, dias_autorizados
+        ))
 
-conn.commit()
-print(f"\n✅ Successfully generated {generated} comprehensive leave requests!")
+# Bulk insert (fast_executemany, batched)
+start = time.perf_counter()
+generated = bulk_insert(
+    conn, 'solicitudes_permiso', SOLICITUD_INSERT_COLUMNS, rows,
+    input_sizes=motivo_input_sizes(pyodbc),
+    progress=lambda n: print(f"  Inserted {n} requests...")
+)
+print(f"\n✅ Successfully generated {generated} comprehensive leave requests in {time.perf_counter() - start:.1f}s!")
 
 # Verify distribution
 cursor.execute("""
@@ -4,8 +4,14 @@ Based on Simulador_completo1.ipynb mappings
 """
 import pyodbc
 import random
+import sys
+import time
 from datetime import datetime, timedelta
 from config import Config
+from database.bulk_loader import bulk_insert, motivo_input_sizes, SOLICITUD_INSERT_COLUMNS
+
+# Number of requests to generate: python regenerate_training_data.py [count]
+N_REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 else 150
 
 # Connection
 conn = pyodbc.connect(Config.DB_CONNECTION_STRING)
@@ -86,20 +92,24 @@ cursor.execute("SELECT empleado_id, edad, genero, estado_civil, numero_hijos, ar
 empleados = cursor.fetchall()
 
 print(f"Found {len(empleados)} employees")
-print("Generating 150 synthetic leave requests with proper tipo classification...")
 
-generated = 0
+# Antiguedad per employee (computed once, not per request)
+antiguedad_por_empleado = {
+    emp[0]: (datetime.now() - datetime.strptime(str(emp[12])[:10], '%Y-%m-%d')).days // 365
+    for emp in empleados
+}
+print(f"Generating {N_REQUESTS} synthetic leave requests with proper tipo classification...")
+
+rows = []
 impactos = ['BAJO', 'MEDIO', 'ALTO']
 resultados = ['AUTORIZADO', 'RECHAZADO', 'PENDIENTE']
 
-for i in range(150):
+for i in range(N_REQUESTS):
     # Select random employee
     emp = random.choice(empleados)
     empleado_id, edad, genero, estado_civil, numero_hijos, area, cargo, salario, tipo_contrato, sede, sanciones_activas, inasistencias, fecha_ingreso = emp
     
-    # Calculate antiguedad
-    fecha_ing = datetime.strptime(str(fecha_ingreso)[:10], '%Y-%m-%d')
-    antiguedad_anios = (datetime.now() - fecha_ing).days // 365
+    antiguedad_anios = antiguedad_por_empleado[empleado_id]
     
     # Random tipo_permiso and corresponding motivo
     tipo_permiso = random.choice(list(MOTIVOS_POR_TIPO.keys()))
@@ -142,30 +152,22 @@ for i in range(150):
     es_anomala = dias_solicitados > 15 or (sanciones_activas and dias_solicitados > 3)
     dias_autorizados = dias_solicitados if resultado == 'AUTORIZADO' else 0
     
-    try:
-        cursor.execute("""
-            INSERT INTO solicitudes_permiso (
-                empleado_id, edad, genero, estado_civil, numero_hijos, area, cargo,
-                antiguedad_anios, salario, tipo_contrato, sede, dias_ult_ano, dias_solicitados,
-                motivo_texto, tipo_permiso_real, impacto_area, es_anomala,
-                ml_probabilidad_aprobacion, sanciones_activas, inasistencias,
-                fecha_inicio, fecha_fin, resultado_rrhh, dias_autorizados
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            empleado_id, edad, genero, estado_civil, numero_hijos, area, cargo,
-            antiguedad_anios, salario, tipo_contrato, sede, dias_ult_ano, dias_solicitados,
-            motivo_texto, tipo_permiso, impacto_area, es_anomala,
-            ml_prob, sanciones_activas, inasistencias,
-            fecha_inicio, fecha_fin, resultado, dias_autorizados
-        ))
-        generated += 1
-        if (generated % 30) == 0:
-            print(f"  Generated {generated} requests...")
-    except Exception as e:
-        print(f"Error inserting request: {e}")
+    rows.append((
+        empleado_id, edad, genero, estado_civil, numero_hijos, area, cargo,
+        antiguedad_anios, salario, tipo_contrato, sede, dias_ult_ano, dias_solicitados,
+        motivo_texto, tipo_permiso, impacto_area, bool(es_anomala),
+        ml_prob, sanciones_activas, inasistencias,
+        fecha_inicio, fecha_fin, resultado, dias_autorizados
+    ))
 
-conn.commit()
-print(f"✅ Successfully generated {generated} synthetic leave requests!")
+# Bulk insert (fast_executemany, batched)
+start = time.perf_counter()
+generated = bulk_insert(
+    conn, 'solicitudes_permiso', SOLICITUD_INSERT_COLUMNS, rows,
+    input_sizes=motivo_input_sizes(pyodbc),
+    progress=lambda n: print(f"  Inserted {n} requests...")
+)
+print(f"✅ Successfully generated {generated} synthetic leave requests in {time.perf_counter() - start:.1f}s!")
 
 # Verify distribution
 cursor.execute("""
@@ -0,0 +1,348 @@
+"""
+Vectorized, seeded synthetic dataset generator for solicitudes_permiso
+
+Produces from thousands to millions of consistent rows (same employee -> same
+demographics) with the business rules of the DB generators applied as NumPy
+array operations, in fixed-size chunks so memory stays bounded.
+
+Usage:
+    python synthetic_data.py 1000000 --output solicitudes.parquet
+    python synthetic_data.py 200000 --output solicitudes.csv --seed 7
+    python synthetic_data.py 500000 --db                 # SQL Server (Config.DB_CONNECTION_STRING)
+    python synthetic_data.py 500000 --sqlite datos.db    # SQLite file
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+# Catalogs (same values as train.py / sample_data.csv)
+GENEROS = np.array(['M', 'F'])
+ESTADOS_CIVILES = np.array(['SOLTERO', 'CASADO', 'UNION LIBRE'])
+AREAS = np.array(['TECNOLOGIA', 'VENTAS', 'MARKETING', 'FINANZAS', 'OPERACIONES', 'RRHH'])
+CARGOS = np.array(['JUNIOR', 'SENIOR', 'COORDINADOR', 'GERENTE', 'ANALISTA'])
+TIPOS_CONTRATO = np.array(['INDEFINIDO', 'TERMINO FIJO'])
+SEDES = np.array(['SEDE PRINCIPAL', 'SEDE NORTE', 'SEDE SUR'])
+IMPACTOS = np.array(['BAJO', 'MEDIO', 'ALTO'])
+
+MOTIVOS_POR_TIPO = {
+    'MEDICO': [
+        'Cirugía programada de rodilla', 'Operación quirúrgica urgente', 'Cirugía de apendicitis',
+        'Cita médica con especialista', 'Consulta con cardiólogo', 'Examen médico de rutina',
+        'Terapia física y rehabilitación', 'Incapacidad por enfermedad', 'Reposo médico ordenado',
+        'Hospitalización urgente', 'Acompañamiento médico a familiar', 'Cita prenatal de control'
+    ],
+    'VACACIONES': [
+        'Vacaciones programadas', 'Vacaciones de fin de año', 'Vacaciones familiares',
+        'Descanso programado', 'Compensación en tiempo', 'Día libre por convenio', 'Viaje personal programado'
+    ],
+    'CALAMIDAD': [
+        'Luto familiar por fallecimiento', 'Fallecimiento de mi padre', 'Funeral de familiar',
+        'Emergencia familiar urgente', 'Calamidad doméstica', 'Emergencia en casa',
+        'Cuidado urgente de familiar enfermo'
+    ],
+    'ESTUDIO': [
+        'Examen académico universitario', 'Presentación de tesis', 'Curso de capacitación laboral',
+        'Certificación profesional', 'Seminario de formación', 'Diplomado'
+    ],
+    'PERSONAL': [
+        'Trámite personal en notaría', 'Diligencia bancaria', 'Trámite de documentos',
+        'Mudanza de vivienda', 'Renovación de documentos', 'Cita en consulado', 'Asunto personal urgente'
+    ],
+    'MATERNIDAD': ['Licencia de maternidad', 'Preparación para parto', 'Post-parto y lactancia'],
+    'PATERNIDAD': ['Licencia de paternidad', 'Nacimiento de hijo', 'Licencia paternal']
+}
+
+# Relative frequency of each tipo (same mix as regenerate_comprehensive_data.py)
+TIPO_WEIGHTS = {
+    'MEDICO': 80, 'VACACIONES': 60, 'CALAMIDAD': 50, 'ESTUDIO': 40,
+    'PERSONAL': 40, 'MATERNIDAD': 15, 'PATERNIDAD': 15
+}
+
+# Requested days per tipo: (min, max) inclusive
+DIAS_POR_TIPO = {
+    'MATERNIDAD': (60, 90), 'PATERNIDAD': (8, 15), 'VACACIONES': (5, 15),
+    'MEDICO': (1, 3), 'CALAMIDAD': (1, 5), 'ESTUDIO': (1, 2), 'PERSONAL': (1, 3)
+}
+DIAS_CIRUGIA = (3, 10)  # MEDICO motivos mentioning a surgery
+TIPOS_PRIORITARIOS = ('MEDICO', 'CALAMIDAD', 'MATERNIDAD', 'PATERNIDAD')
+
+TIPOS = np.array(list(MOTIVOS_POR_TIPO))
+_TIPO_PROBS = np.array([TIPO_WEIGHTS[t] for t in TIPOS], dtype=float) / sum(TIPO_WEIGHTS.values())
+_MOTIVOS = np.array([m for t in TIPOS for m in MOTIVOS_POR_TIPO[t]])
+_MOTIVO_COUNT = np.array([len(MOTIVOS_POR_TIPO[t]) for t in TIPOS])
+_MOTIVO_OFFSET = np.concatenate([[0], np.cumsum(_MOTIVO_COUNT)[:-1]])
+_MOTIVO_CIRUGIA = np.array(['cirugía' in m.lower() or 'operación' in m.lower() for m in _MOTIVOS])
+_DIAS_MIN = np.array([DIAS_POR_TIPO[t][0] for t in TIPOS])
+_DIAS_MAX = np.array([DIAS_POR_TIPO[t][1] for t in TIPOS])
+_PRIORITARIO = np.isin(TIPOS, TIPOS_PRIORITARIOS)
+_MATERNIDAD = int(np.flatnonzero(TIPOS == 'MATERNIDAD')[0])
+_PATERNIDAD = int(np.flatnonzero(TIPOS == 'PATERNIDAD')[0])
+
+# Columns of sample_data.csv (train.py)
+SAMPLE_COLUMNS = [
+    'edad', 'genero', 'estado_civil', 'numero_hijos', 'area', 'cargo', 'antiguedad_anios',
+    'salario', 'tipo_contrato', 'sede', 'dias_ult_ano', 'dias_solicitados', 'tipo_permiso_real',
+    'impacto_area', 'sanciones_activas', 'inasistencias', 'aprobado'
+]
+
+
+# Minimal SQLite table for local load tests (SQL Server uses database/create_tables.sql)
+SQLITE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS solicitudes_permiso (
+        solicitud_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        empleado_id INTEGER NOT NULL, edad INTEGER, genero TEXT, estado_civil TEXT, numero_hijos INTEGER,
+        area TEXT, cargo TEXT, antiguedad_anios INTEGER, salario REAL, tipo_contrato TEXT, sede TEXT,
+        dias_ult_ano INTEGER, dias_solicitados INTEGER NOT NULL, motivo_texto TEXT NOT NULL,
+        tipo_permiso_real TEXT NOT NULL, impacto_area TEXT, es_anomala INTEGER,
+        ml_probabilidad_aprobacion REAL, sanciones_activas INTEGER, inasistencias INTEGER,
+        fecha_inicio DATE NOT NULL, fecha_fin DATE NOT NULL, resultado_rrhh TEXT DEFAULT 'PENDIENTE',
+        dias_autorizados INTEGER, fecha_solicitud TIMESTAMP, fecha_decision TIMESTAMP
+    )
+"""
+
+
+def generate_empleados(n, seed=42):
+    """Synthetic employee pool with the demographics copied into each solicitud"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'empleado_id': np.arange(1, n + 1),
+        'edad': rng.integers(22, 60, n),
+        'genero': rng.choice(GENEROS, n),
+        'estado_civil': rng.choice(ESTADOS_CIVILES, n),
+        'numero_hijos': rng.integers(0, 4, n),
+        'area': rng.choice(AREAS, n),
+        'cargo': rng.choice(CARGOS, n),
+        'antiguedad_anios': rng.integers(0, 15, n),
+        'salario': np.round(rng.uniform(2500000, 10000000, n), 2),
+        'tipo_contrato': rng.choice(TIPOS_CONTRATO, n, p=[0.7, 0.3]),
+        'sede': rng.choice(SEDES, n),
+        'sanciones_activas': rng.random(n) < 0.15,
+        'inasistencias': rng.integers(0, 8, n)
+    })
+
+
+def load_empleados(connection):
+    """Employee pool from the empleados table (keeps empleado_id foreign keys valid)"""
+    query = """
+        SELECT empleado_id, edad, genero, estado_civil, numero_hijos, area, cargo,
+               fecha_ingreso, salario, tipo_contrato, sede, sanciones_activas, inasistencias
+        FROM empleados
+    """
+    empleados = pd.read_sql(query, connection)
+    fecha_ingreso = pd.to_datetime(empleados.pop('fecha_ingreso'))
+    empleados['antiguedad_anios'] = ((pd.Timestamp.now() - fecha_ingreso).dt.days // 365).astype(int)
+    empleados['salario'] = empleados['salario'].astype(float)
+    empleados['sanciones_activas'] = empleados['sanciones_activas'].fillna(False).astype(bool)
+    empleados['inasistencias'] = empleados['inasistencias'].fillna(0).astype(int)
+    return empleados
+
+
+def _generate_chunk(rng, n, empleados, reference_date, pending_rate):
+    emp = empleados.iloc[rng.integers(0, len(empleados), n)].reset_index(drop=True)
+    genero = emp['genero'].to_numpy()
+    sanciones = emp['sanciones_activas'].to_numpy(dtype=bool)
+    inasistencias = emp['inasistencias'].to_numpy()
+
+    # Tipo (maternity/paternity follow the employee's genero)
+    tipo_idx = rng.choice(len(TIPOS), n, p=_TIPO_PROBS)
+    tipo_idx[(tipo_idx == _MATERNIDAD) & (genero == 'M')] = _PATERNIDAD
+    tipo_idx[(tipo_idx == _PATERNIDAD) & (genero == 'F')] = _MATERNIDAD
+
+    motivo_idx = _MOTIVO_OFFSET[tipo_idx] + (rng.random(n) * _MOTIVO_COUNT[tipo_idx]).astype(int)
+    cirugia = _MOTIVO_CIRUGIA[motivo_idx]
+
+    dias_min = np.where(cirugia, DIAS_CIRUGIA[0], _DIAS_MIN[tipo_idx])
+    dias_max = np.where(cirugia, DIAS_CIRUGIA[1], _DIAS_MAX[tipo_idx])
+    dias_solicitados = rng.integers(dias_min, dias_max + 1)
+
+    # Request submitted within the last year, starting 1-60 days later
+    fecha_solicitud = reference_date - pd.to_timedelta(rng.integers(0, 365 * 24 * 60, n), unit='m')
+    fecha_inicio = fecha_solicitud.normalize() + pd.to_timedelta(rng.integers(1, 61, n), unit='D')
+    fecha_fin = fecha_inicio + pd.to_timedelta(dias_solicitados - 1, unit='D')
+
+    # Decision rules: sanctions/absences -> rejected, priority types -> authorized, else coin flip
+    rechazo = sanciones | (inasistencias > 5)
+    prioritario = _PRIORITARIO[tipo_idx] & ~rechazo
+    u = rng.random(n)
+    ml_prob = np.where(rechazo, 0.1 + 0.3 * u, np.where(prioritario, 0.7 + 0.25 * u, 0.4 + 0.4 * u))
+    autorizado = np.where(rechazo, False, np.where(prioritario, True, rng.random(n) < 0.5))
+    resultado = np.where(autorizado, 'AUTORIZADO', 'RECHAZADO').astype(object)
+    if pending_rate > 0:
+        resultado[rng.random(n) < pending_rate] = 'PENDIENTE'
+    decidido = resultado != 'PENDIENTE'
+
+    decision_delay = pd.to_timedelta(rng.integers(10, 72 * 60, n), unit='m')
+    fecha_decision = pd.Series(fecha_solicitud + decision_delay).where(decidido)
+
+    return pd.DataFrame({
+        'empleado_id': emp['empleado_id'].to_numpy(),
+        'edad': emp['edad'].to_numpy(),
+        'genero': genero,
+        'estado_civil': emp['estado_civil'].to_numpy(),
+        'numero_hijos': emp['numero_hijos'].to_numpy(),
+        'area': emp['area'].to_numpy(),
+        'cargo': emp['cargo'].to_numpy(),
+        'antiguedad_anios': emp['antiguedad_anios'].to_numpy(),
+        'salario': emp['salario'].to_numpy(),
+        'tipo_contrato': emp['tipo_contrato'].to_numpy(),
+        'sede': emp['sede'].to_numpy(),
+        'dias_ult_ano': rng.integers(0, 21, n),
+        'dias_solicitados': dias_solicitados,
+        'motivo_texto': _MOTIVOS[motivo_idx],
+        'tipo_permiso_real': TIPOS[tipo_idx],
+        'impacto_area': rng.choice(IMPACTOS, n, p=[0.6, 0.3, 0.1]),
+        'es_anomala': (dias_solicitados > 15) | (sanciones & (dias_solicitados > 3)),
+        'ml_probabilidad_aprobacion': np.round(ml_prob, 4),
+        'sanciones_activas': sanciones,
+        'inasistencias': inasistencias,
+        'fecha_inicio': fecha_inicio,
+        'fecha_fin': fecha_fin,
+        'resultado_rrhh': resultado,
+        'dias_autorizados': np.where(resultado == 'AUTORIZADO', dias_solicitados, 0),
+        'fecha_solicitud': fecha_solicitud,
+        'fecha_decision': fecha_decision.to_numpy()
+    })
+
+
+def iter_solicitudes(n, seed=42, chunk_size=100000, empleados=None, reference_date=None, pending_rate=0.0):
+    """
+    Yield n synthetic solicitudes as DataFrames of at most chunk_size rows.
+    The same (n, seed, chunk_size, empleados, reference_date) always yields the same rows.
+    """
+    seed_sequence = np.random.SeedSequence(seed)
+    if empleados is None:
+        empleados = generate_empleados(max(n // 20, 50), seed=seed)
+    reference_date = pd.Timestamp(reference_date or datetime.now().replace(microsecond=0))
+
+    n_chunks = -(-n // chunk_size)
+    for chunk_seed, start in zip(seed_sequence.spawn(n_chunks), range(0, n, chunk_size)):
+        rng = np.random.default_rng(chunk_seed)
+        yield _generate_chunk(rng, min(chunk_size, n - start), empleados, reference_date, pending_rate)
+
+
+def generate_solicitudes(n, seed=42, **kwargs):
+    """n synthetic solicitudes as a single DataFrame"""
+    return pd.concat(iter_solicitudes(n, seed=seed, **kwargs), ignore_index=True)
+
+
+def to_sample_format(df):
+    """Project solicitudes onto the sample_data.csv layout used by train.py"""
+    sample = df[df['resultado_rrhh'] != 'PENDIENTE'].copy()
+    sample['aprobado'] = (sample['resultado_rrhh'] == 'AUTORIZADO').astype(int)
+    sample['sanciones_activas'] = sample['sanciones_activas'].astype(int)
+    return sample[SAMPLE_COLUMNS]
+
+
+def write_file(chunks, path, sample_format=False):
+    """Stream chunks to a .csv or .parquet file. Returns the number of rows written."""
+    written = 0
+    if path.endswith('.parquet'):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet output requires pyarrow (pip install pyarrow)")
+        writer = None
+        try:
+            for chunk in chunks:
+                chunk = to_sample_format(chunk) if sample_format else chunk
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+                written += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+        return written
+
+    for i, chunk in enumerate(chunks):
+        chunk = to_sample_format(chunk) if sample_format else chunk
+        chunk.to_csv(path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        written += len(chunk)
+    return written
+
+
+def load_into_database(chunks, connection, **kwargs):
+    """Bulk insert chunks into solicitudes_permiso. Returns the number of inserted rows."""
+    from database.bulk_loader import bulk_insert, SOLICITUD_INSERT_COLUMNS
+
+    columns = SOLICITUD_INSERT_COLUMNS + ['fecha_solicitud', 'fecha_decision']
+    inserted = 0
+    for chunk in chunks:
+        chunk = chunk[columns].copy()
+        chunk['fecha_inicio'] = chunk['fecha_inicio'].dt.date
+        chunk['fecha_fin'] = chunk['fecha_fin'].dt.date
+        for column in ('fecha_solicitud', 'fecha_decision'):
+            # datetime64[us] -> datetime.datetime (NaT -> None)
+            values = chunk[column].to_numpy(dtype='datetime64[us]').astype(object)
+            chunk[column] = pd.Series(values, index=chunk.index, dtype=object)
+        # Python scalars for the DB drivers (no numpy types, NaT -> None)
+        rows = chunk.astype(object).where(chunk.notna(), None).itertuples(index=False, name=None)
+        inserted += bulk_insert(connection, 'solicitudes_permiso', columns, rows, **kwargs)
+    return inserted
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate synthetic solicitudes_permiso data')
+    parser.add_argument('rows', type=int, help='number of solicitudes to generate')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--chunk-size', type=int, default=100000)
+    parser.add_argument('--pending-rate', type=float, default=0.0, help='fraction left as PENDIENTE')
+    parser.add_argument('--reference-date', help='latest fecha_solicitud (YYYY-MM-DD), default now')
+    parser.add_argument('--empleados', type=int, help='size of the synthetic employee pool (default rows / 20)')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--output', help='.csv or .parquet file')
+    target.add_argument('--db', action='store_true', help='load into SQL Server using employees from the empleados table')
+    target.add_argument('--sqlite', help='load into a SQLite database file')
+    parser.add_argument('--sample-format', action='store_true', help='write the sample_data.csv columns (train.py)')
+    args = parser.parse_args(argv)
+
+    options = {
+        'seed': args.seed,
+        'chunk_size': args.chunk_size,
+        'pending_rate': args.pending_rate,
+        'reference_date': args.reference_date
+    }
+    if args.empleados:
+        options['empleados'] = generate_empleados(args.empleados, seed=args.seed)
+
+    start = time.perf_counter()
+    if args.output:
+        count = write_file(iter_solicitudes(args.rows, **options), args.output, sample_format=args.sample_format)
+        destination = args.output
+    elif args.db:
+        import pyodbc
+        from config import Config
+        from database.bulk_loader import motivo_input_sizes
+
+        connection = pyodbc.connect(Config.DB_CONNECTION_STRING)
+        try:
+            options['empleados'] = load_empleados(connection)
+            sizes = motivo_input_sizes(pyodbc) + [None, None]
+            count = load_into_database(iter_solicitudes(args.rows, **options), connection, input_sizes=sizes)
+        finally:
+            connection.close()
+        destination = 'solicitudes_permiso (SQL Server)'
+    else:
+        import sqlite3
+
+        connection = sqlite3.connect(args.sqlite)
+        try:
+            connection.execute(SQLITE_SCHEMA)
+            count = load_into_database(iter_solicitudes(args.rows, **options), connection)
+        finally:
+            connection.close()
+        destination = f'solicitudes_permiso ({args.sqlite})'
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ {count} solicitudes -> {destination} in {elapsed:.1f}s ({count / max(elapsed, 1e-9):,.0f} rows/s)")
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    main()
@@ -0,0 +1,176 @@
+import asyncio
+import threading
+import time
+import pytest
+
+from api import admission
+from api.admission import AdmissionController, AsyncAdmissionController, Overloaded
+from config import Config
+
+
+def _hold_slot(controller, release):
+    """Take a slot in a background thread until release is set"""
+    acquired = threading.Event()
+
+    def run():
+        with controller.slot():
+            acquired.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    assert acquired.wait(5)
+    return thread
+
+
+def test_free_slot_is_admitted_without_waiting():
+    controller = AdmissionController('predict', max_concurrent=2, max_queue=0, queue_timeout_ms=100)
+    with controller.slot():
+        with controller.slot():
+            assert controller.report()['active'] == 2
+    report = controller.report()
+    assert report['active'] == 0
+    assert report['admitted'] == 2
+    assert report['queued'] == 0
+
+
+def test_full_queue_is_rejected_with_429():
+    controller = AdmissionController('predict', max_concurrent=1, max_queue=0, queue_timeout_ms=1000)
+    release = threading.Event()
+    holder = _hold_slot(controller, release)
+    try:
+        started = time.perf_counter()
+        with pytest.raises(Overloaded) as rejected:
+            controller.acquire()
+        assert time.perf_counter() - started < 0.5
+    finally:
+        release.set()
+        holder.join()
+
+    assert rejected.value.status_code == 429
+    assert rejected.value.retry_after >= 1
+    assert controller.report()['rejected_queue_full'] == 1
+
+
+def test_queue_wait_times_out_with_503():
+    controller = AdmissionController('predict', max_concurrent=1, max_queue=1, queue_timeout_ms=100)
+    release = threading.Event()
+    holder = _hold_slot(controller, release)
+    try:
+        started = time.perf_counter()
+        with pytest.raises(Overloaded) as rejected:
+            controller.acquire()
+        waited = time.perf_counter() - started
+    finally:
+        release.set()
+        holder.join()
+
+    assert rejected.value.status_code == 503
+    assert 0.09 <= waited < 1
+    report = controller.report()
+    assert report['rejected_timeout'] == 1
+    assert report['queue_depth'] == 0
+    assert report['peak_queue_depth'] == 1
+
+
+def test_caller_timeout_shortens_the_queue_timeout():
+    controller = AdmissionController('predict', max_concurrent=1, max_queue=1, queue_timeout_ms=5000)
+    release = threading.Event()
+    holder = _hold_slot(controller, release)
+    try:
+        started = time.perf_counter()
+        with pytest.raises(Overloaded):
+            controller.acquire(timeout=0.05)
+        assert time.perf_counter() - started < 1
+    finally:
+        release.set()
+        holder.join()
+
+
+def test_queued_request_gets_the_released_slot():
+    controller = AdmissionController('predict', max_concurrent=1, max_queue=1, queue_timeout_ms=5000)
+    release = threading.Event()
+    holder = _hold_slot(controller, release)
+    threading.Timer(0.05, release.set).start()
+
+    with controller.slot():
+        report = controller.report()
+    holder.join()
+
+    assert report['active'] == 1
+    assert report['queued'] == 1
+    assert report['admitted'] == 2
+    assert report['mean_wait_ms'] > 0
+
+
+def test_async_controller_rejects_full_queue_and_times_out():
+    async def scenario():
+        controller = AsyncAdmissionController('predict', max_concurrent=1, max_queue=1, queue_timeout_ms=100)
+        release = asyncio.Event()
+        acquired = asyncio.Event()
+
+        async def hold():
+            async with controller.slot():
+                acquired.set()
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await acquired.wait()
+        waiter = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0.01)
+        with pytest.raises(Overloaded) as full:
+            await controller.acquire()
+        with pytest.raises(Overloaded) as timed_out:
+            await waiter
+        release.set()
+        await holder
+        return full.value, timed_out.value, controller.report()
+
+    full, timed_out, report = asyncio.run(scenario())
+
+    assert full.status_code == 429
+    assert timed_out.status_code == 503
+    assert report['rejected_queue_full'] == 1
+    assert report['rejected_timeout'] == 1
+    assert report['active'] == 0
+
+
+def test_async_queued_request_gets_the_released_slot():
+    async def scenario():
+        controller = AsyncAdmissionController('batch', max_concurrent=1, max_queue=1, queue_timeout_ms=5000)
+        await controller.acquire()
+        waiter = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0.01)
+        await controller.release(0.01)
+        await waiter
+        return controller.report()
+
+    report = asyncio.run(scenario())
+
+    assert report['admitted'] == 2
+    assert report['queued'] == 1
+    assert report['active'] == 1
+
+
+def test_admit_decorator_answers_429_with_retry_after(monkeypatch):
+    from flask import Flask
+
+    controller = AdmissionController('predict', max_concurrent=1, max_queue=0, queue_timeout_ms=100)
+    monkeypatch.setattr(Config, 'ADMISSION_ENABLED', True)
+    monkeypatch.setattr(admission, '_controllers', {'predict': controller})
+    app = Flask(__name__)
+    app.add_url_rule('/predict', view_func=admission.admit('predict')(lambda: 'ok'))
+
+    with app.test_client() as client:
+        assert client.get('/predict').status_code == 200
+        release = threading.Event()
+        holder = _hold_slot(controller, release)
+        try:
+            response = client.get('/predict')
+        finally:
+            release.set()
+            holder.join()
+
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == str(response.get_json()['retry_after'])
+    assert response.get_json()['endpoint_class'] == 'predict'
@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+from scipy.special import expit
+from sklearn.calibration import CalibratedClassifierCV, _sigmoid_calibration
+from sklearn.datasets import make_classification
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import brier_score_loss
+from sklearn.model_selection import train_test_split
+from sklearn.svm import LinearSVC
+
+from models.calibration import CollapsedSigmoidClassifier, _fit_sigmoid, brier_score, expected_calibration_error
+
+
+def _calibrated(base, n_classes):
+    X, y = make_classification(n_samples=2000, n_features=8, n_informative=5, n_classes=n_classes,
+                               random_state=0)
+    return CalibratedClassifierCV(base, cv=3, method='sigmoid').fit(X, y), X, y
+
+
+@pytest.mark.parametrize('n_classes', [2, 3])
+@pytest.mark.parametrize('base', [LogisticRegression(max_iter=1000), LinearSVC(dual='auto')],
+                         ids=['logistic', 'linear_svc'])
+def test_collapsed_matches_calibrated_ensemble(base, n_classes):
+    calibrated, X, y = _calibrated(base, n_classes)
+    collapsed = CollapsedSigmoidClassifier.from_calibrated(calibrated, X, y)
+
+    reference = calibrated.predict_proba(X)
+    proba = collapsed.predict_proba(X)
+
+    assert proba.shape == reference.shape
+    np.testing.assert_allclose(proba.sum(axis=1), 1.0)
+    assert np.abs(proba - reference).max() < 0.05
+    assert (collapsed.predict(X) == calibrated.predict(X)).mean() > 0.99
+    np.testing.assert_array_equal(collapsed.classes_, calibrated.classes_)
+
+
+def test_scorer_is_the_mean_of_the_fold_models():
+    calibrated, X, y = _calibrated(LogisticRegression(max_iter=1000), 3)
+    collapsed = CollapsedSigmoidClassifier.from_calibrated(calibrated, X, y)
+
+    folds = [c.estimator.decision_function(X) for c in calibrated.calibrated_classifiers_]
+    np.testing.assert_allclose(collapsed.decision_function(X), np.mean(folds, axis=0), rtol=1e-10, atol=1e-10)
+
+
+def test_all_zero_sigmoids_give_uniform_probabilities():
+    model = CollapsedSigmoidClassifier(coef=np.zeros((3, 2)), intercept=np.zeros(3), slopes=np.zeros(3),
+                                       offsets=np.full(3, -1000.0), classes=['a', 'b', 'c'])
+    np.testing.assert_allclose(model.predict_proba(np.ones((4, 2))), 1 / 3)
+
+
+def test_brier_score_matches_sklearn_for_binary_labels():
+    rng = np.random.default_rng(0)
+    y = rng.integers(0, 2, 500)
+    p = rng.random(500)
+    proba = np.column_stack([1 - p, p])
+    # The multiclass definition sums over both columns: twice the binary Brier loss
+    assert brier_score(y, proba, [0, 1]) == pytest.approx(2 * brier_score_loss(y, p))
+
+
+def test_expected_calibration_error_against_reference_loop():
+    rng = np.random.default_rng(1)
+    classes = np.array(['x', 'y', 'z'])
+    proba = rng.dirichlet(np.ones(3), size=400)
+    y = classes[rng.integers(0, 3, 400)]
+
+    confidence = proba.max(axis=1)
+    correct = classes[proba.argmax(axis=1)] == y
+    expected = 0.0
+    for lower in np.linspace(0, 1, 11)[:-1]:
+        upper = lower + 0.1
+        mask = (confidence >= lower) & ((confidence < upper) if upper < 1 else (confidence <= 1))
+        if mask.any():
+            expected += mask.mean() * abs(correct[mask].mean() - confidence[mask].mean())
+
+    assert expected_calibration_error(y, proba, classes) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize('case', ['noisy', 'separable', 'tiny_class'])
+def test_platt_scaling_matches_sklearn(case):
+    rng = np.random.default_rng(0)
+    scores = rng.normal(size=300)
+    if case == 'noisy':
+        target = rng.random(300) < 1 / (1 + np.exp(-2 * scores))
+    elif case == 'separable':
+        target = scores > 0
+    else:
+        target = scores > 2.5
+    # sklearn's sigmoid is 1 / (1 + exp(a * score + b))
+    a, b = _sigmoid_calibration(scores, target)
+
+    slope, offset = _fit_sigmoid(scores, target)
+
+    np.testing.assert_allclose(expit(slope * scores + offset), expit(-(a * scores + b)), atol=1e-3)
+    # The smoothed targets keep the slope finite even when the scores separate the classes
+    assert abs(slope) < 50
+
+
+def test_collapsed_is_not_overconfident_when_folds_overfit():
+    # Few rows, many features: in-sample scores of the averaged scorer are far too confident
+    X, y = make_classification(n_samples=450, n_features=60, n_informative=5, flip_y=0.1, random_state=1)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=2 / 3, random_state=0)
+    calibrated = CalibratedClassifierCV(LogisticRegression(C=100, max_iter=2000), cv=3).fit(X_train, y_train)
+    collapsed = CollapsedSigmoidClassifier.from_calibrated(calibrated, X_train, y_train)
+
+    ensemble_proba = calibrated.predict_proba(X_test)
+    collapsed_proba = collapsed.predict_proba(X_test)
+
+    assert brier_score(y_test, collapsed_proba, [0, 1]) < brier_score(y_test, ensemble_proba, [0, 1]) + 0.02
+    assert collapsed_proba.max(axis=1).mean() < ensemble_proba.max(axis=1).mean() + 0.05
+
+
+def test_prefit_calibration_cannot_be_collapsed():
+    X, y = make_classification(n_samples=200, random_state=0)
+    calibrated = CalibratedClassifierCV(LogisticRegression().fit(X, y), cv='prefit').fit(X, y)
+
+    with pytest.raises(ValueError, match='cross-validated'):
+        CollapsedSigmoidClassifier.from_calibrated(calibrated, X, y)
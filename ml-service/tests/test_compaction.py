@@ -0,0 +1,110 @@
+import copy
+import pickle
+import numpy as np
+import pytest
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer, TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.multiclass import OneVsRestClassifier
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.pipeline import Pipeline
+from sklearn.svm import LinearSVC
+
+from models.compaction import compact_artifact
+from models.text_processing import text_vectorizer_params
+
+TEXTS = [
+    'cita medica en la clinica', 'control medico de rutina', 'matrimonio de mi hermana',
+    'viaje por matrimonio', 'calamidad domestica inundacion', 'fallecimiento de un familiar',
+    'cita odontologica urgente', 'diligencia personal en el banco', 'mudanza de vivienda',
+    'incapacidad por cirugia', 'licencia de paternidad', 'examen de la universidad',
+] * 5
+LABELS = np.arange(len(TEXTS)) % 4
+
+
+@pytest.fixture(scope='module')
+def documents():
+    vectorizer = TfidfVectorizer().fit(TEXTS)
+    return vectorizer, vectorizer.transform(TEXTS)
+
+
+@pytest.mark.parametrize('model', [
+    LogisticRegression(max_iter=1000),
+    LinearSVC(dual='auto'),
+    OneVsRestClassifier(LogisticRegression(max_iter=1000)),
+])
+def test_linear_models_keep_their_predictions(documents, model):
+    _, X = documents
+    model.fit(X, LABELS)
+    reference = model.decision_function(X)
+
+    compacted, density = compact_artifact(copy.deepcopy(model))
+
+    assert 0 < density <= 1
+    np.testing.assert_allclose(compacted.decision_function(X), reference, rtol=1e-5, atol=1e-5)
+    np.testing.assert_array_equal(compacted.predict(X), model.predict(X))
+
+
+def test_pruning_stores_sparse_coefficients(documents):
+    _, X = documents
+    model = LogisticRegression(max_iter=1000).fit(X, LABELS)
+    threshold = np.quantile(np.abs(model.coef_), 0.9)
+    expected = np.where(np.abs(model.coef_) < threshold, 0.0, model.coef_)
+
+    compacted, density = compact_artifact(copy.deepcopy(model), prune_threshold=threshold)
+
+    assert sparse.issparse(compacted.coef_)
+    assert density == pytest.approx(np.count_nonzero(expected) / expected.size)
+    np.testing.assert_allclose(compacted.coef_.toarray(), expected, rtol=1e-6)
+    np.testing.assert_allclose(compacted.decision_function(X), X @ expected.T + model.intercept_, rtol=1e-5, atol=1e-5)
+
+
+def test_naive_bayes_and_vectorizer_survive_pickling(documents):
+    vectorizer, X = documents
+    model = MultinomialNB().fit(X, LABELS)
+    reference_proba = model.predict_proba(X)
+
+    compacted_vectorizer, _ = compact_artifact(copy.deepcopy(vectorizer))
+    compacted_model, density = compact_artifact(copy.deepcopy(model))
+    compacted_vectorizer = pickle.loads(pickle.dumps(compacted_vectorizer))
+    compacted_model = pickle.loads(pickle.dumps(compacted_model))
+
+    assert density is None
+    assert compacted_model.feature_log_prob_.dtype == np.float32
+    assert compacted_vectorizer.idf_.dtype == np.float32
+    X_compacted = compacted_vectorizer.transform(TEXTS)
+    np.testing.assert_allclose(X_compacted.toarray(), X.toarray(), rtol=1e-5, atol=1e-6)
+    np.testing.assert_allclose(compacted_model.predict_proba(X_compacted), reference_proba, rtol=1e-4, atol=1e-6)
+
+
+def test_other_artifacts_are_untouched():
+    artifact = {'feature_order': ['edad', 'antiguedad_anios']}
+    assert compact_artifact(artifact) == (artifact, None)
+
+
+@pytest.mark.parametrize('vectorizer', [
+    TfidfVectorizer(ngram_range=(1, 3), sublinear_tf=True, **text_vectorizer_params()),
+    TfidfVectorizer(max_features=20, ngram_range=(1, 3), sublinear_tf=True, **text_vectorizer_params()),
+    Pipeline([
+        ('hashing', HashingVectorizer(n_features=2 ** 12, ngram_range=(1, 3), alternate_sign=False, norm=None,
+                                      **text_vectorizer_params())),
+        ('idf', TfidfTransformer(sublinear_tf=True)),
+    ]),
+], ids=['tfidf', 'tfidf_max_features', 'hashing_idf'])
+def test_compacted_vectorizer_transforms_like_the_original(vectorizer):
+    # The trainer's text vectorizers, scored on motivos they were not fitted on
+    vectorizer.fit(TEXTS)
+    unseen = ['Cita médica con el especialista', 'matrimonio y viaje de bodas', 'trámite bancario', '']
+    reference = vectorizer.transform(TEXTS + unseen)
+
+    compacted, _ = compact_artifact(copy.deepcopy(vectorizer))
+    compacted = pickle.loads(pickle.dumps(compacted))
+    result = compacted.transform(TEXTS + unseen)
+
+    idf_owner = compacted.steps[-1][1] if isinstance(compacted, Pipeline) else compacted
+    assert idf_owner.idf_.dtype == np.float32
+    if hasattr(vectorizer, 'vocabulary_'):
+        assert compacted.vocabulary_ == vectorizer.vocabulary_
+    np.testing.assert_array_equal(result.indices, reference.indices)
+    np.testing.assert_array_equal(result.indptr, reference.indptr)
+    np.testing.assert_allclose(result.toarray(), reference.toarray(), rtol=1e-6, atol=1e-7)
@@ -0,0 +1,73 @@
+import time
+import pytest
+
+from models.deadline import Deadline, StageFallbacks
+
+
+@pytest.mark.parametrize('value, expected_ms', [
+    (None, 800), ('', 800), (250, 250), ('250', 250), ('12.5', 12.5),
+])
+def test_from_request_uses_client_value_or_default(value, expected_ms):
+    deadline = Deadline.from_request(value, default_ms=800)
+    assert deadline.budget_ms == expected_ms
+
+
+@pytest.mark.parametrize('value, default_ms', [(None, 0), ('', None), (0, 800), ('-5', 800)])
+def test_from_request_without_positive_budget_is_none(value, default_ms):
+    assert Deadline.from_request(value, default_ms=default_ms) is None
+
+
+@pytest.mark.parametrize('value', ['abc', [100], {'ms': 100}])
+def test_from_request_rejects_non_numbers(value):
+    with pytest.raises(ValueError, match='deadline_ms'):
+        Deadline.from_request(value, default_ms=800)
+
+
+def test_remaining_excludes_reserve_and_counts_from_start():
+    started = time.perf_counter() - 0.3
+    deadline = Deadline(1000, reserve_ms=200, started=started)
+
+    assert 0.45 < deadline.remaining() <= 0.5
+    assert deadline.allows(0.4)
+    assert not deadline.allows(0.6)
+    assert not deadline.expired()
+    assert deadline.query_timeout() == 1
+    assert deadline.elapsed_ms() >= 300
+
+
+def test_expired_deadline():
+    deadline = Deadline(100, started=time.perf_counter() - 1)
+    assert deadline.expired()
+    assert deadline.remaining() < 0
+    # pyodbc treats a 0 timeout as no timeout
+    assert deadline.query_timeout() == 1
+
+
+def test_query_timeout_rounds_up_to_whole_seconds():
+    assert Deadline(2500).query_timeout() == 3
+
+
+def test_fallbacks_serve_last_value_else_default():
+    fallbacks = StageFallbacks()
+    fallbacks.remember(7, 'knn', 3)
+
+    assert fallbacks.get(7, 'knn', default=1) == (3, 'cache')
+    assert fallbacks.get(7, 'kmeans', default=0) == (0, 'default')
+    assert fallbacks.get(8, 'knn', default=2, default_source='segment') == (2, 'segment')
+    assert fallbacks.report() == {
+        'employees_cached': 1,
+        'skipped': {'knn': {'cache': 1, 'segment': 1}, 'kmeans': {'default': 1}},
+    }
+
+
+def test_fallbacks_evict_least_recently_updated_employee():
+    fallbacks = StageFallbacks(max_employees=2)
+    fallbacks.remember(1, 'knn', 10)
+    fallbacks.remember(2, 'knn', 20)
+    fallbacks.remember(1, 'kmeans', 1)  # employee 1 becomes the most recent
+    fallbacks.remember(3, 'knn', 30)
+
+    assert fallbacks.get(2, 'knn', default=None) == (None, 'default')
+    assert fallbacks.get(1, 'knn', default=None) == (10, 'cache')
+    assert fallbacks.get(3, 'knn', default=None) == (30, 'cache')
+    assert fallbacks.report()['employees_cached'] == 2
@@ -0,0 +1,94 @@
+import pickle
+import numpy as np
+import pytest
+from sklearn.metrics import r2_score
+
+from models.neighbor_index import CellNeighborRegressor
+
+
+def brute_force_knn(X, y, queries, n_neighbors):
+    """
+    Mean target of the n_neighbors nearest rows, distances over features standardized
+    like the model. Rows tied at the n_neighbors-th distance share the remaining slots
+    evenly (duplicate profiles are interchangeable).
+    """
+    std = X.std(axis=0)
+    scale = np.where(std > 0, std, 1.0)
+    distances = np.linalg.norm((queries[:, None, :] - X[None, :, :]) / scale, axis=2)
+    predictions = []
+    for row in distances:
+        boundary = np.sort(row)[n_neighbors - 1]
+        closer = row < boundary
+        tied = row == boundary
+        total = y[closer].sum() + (n_neighbors - closer.sum()) * y[tied].mean()
+        predictions.append(total / n_neighbors)
+    return np.array(predictions)
+
+
+@pytest.fixture(scope='module')
+def history():
+    # Integer features like dias_ult_ano, antiguedad_anios, edad: many repeated profiles
+    rng = np.random.default_rng(0)
+    X = np.column_stack([rng.integers(0, 20, 3000), rng.integers(0, 30, 3000), rng.integers(20, 60, 3000)])
+    y = rng.integers(1, 10, 3000).astype(float)
+    # Off-grid queries, so distinct profiles are never at the same distance
+    queries = rng.uniform([0, 0, 20], [20, 30, 60], size=(200, 3))
+    return X.astype(float), y, queries
+
+
+@pytest.mark.parametrize('n_neighbors', [1, 5, 40])
+def test_grid_matches_brute_force_knn(history, n_neighbors):
+    X, y, queries = history
+    model = CellNeighborRegressor(n_neighbors=n_neighbors, cell_size=1.0).fit(X, y)
+
+    np.testing.assert_allclose(model.predict(queries), brute_force_knn(X, y, queries, n_neighbors), rtol=1e-5)
+
+
+@pytest.mark.parametrize('n_neighbors', [1, 5, 40])
+def test_row_cells_match_brute_force_knn(n_neighbors):
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(2000, 3)) * [5, 10, 20]
+    y = rng.normal(size=2000)
+    queries = rng.normal(size=(200, 3)) * [5, 10, 20]
+    model = CellNeighborRegressor(n_neighbors=n_neighbors, cell_size=0).fit(X, y)
+
+    assert len(model.cells_) == len(X)
+    np.testing.assert_allclose(model.predict(queries), brute_force_knn(X, y, queries, n_neighbors),
+                               rtol=1e-5, atol=1e-6)
+
+
+def test_cells_hold_counts_and_target_means(history):
+    X, y, _ = history
+    model = CellNeighborRegressor(cell_size=1.0).fit(X, y)
+
+    profiles, inverse = np.unique(X, axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    assert len(model.cells_) == len(profiles)
+    assert model.cell_counts_.sum() == len(X)
+    for cell in [0, len(profiles) // 2, len(profiles) - 1]:
+        np.testing.assert_allclose(model.cell_means_[cell], y[inverse == cell].mean(), rtol=1e-6)
+
+
+def test_more_neighbors_than_cells_averages_everything():
+    X = np.array([[0.0], [0.0], [1.0]])
+    y = np.array([1.0, 3.0, 8.0])
+    model = CellNeighborRegressor(n_neighbors=10).fit(X, y)
+
+    np.testing.assert_allclose(model.predict([[0.2], [5.0]]), [4.0, 4.0])
+
+
+def test_pickle_drops_and_rebuilds_the_tree(history):
+    X, y, queries = history
+    model = CellNeighborRegressor(n_neighbors=5).fit(X, y)
+    restored = pickle.loads(pickle.dumps(model))
+
+    assert '_tree' not in model.__getstate__()
+    np.testing.assert_array_equal(restored.predict(queries), model.predict(queries))
+
+
+def test_score_is_r2(history):
+    X, y, queries = history
+    model = CellNeighborRegressor(n_neighbors=5).fit(X, y)
+    targets = np.linspace(1, 9, len(queries))
+
+    assert model.score(queries, targets) == pytest.approx(r2_score(targets, model.predict(queries)), rel=1e-6)
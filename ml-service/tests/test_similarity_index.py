@@ -0,0 +1,129 @@
+import pickle
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import pytest
+
+from models.similarity_index import ROW_FEATURES, SimilarityIndex
+from models.text_processing import normalize_text
+
+WORDS = ['cita', 'médica', 'control', 'odontológica', 'matrimonio', 'hermana', 'viaje', 'calamidad',
+         'doméstica', 'inundación', 'fallecimiento', 'familiar', 'diligencia', 'banco', 'mudanza',
+         'vivienda', 'cirugía', 'paternidad', 'examen', 'universidad', 'hijo', 'colegio', 'urgente']
+
+# No truncation anywhere, so the index must agree exactly with a brute-force scan
+EXACT = dict(postings_limit=10 ** 6, candidate_docs=10 ** 6, candidate_rows=10 ** 6)
+
+
+def make_rows(n, seed, first_id=1):
+    rng = np.random.default_rng(seed)
+    start = datetime(2024, 1, 1)
+    return pd.DataFrame({
+        'solicitud_id': np.arange(first_id, first_id + n),
+        'empleado_id': rng.integers(1, 40, n),
+        'edad': rng.integers(20, 60, n),
+        'antiguedad_anios': rng.integers(0, 30, n),
+        'dias_ult_ano': rng.integers(0, 20, n),
+        'dias_solicitados': rng.integers(1, 10, n),
+        # Few words per motivo, so many rows share a document
+        'motivo_texto': [' '.join(rng.choice(WORDS, rng.integers(1, 4))) for _ in range(n)],
+        'tipo_permiso_real': rng.choice(['MEDICO', 'PERSONAL', 'CALAMIDAD'], n),
+        'resultado_rrhh': rng.choice(['AUTORIZADO', 'RECHAZADO'], n),
+        'fecha_decision': [start + timedelta(hours=int(h)) for h in np.sort(rng.integers(0, 5000, n))],
+    })
+
+
+def brute_force(index, df, motivo, features, k):
+    """Score every row: cosine of the TF-IDF vectors, then the same blend with employee similarity"""
+    vectorizer = index.vectorizer
+    query = vectorizer.transform([normalize_text(motivo)])
+    text = (vectorizer.transform(df['motivo_texto'].map(normalize_text)) @ query.T).toarray().ravel()
+
+    columns = [i for i, column in enumerate(ROW_FEATURES) if features.get(column) is not None]
+    values = df[[ROW_FEATURES[i] for i in columns]].to_numpy(dtype=np.float32)
+    query_features = np.array([features[ROW_FEATURES[i]] for i in columns])
+    diff = (values - query_features) / index._feature_std[columns]
+    employee = 1.0 / (1.0 + np.sqrt((diff * diff).sum(axis=1))) if columns else np.zeros(len(df))
+
+    score = index.text_weight * text + (1 - index.text_weight) * employee
+    candidates = np.flatnonzero(text > 0)
+    best = candidates[np.argsort(-score[candidates], kind='stable')][:k]
+    return dict(zip(df['solicitud_id'].to_numpy()[candidates].tolist(), score[candidates].tolist())), score[best]
+
+
+@pytest.fixture(scope='module')
+def indexed():
+    initial, later = make_rows(400, seed=0), make_rows(300, seed=1, first_id=401)
+    index = SimilarityIndex.build(initial, **EXACT)
+    for chunk in np.array_split(later, 3):
+        index.add(chunk.to_dict('records'))
+    return index, pd.concat([initial, later], ignore_index=True)
+
+
+@pytest.mark.parametrize('motivo, features', [
+    ('cita médica urgente', {'edad': 35, 'antiguedad_anios': 4, 'dias_ult_ano': 3, 'dias_solicitados': 2}),
+    ('Matrimonio de mi hermana', {'edad': 50}),
+    ('examen universidad', {}),
+])
+def test_query_after_incremental_updates_matches_brute_force(indexed, motivo, features):
+    index, df = indexed
+    reference_scores, reference_top = brute_force(index, df, motivo, features, k=10)
+
+    results = index.query(motivo, features, k=10)
+
+    assert len(results) == len(reference_top)
+    np.testing.assert_allclose([r['similitud'] for r in results], reference_top, atol=1e-4)
+    for result in results:
+        assert result['similitud'] == pytest.approx(reference_scores[result['solicitud_id']], abs=1e-4)
+
+
+def test_incremental_index_equals_one_shot_index(indexed):
+    index, df = indexed
+    one_shot = SimilarityIndex(index.vectorizer, **EXACT)
+    one_shot._feature_mean, one_shot._feature_std = index._feature_mean, index._feature_std
+    one_shot.add(df.to_dict('records'))
+
+    assert one_shot.stats() == index.stats()
+    for motivo in ['cita médica', 'calamidad doméstica por inundación', 'mudanza']:
+        assert one_shot.query(motivo, {'edad': 40}, k=15) == index.query(motivo, {'edad': 40}, k=15)
+
+
+def test_add_updates_known_solicitudes_and_watermark():
+    df = make_rows(50, seed=2)
+    index = SimilarityIndex.build(df, **EXACT)
+    row = df.iloc[0].to_dict()
+    flipped = 'RECHAZADO' if row['resultado_rrhh'] == 'AUTORIZADO' else 'AUTORIZADO'
+
+    assert index.add([{**row, 'resultado_rrhh': flipped}]) == 0
+    assert index.stats()['rows'] == 50
+    match = [r for r in index.query(row['motivo_texto'], k=50) if r['solicitud_id'] == row['solicitud_id']]
+    assert match[0]['resultado_rrhh'] == flipped
+
+    newer = {**row, 'solicitud_id': 999, 'fecha_decision': df['fecha_decision'].max() + timedelta(days=1)}
+    assert index.add([newer]) == 1
+    assert index.watermark == newer['fecha_decision']
+    assert index.query(row['motivo_texto'], k=60, exclude_solicitud_id=999)
+    assert all(r['solicitud_id'] != 999 for r in index.query(row['motivo_texto'], k=60, exclude_solicitud_id=999))
+
+
+def test_postings_are_truncated_heaviest_first(indexed):
+    _, df = indexed
+    index = SimilarityIndex.build(df, postings_limit=5)
+
+    for docs, weights in index._postings.values():
+        assert len(docs) <= 5
+        assert np.all(np.diff(weights) <= 0)
+
+
+def test_pickled_index_answers_the_same(indexed):
+    index, _ = indexed
+    restored = pickle.loads(pickle.dumps(index))
+
+    assert restored.query('cita control médico', {'edad': 30}) == index.query('cita control médico', {'edad': 30})
+    assert restored.add(make_rows(5, seed=3, first_id=5000).to_dict('records')) == 5
+
+
+def test_unknown_terms_return_nothing(indexed):
+    index, _ = indexed
+    assert index.query('zzz qqq') == []
+    assert index.query('') == []
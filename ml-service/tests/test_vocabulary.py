@@ -0,0 +1,92 @@
+import copy
+import pickle
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from models.vocabulary import feature_scores, prune_vectorizer, select_features
+
+TEXTS = [
+    'cita medica en la clinica', 'control medico de rutina', 'matrimonio de mi hermana',
+    'viaje por matrimonio civil', 'calamidad domestica por inundacion', 'fallecimiento de un familiar',
+    'cita odontologica urgente', 'diligencia personal en el banco', 'mudanza de vivienda',
+    'incapacidad por cirugia', 'licencia de paternidad', 'examen final de la universidad',
+]
+LABELS = np.array([0, 0, 1, 1, 2, 2, 0, 3, 3, 0, 1, 3])
+
+
+@pytest.mark.parametrize('vectorizer', [
+    TfidfVectorizer(),
+    TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True),
+    TfidfVectorizer(use_idf=False),
+    TfidfVectorizer(norm=None),
+], ids=['default', 'bigrams', 'no_idf', 'no_norm'])
+def test_pruned_vectorizer_matches_column_slicing(vectorizer):
+    vectorizer.fit(TEXTS)
+    keep = select_features(vectorizer.transform(TEXTS), LABELS, k=10)
+
+    # Reference: the unnormalized matrix restricted to the kept columns, normalized afterwards
+    raw = copy.deepcopy(vectorizer).set_params(norm=None).transform(TEXTS).toarray()[:, keep]
+    if vectorizer.norm == 'l2':
+        norms = np.linalg.norm(raw, axis=1, keepdims=True)
+        raw = np.divide(raw, norms, out=np.zeros_like(raw), where=norms > 0)
+
+    pruned = pickle.loads(pickle.dumps(prune_vectorizer(vectorizer, keep)))
+
+    assert len(pruned.vocabulary_) == len(keep)
+    np.testing.assert_allclose(pruned.transform(TEXTS).toarray(), raw, rtol=1e-10, atol=1e-12)
+
+
+def test_pruned_vocabulary_keeps_column_order():
+    vectorizer = TfidfVectorizer().fit(TEXTS)
+    terms = vectorizer.get_feature_names_out()
+    keep = np.array([1, 4, 9, 20])
+
+    prune_vectorizer(vectorizer, keep)
+
+    assert list(vectorizer.get_feature_names_out()) == list(terms[keep])
+
+
+@pytest.mark.parametrize('method', ['chi2', 'mutual_info'])
+def test_select_features_returns_sorted_top_k(method):
+    X = TfidfVectorizer().fit_transform(TEXTS)
+    scores = feature_scores(X, LABELS, method)
+
+    keep = select_features(X, LABELS, method=method, k=5)
+
+    assert len(keep) == 5
+    assert list(keep) == sorted(keep)
+    assert scores[keep].min() >= np.sort(scores)[-5]
+
+
+def test_select_features_min_score_and_fallback():
+    X = TfidfVectorizer().fit_transform(TEXTS)
+    scores = feature_scores(X, LABELS)
+
+    threshold = np.median(scores)
+    np.testing.assert_array_equal(select_features(X, LABELS, min_score=threshold), np.flatnonzero(scores > threshold))
+    # Nothing passes: the best column is still kept
+    np.testing.assert_array_equal(select_features(X, LABELS, min_score=scores.max() + 1), [np.argmax(scores)])
+
+
+def test_unknown_selection_method():
+    with pytest.raises(ValueError, match='Unknown vocabulary selection method'):
+        feature_scores(TfidfVectorizer().fit_transform(TEXTS), LABELS, method='variance')
+
+
+def test_mutual_info_ignores_term_frequency_of_label_independent_terms():
+    rng = np.random.default_rng(0)
+    labels = np.repeat([0, 1], 200)
+    # 'relleno' appears in every motivo with a varied count (and so a varied TF-IDF weight),
+    # 'medica'/'boda' give the label away, the other words are noise
+    noise = ['hoy', 'manana', 'tarde', 'urgente', 'familia', 'ciudad']
+    texts = [('medica ' if label == 0 else 'boda ') + 'relleno ' * int(rng.integers(1, 8))
+             + ' '.join(rng.choice(noise, int(rng.integers(0, 4))))
+             for label in labels]
+    vectorizer = TfidfVectorizer().fit(texts)
+    scores = feature_scores(vectorizer.transform(texts), labels, method='mutual_info')
+    vocabulary = vectorizer.vocabulary_
+
+    assert scores[vocabulary['relleno']] == pytest.approx(0.0, abs=1e-6)
+    assert scores[vocabulary['medica']] == pytest.approx(np.log(2), rel=1e-3)
+    assert select_features(vectorizer.transform(texts), labels, method='mutual_info', k=1)[0] != vocabulary['relleno']
@@ -11,6 +11,9 @@ from sklearn.preprocessing import LabelEncoder
 from sklearn.metrics import classification_report, accuracy_score, roc_auc_score
 import joblib
 import os
+from category_encoding import (
+    CATEGORICAL_COLUMNS, fit_category_maps, maps_from_label_encoders, encode_frame
+)
 
 
 def create_sample_data():
@@ -69,34 +72,24 @@ def create_sample_data():
     return df
 
 
-def preprocess_data(df, label_encoders=None, is_training=True):
+def preprocess_data(df, label_encoders=None, is_training=True, category_maps=None):
     """
     Preprocess features for model training/prediction
+    Categorical columns are encoded with category -> code maps (see category_encoding.py);
+    unseen categories get UNKNOWN_CODE.
     """
-    df = df.copy()
-    
-    # Categorical columns to encode
-    categorical_cols = ['genero', 'estado_civil', 'area', 'cargo', 'tipo_contrato', 
-                       'sede', 'tipo_permiso_real', 'impacto_area']
-    
     if is_training:
-        # Create and fit label encoders
+        # Fit the maps and the equivalent LabelEncoders (label_encoders.pkl stays compatible)
+        category_maps = fit_category_maps(df, CATEGORICAL_COLUMNS)
         label_encoders = {}
-        for col in categorical_cols:
+        for col, mapping in category_maps.items():
             le = LabelEncoder()
-            df[col] = le.fit_transform(df[col].astype(str))
+            le.classes_ = np.array(list(mapping))
             label_encoders[col] = le
-    else:
-        # Use existing label encoders
-        for col in categorical_cols:
-            if col in label_encoders:
-                # Handle unknown categories
-                le = label_encoders[col]
-                df[col] = df[col].astype(str).apply(
-                    lambda x: le.transform([x])[0] if x in le.classes_ else -1
-                )
-    
-    return df, label_encoders
+    elif category_maps is None:
+        category_maps = maps_from_label_encoders(label_encoders)
+    
+    return encode_frame(df, category_maps), label_encoders
 
 
 def train_model():
@@ -174,8 +167,10 @@ def train_model():
     print("\n7. Saving model artifacts...")
     joblib.dump(model, 'model.pkl')
     joblib.dump(label_encoders, 'label_encoders.pkl')
+    joblib.dump(maps_from_label_encoders(label_encoders), 'category_maps.pkl')
     print("   ✓ Saved model.pkl")
     print("   ✓ Saved label_encoders.pkl")
+    print("   ✓ Saved category_maps.pkl")
     
     print("\n" + "=" * 60)
     print("✓ Training completed successfully!")